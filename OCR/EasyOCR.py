@@ -1,19 +1,32 @@
 import io
-import cv2
 import numpy as np
 import re
 from PIL import Image
-import easyocr
+
+# cv2 and easyocr (which pulls in torch) are imported on first use: importing this
+# module stays cheap for the API process, CLIs and workers that never run OCR
+
+import tracing
+from metrics import timed
 
 # ========== LAZY LOADING - EasyOCR ==========
 _reader_instance = None
 
+OCR_LANGUAGES = ['ar', 'en']
+# The version is filled in when the reader is loaded
+OCR_ENGINE = {"name": "easyocr", "version": None, "languages": OCR_LANGUAGES}
+
+# Longest side the text detector works at; larger images are scaled down to it
+DETECT_CANVAS_SIZE = 2560
+
 
 def get_reader():
     global _reader_instance
     if _reader_instance is None:
+        import easyocr
+        OCR_ENGINE["version"] = getattr(easyocr, "__version__", "unknown")
         print("🔄 Loading EasyOCR models (Arabic + English)...")
-        _reader_instance = easyocr.Reader(['ar', 'en'], gpu=False)
+        _reader_instance = easyocr.Reader(OCR_LANGUAGES, gpu=False)
         print("✅ EasyOCR loaded!")
     return _reader_instance
 
@@ -32,7 +45,10 @@ DOC_REQUIREMENTS = {
 
 
 # ----- IMAGE QUALITY CHECK -----
+@timed("check_image_quality")
 def check_image_quality(img, doc_type, blur_threshold=100, brightness_threshold=(30, 240)):
+    import cv2
+
     if isinstance(img, Image.Image):
         img = np.array(img)
     elif isinstance(img, bytes):
@@ -62,10 +78,27 @@ def check_image_quality(img, doc_type, blur_threshold=100, brightness_threshold=
 
 # ----- OCR EXTRACTION WITH LAYOUT -----
 def extract_text_with_layout(img):
+    from easyocr.utils import reformat_input
+
     if isinstance(img, Image.Image):
         img = np.array(img)
     reader = get_reader()
-    results = reader.readtext(img)
+    # Same steps as reader.readtext(), split so detection and recognition are timed apart
+    img, img_cv_grey = reformat_input(img)
+    with timed("detection"):
+        horizontal_list, free_list = reader.detect(img, canvas_size=DETECT_CANVAS_SIZE)
+    with timed("recognition"):
+        results = reader.recognize(img_cv_grey, horizontal_list[0], free_list[0])
+
+    h, w = img.shape[:2]
+    scale = min(1.0, DETECT_CANVAS_SIZE / max(h, w))
+    tracing.note("engine", OCR_ENGINE)
+    tracing.append("images", {
+        "size": [w, h],
+        "detector_size": [int(w * scale), int(h * scale)],
+        "boxes": len(horizontal_list[0]) + len(free_list[0]),
+        "kept": sum(1 for _, _, conf in results if conf > 0.2),
+    })
     lines = {}
     for bbox, text, conf in results:
         if conf > 0.2:
@@ -104,6 +137,7 @@ def extract_passport_number(text):
     return None
 
 
+@timed("structure_tunisian_passport_data")
 def structure_tunisian_passport_data(lines):
     structured_data = {}
     full_text = "\n".join([line["text"] for line in lines])
@@ -168,6 +202,7 @@ def structure_tunisian_passport_data(lines):
 
 
 # ----- CIN FUNCTIONS -----
+@timed("parse_cin_front")
 def parse_cin_front(lines):
     """Parse CIN front side data"""
     data = {}
@@ -216,6 +251,7 @@ def parse_cin_front(lines):
     return data, full_text
 
 
+@timed("parse_cin_back")
 def parse_cin_back(lines):
     """Parse CIN back side data"""
     data = {}
@@ -2,21 +2,32 @@
 Document Verification Module
 Validates extracted OCR data for authenticity
 """
+import os
 import re
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
-import PyPDF2
-from typing import Dict, Any
+from OCR.pdf_extractor import open_pdf
+from OCR.pdf_forensics import scan_object_tree, scan_pdf_structure
+from metrics import timed
 
 
-def verify_pdf_document(pdf_path: str) -> Dict[str, Any]:
+def _has_metadata(metadata: Optional[dict]) -> bool:
+    """PyMuPDF always returns a metadata dict, an empty Info dictionary has no values."""
+    if not metadata:
+        return False
+    return any(v for k, v in metadata.items() if k not in ("format", "encryption"))
+
+
+@timed("verify_pdf_document")
+def verify_pdf_document(pdf_source: Union[str, bytes, bytearray, memoryview], doc=None) -> Dict[str, Any]:
     """
     Verify PDF document structure and integrity
     Returns format matching verify_cin() and verify_passport()
 
     Args:
-        pdf_path: Path to the PDF file
+        pdf_source: Path to the PDF file (memory-mapped, never read whole), its raw bytes or a view of them
+        doc: Already open PyMuPDF document for the same file (avoids a second parse)
 
     Returns:
         Dictionary with overall_score, is_authentic, confidence_level, and checks
@@ -24,120 +35,221 @@ def verify_pdf_document(pdf_path: str) -> Dict[str, Any]:
     checks = {}
     total_score = 0
     max_score = 0
+    own_doc = False
 
     try:
-        with open(pdf_path, 'rb') as f:
-            # 1. PDF Header Validation
-            max_score += 20
-            header = f.read(8)
-            f.seek(0)
-            if header.startswith(b'%PDF-'):
-                checks['pdf_header'] = {
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            header = bytes(pdf_source[:8])
+            file_size = len(pdf_source)
+        else:
+            with open(pdf_source, 'rb') as f:
+                header = f.read(8)
+            file_size = os.path.getsize(pdf_source)
+
+        if doc is None:
+            doc = open_pdf(pdf_source)
+            own_doc = True
+
+        # 1. PDF Header Validation
+        max_score += 20
+        if header.startswith(b'%PDF-'):
+            checks['pdf_header'] = {
+                "passed": True,
+                "score": 20,
+                "details": "Valid PDF header"
+            }
+            total_score += 20
+        else:
+            checks['pdf_header'] = {
+                "passed": False,
+                "score": 0,
+                "details": "Invalid PDF header"
+            }
+
+        metadata = doc.metadata or {}
+
+        # 2. Encryption Check
+        max_score += 15
+        if not (doc.is_encrypted or doc.needs_pass or metadata.get('encryption')):
+            checks['encryption'] = {
+                "passed": True,
+                "score": 15,
+                "details": "Document is not encrypted"
+            }
+            total_score += 15
+        else:
+            checks['encryption'] = {
+                "passed": False,
+                "score": 0,
+                "details": "Document is encrypted (suspicious)"
+            }
+
+
+
+        # 4. File Size Check
+        max_score += 10
+        size_mb = file_size / (1024 * 1024)
+        if size_mb <= 10:
+            checks['file_size'] = {
+                "passed": True,
+                "score": 10,
+                "details": f"Reasonable file size: {round(size_mb, 2)} MB"
+            }
+            total_score += 10
+        else:
+            checks['file_size'] = {
+                "passed": False,
+                "score": 0,
+                "details": f"Unusually large file: {round(size_mb, 2)} MB"
+            }
+
+        # 5. Metadata Check
+        max_score += 20
+        has_metadata = _has_metadata(metadata)
+        if has_metadata:
+            creator = metadata.get('creator') or 'Unknown'
+            suspicious_tools = ['photoshop', 'gimp', 'paint', 'canva', 'pixlr']
+
+            if not any(sus in creator.lower() for sus in suspicious_tools):
+                checks['metadata'] = {
                     "passed": True,
                     "score": 20,
-                    "details": "Valid PDF header"
+                    "details": f"Creator software appears legitimate: {creator}"
                 }
                 total_score += 20
             else:
-                checks['pdf_header'] = {
+                checks['metadata'] = {
                     "passed": False,
                     "score": 0,
-                    "details": "Invalid PDF header"
+                    "details": f"Suspicious creator software detected: {creator}"
                 }
-
-            reader = PyPDF2.PdfReader(f)
-
-            # 2. Encryption Check
-            max_score += 15
-            if not reader.is_encrypted:
-                checks['encryption'] = {
+        else:
+            checks['metadata'] = {
+                "passed": False,
+                "score": 10,
+                "details": "No metadata found (partial credit)"
+            }
+            total_score += 10
+
+        # 6. Document Modification Check
+        max_score += 20
+        structure = scan_pdf_structure(pdf_source)
+        if structure["object_streams"]:
+            # The byte scan cannot read compressed objects: count active content from the object tree too
+            tree = scan_object_tree(doc)
+            structure["javascript"] = max(structure["javascript"], tree["javascript"])
+            structure["auto_actions"] = max(structure["auto_actions"], tree["auto_actions"])
+        revisions = structure["revisions"]
+        if has_metadata:
+            creation_date = metadata.get('creationDate') or 'Unknown'
+            mod_date = metadata.get('modDate') or 'Unknown'
+
+            if creation_date == mod_date or mod_date == 'Unknown':
+                checks['modification'] = {
                     "passed": True,
-                    "score": 15,
-                    "details": "Document is not encrypted"
+                    "score": 20,
+                    "details": f"No modifications detected ({revisions} revision(s))"
                 }
-                total_score += 15
+                total_score += 20
             else:
-                checks['encryption'] = {
+                checks['modification'] = {
                     "passed": False,
-                    "score": 0,
-                    "details": "Document is encrypted (suspicious)"
+                    "score": 10,
+                    "details": f"Document was modified after creation, {revisions} revision(s) (partial credit)"
                 }
+                total_score += 10
+        else:
+            checks['modification'] = {
+                "passed": True,
+                "score": 20,
+                "details": f"Cannot verify (no metadata), {revisions} revision(s)"
+            }
+            total_score += 20
 
+        # 7. Incremental Updates
+        max_score += 15
+        updates = structure["incremental_updates"]
+        if updates == 0:
+            checks['incremental_updates'] = {
+                "passed": True,
+                "score": 15,
+                "details": f"Single revision ({structure['xref_tables'] + structure['xref_streams']} xref section(s))"
+            }
+            total_score += 15
+        else:
+            checks['incremental_updates'] = {
+                "passed": False,
+                "score": 8,
+                "details": f"{updates} incremental update(s) appended after the original save (partial credit)"
+            }
+            total_score += 8
 
-
-            # 4. File Size Check
-            max_score += 10
-            f.seek(0, 2)
-            size_mb = f.tell() / (1024 * 1024)
-            if size_mb <= 10:
-                checks['file_size'] = {
+        # 8. Signature Integrity (only for signed documents)
+        if structure["signatures"]:
+            max_score += 20
+            if not structure["post_signature_edits"]:
+                checks['signature_integrity'] = {
                     "passed": True,
-                    "score": 10,
-                    "details": f"Reasonable file size: {round(size_mb, 2)} MB"
+                    "score": 20,
+                    "details": f"{len(structure['signatures'])} signature(s), no changes after signing"
                 }
-                total_score += 10
+                total_score += 20
             else:
-                checks['file_size'] = {
+                checks['signature_integrity'] = {
                     "passed": False,
                     "score": 0,
-                    "details": f"Unusually large file: {round(size_mb, 2)} MB"
+                    "details": "Document was modified after it was signed"
                 }
 
-            # 5. Metadata Check
-            max_score += 20
-            metadata = reader.metadata
-            if metadata:
-                creator = metadata.get('/Creator', 'Unknown')
-                suspicious_tools = ['photoshop', 'gimp', 'paint', 'canva', 'pixlr']
-
-                if not any(sus in creator.lower() for sus in suspicious_tools):
-                    checks['metadata'] = {
-                        "passed": True,
-                        "score": 20,
-                        "details": f"Creator software appears legitimate: {creator}"
-                    }
-                    total_score += 20
-                else:
-                    checks['metadata'] = {
-                        "passed": False,
-                        "score": 0,
-                        "details": f"Suspicious creator software detected: {creator}"
-                    }
-            else:
-                checks['metadata'] = {
-                    "passed": False,
-                    "score": 10,
-                    "details": "No metadata found (partial credit)"
-                }
-                total_score += 10
+        # 9. Embedded JavaScript
+        max_score += 15
+        if not structure["javascript"]:
+            checks['javascript'] = {
+                "passed": True,
+                "score": 15,
+                "details": "No embedded JavaScript"
+            }
+            total_score += 15
+        else:
+            checks['javascript'] = {
+                "passed": False,
+                "score": 0,
+                "details": f"Embedded JavaScript found ({structure['javascript']} reference(s), "
+                           f"{structure['auto_actions']} automatic action(s))"
+            }
 
-            # 6. Document Modification Check
-            max_score += 20
-            if metadata:
-                creation_date = metadata.get('/CreationDate', 'Unknown')
-                mod_date = metadata.get('/ModDate', 'Unknown')
-
-                if creation_date == mod_date or mod_date == 'Unknown':
-                    checks['modification'] = {
-                        "passed": True,
-                        "score": 20,
-                        "details": "No modifications detected"
-                    }
-                    total_score += 20
-                else:
-                    checks['modification'] = {
-                        "passed": False,
-                        "score": 10,
-                        "details": "Document was modified after creation (partial credit)"
-                    }
-                    total_score += 10
-            else:
-                checks['modification'] = {
-                    "passed": True,
-                    "score": 20,
-                    "details": "Cannot verify (no metadata)"
-                }
-                total_score += 20
+        # 10. Consistency Across Revisions
+        max_score += 10
+        producer_changes = structure["producer_changes"]
+        added_fonts = structure["fonts_added_in_updates"]
+        if not producer_changes and not added_fonts and structure["object_streams_in_updates"]:
+            # Fonts and producers compressed in the updates' object streams were not compared
+            checks['revision_consistency'] = {
+                "passed": True,
+                "score": 5,
+                "details": f"No changes found, but {structure['object_streams_in_updates']} object stream(s) "
+                           f"in later revisions could not be compared (partial credit)"
+            }
+            total_score += 5
+        elif not producer_changes and not added_fonts:
+            checks['revision_consistency'] = {
+                "passed": True,
+                "score": 10,
+                "details": "Producer and fonts consistent across revisions"
+            }
+            total_score += 10
+        else:
+            problems = [f"{key} changed: {' -> '.join(values)}" for key, values in producer_changes.items()]
+            if added_fonts:
+                problems.append(f"fonts added by later revisions: {', '.join(added_fonts[:5])}")
+            checks['revision_consistency'] = {
+                "passed": False,
+                "score": 0,
+                "details": "; ".join(problems)
+            }
+
+        structure["xref_entries"] = doc.xref_length()
+        structure["repaired"] = bool(doc.is_repaired)
 
     except Exception as e:
         return {
@@ -153,6 +265,9 @@ def verify_pdf_document(pdf_path: str) -> Dict[str, Any]:
             },
             "doc_type": "pdf"
         }
+    finally:
+        if own_doc and doc is not None:
+            doc.close()
 
     # Calculate overall score as percentage
     overall_score = int((total_score / max_score) * 100) if max_score > 0 else 0
@@ -171,6 +286,7 @@ def verify_pdf_document(pdf_path: str) -> Dict[str, Any]:
         "is_authentic": is_authentic,
         "confidence_level": confidence_level,
         "checks": checks,
+        "structure": structure,
         "doc_type": "pdf"
     }
 
@@ -208,6 +324,7 @@ def parse_date(date_str: str, formats: list = None) -> Optional[datetime]:
     return None
 
 
+@timed("verify_document")
 def verify_document(extracted_data: Dict[str, Any], doc_type: str = "cin") -> Dict[str, Any]:
     """
     Verify document authenticity based on extracted OCR data
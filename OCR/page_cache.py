@@ -0,0 +1,141 @@
+"""
+PDF Page Cache Module
+Caches extraction results per page, keyed by a hash of the page's content
+streams and resources, so revised documents only re-extract changed pages.
+"""
+import hashlib
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from cache_utils import LRUCache
+
+
+_REFERENCE = re.compile(r'(\d+) 0 R')
+# Embedded font programs: Type 1, TrueType, CFF/OpenType
+FONT_FILE_KEYS = ("FontFile", "FontFile2", "FontFile3")
+
+
+def _referenced_stream(doc, xref: int, key: str) -> bytes:
+    kind, value = doc.xref_get_key(xref, key)
+    if kind != "xref":
+        return b""
+    return doc.xref_stream_raw(int(value.split()[0])) or b""
+
+
+def font_digest(doc, xref: int) -> bytes:
+    """
+    Hash of what decides a font's extracted text: its encoding, ToUnicode CMap and
+    embedded font program(s), following the descendant fonts of Type0 fonts.
+    """
+    h = hashlib.sha256()
+    kind, value = doc.xref_get_key(xref, "Encoding")
+    h.update((doc.xref_object(int(value.split()[0])) if kind == "xref" else value).encode())
+    h.update(_referenced_stream(doc, xref, "ToUnicode"))
+
+    fonts = [xref]
+    kind, value = doc.xref_get_key(xref, "DescendantFonts")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]))
+    if kind in ("array", "xref"):
+        fonts += [int(ref) for ref in _REFERENCE.findall(value)]
+
+    for font in fonts:
+        kind, value = doc.xref_get_key(font, "FontDescriptor")
+        if kind == "xref":
+            descriptor = int(value.split()[0])
+            for key in FONT_FILE_KEYS:
+                h.update(_referenced_stream(doc, descriptor, key))
+    return h.digest()
+
+
+def page_fingerprint(doc, page, font_digests: Optional[Dict[int, bytes]] = None) -> str:
+    """
+    Hash everything that determines what a page extracts to: geometry, content
+    streams, images, form XObjects and fonts (including their ToUnicode maps and
+    embedded programs). Object numbers are left out so the same page hashes
+    identically in a different file.
+
+    font_digests: per-document memo of font_digest(), fonts are shared across pages
+    """
+    font_digests = {} if font_digests is None else font_digests
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+
+    for xref in page.get_contents():
+        h.update(doc.xref_stream_raw(xref) or b"")
+
+    for img in page.get_images(full=True):
+        h.update(repr(img[2:9]).encode())  # size, bpc, colorspace, name, filter
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+
+    for xobj in page.get_xobjects():
+        h.update(doc.xref_stream_raw(xobj[0]) or b"")
+
+    for font in page.get_fonts(full=True):
+        h.update(repr(font[1:5]).encode())  # ext, type, basefont, resource name
+        if font[0] not in font_digests:
+            font_digests[font[0]] = font_digest(doc, font[0])
+        h.update(font_digests[font[0]])
+
+    return h.hexdigest()
+
+
+def cache_key(fingerprint: str, kinds: Iterable[str]) -> str:
+    """Results depend on which content kinds were extracted (text excludes table regions)"""
+    return f"{fingerprint}:{'+'.join(sorted(kinds))}"
+
+
+def items_size(items: Any) -> int:
+    """Approximate memory of cached page items: the length of their strings (base64 images) and bytes"""
+    size, stack = 0, [items]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, (str, bytes, bytearray)):
+            size += len(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return size
+
+
+class PageCache:
+    """
+    Two-level page cache: an in-process LRU, bounded by entries and total bytes,
+    in front of an optional MongoDB collection shared by all workers.
+    """
+
+    def __init__(self, collection=None, max_entries: int = 512, max_bytes: Optional[int] = None):
+        self.collection = collection
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, sizeof=items_size)
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        items = self.memory.get(key)
+        if items is not None:
+            return items
+
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key}, {"items": 1})
+            except Exception as e:
+                print(f"Warning: page cache lookup failed: {e}")
+                doc = None
+            if doc:
+                self.memory.set(key, doc["items"])
+                return doc["items"]
+        return None
+
+    def put(self, key: str, items: List[dict]):
+        self.memory.set(key, items)
+
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "items": items, "created_at": datetime.utcnow()},
+                    upsert=True
+                )
+            except Exception as e:
+                # e.g. a single image-heavy page above the document size limit
+                print(f"Warning: could not persist page cache entry: {e}")
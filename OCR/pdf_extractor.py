@@ -1,65 +1,98 @@
-import fitz
 import re
 import base64
-from typing import Optional
-from io import BytesIO
+from typing import Iterable, List, Optional, Tuple, Union
 
+from OCR.page_cache import cache_key, page_fingerprint
+from OCR.text_normalizer import normalize_page
+from metrics import timed
 
-def merge_lines(text: str) -> str:
-    """Merge hyphenated lines and join paragraphs intelligently."""
-    lines = text.split('\n')
-    merged, buffer = [], ""
+_CELL_WHITESPACE = re.compile(r'\s+')
+_PAGE_RANGE = re.compile(r'^(\d+)?\s*(-)?\s*(\d+)?$')
 
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            if buffer:
-                merged.append(buffer)
-                buffer = ""
-            continue
-
-        is_section = re.match(r'^\d+(\.\d+)?\s+[A-ZÀ-Ý]', stripped)
-        is_list = re.match(r'^(—|\-|•|\d+\.)\s', stripped)
-        ends_sentence = buffer and buffer[-1] in '.!?:'
-
-        if not buffer:
-            buffer = stripped
-        elif is_section or is_list:
-            merged.append(buffer)
-            buffer = stripped
-        elif ends_sentence and stripped[0].isupper() and len(buffer) >= 60:
-            merged.append(buffer)
-            buffer = stripped
-        else:
-            buffer = buffer[:-1] + stripped if buffer.endswith('-') else buffer + " " + stripped
+# Content kinds that can be requested from extract_pdf
+CONTENT_KINDS = ("text", "tables", "images")
 
-    if buffer:
-        merged.append(buffer)
-    return '\n\n'.join(merged)
 
+# ----- PAGE RANGE / CONTENT FILTERS -----
+def parse_page_range(spec: Optional[str]) -> Optional[List[Tuple[int, Optional[int]]]]:
+    """
+    Parse a page range specification such as "1-3,7,10-" (1-based, inclusive)
 
-def clean_text(text: str) -> str:
-    """Clean extracted text."""
-    text = re.sub(r'\s*\.{3,}\s*', ' ', text)
-    text = re.sub(r'^\s*\d+\s*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\s+\d+\s*$', '', text, flags=re.MULTILINE)
-    text = merge_lines(text)
-    text = re.sub(r' {2,}', ' ', text)
-    return text.strip()
+    Returns:
+        List of (start, end) ranges, end is None for open ranges. None means all pages.
 
+    Raises:
+        ValueError: If the specification is malformed
+    """
+    if spec is None or not spec.strip():
+        return None
 
-def extract_tables(doc) -> list:
-    """Extract all tables from document."""
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        m = _PAGE_RANGE.match(part)
+        if not m or not (m.group(1) or m.group(3)):
+            raise ValueError(f"Invalid page range: '{part}'")
+        start = int(m.group(1)) if m.group(1) else 1
+        if m.group(2):
+            end = int(m.group(3)) if m.group(3) else None
+        else:
+            end = start
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"Invalid page range: '{part}'")
+        ranges.append((start, end))
+
+    if not ranges:
+        raise ValueError("Empty page range")
+    return ranges
+
+
+def resolve_pages(ranges: Optional[Iterable[Tuple[int, Optional[int]]]], total_pages: int) -> List[int]:
+    """Turn parsed page ranges into sorted 0-based page indices within the document."""
+    if ranges is None:
+        return list(range(total_pages))
+    indices = set()
+    for start, end in ranges:
+        last = total_pages if end is None else min(end, total_pages)
+        indices.update(range(start - 1, last))
+    return sorted(indices)
+
+
+def parse_content_filter(spec: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a content filter such as "text", "text,tables" or "all"
+
+    Raises:
+        ValueError: If an unknown content kind is requested
+    """
+    if spec is None or not spec.strip() or spec.strip().lower() == "all":
+        return CONTENT_KINDS
+
+    kinds = {k.strip().lower() for k in spec.split(',') if k.strip()}
+    unknown = kinds - set(CONTENT_KINDS)
+    if unknown or not kinds:
+        raise ValueError(f"Unknown content type(s): {', '.join(sorted(unknown)) or spec}. "
+                         f"Use any of: {', '.join(CONTENT_KINDS)}")
+    return tuple(k for k in CONTENT_KINDS if k in kinds)
+
+
+def extract_tables(doc, page_indices: Optional[List[int]] = None) -> list:
+    """Extract all tables from document (or only from the given 0-based pages)."""
     all_tables = []
-    for page_num, page in enumerate(doc):
+    if page_indices is None:
+        page_indices = range(len(doc))
+    for page_num in page_indices:
         try:
+            page = doc[page_num]
             for table in page.find_tables().tables:
                 raw = table.extract()
                 if not raw:
                     continue
                 cleaned = []
                 for row in raw:
-                    clean_row = [re.sub(r'\s+', ' ', re.sub(r'\n', ' ', str(c or ''))).strip() for c in row]
+                    clean_row = [_CELL_WHITESPACE.sub(' ', str(c or '')).strip() for c in row]
                     if any(clean_row):
                         cleaned.append(clean_row)
                 if cleaned:
@@ -75,13 +108,16 @@ def extract_tables(doc) -> list:
     return all_tables
 
 
-def extract_images(doc) -> list:
-    """Extract all images from document and convert to base64."""
+def extract_images(doc, page_indices: Optional[List[int]] = None) -> list:
+    """Extract all images from document (or only from the given 0-based pages) and convert to base64."""
     all_images = []
     image_counter = 0
+    if page_indices is None:
+        page_indices = range(len(doc))
 
-    for page_num, page in enumerate(doc):
+    for page_num in page_indices:
         try:
+            page = doc[page_num]
             image_list = page.get_images(full=True)
 
             for img_index, img in enumerate(image_list):
@@ -169,33 +205,123 @@ def get_text_blocks(page, table_bboxes: list, image_bboxes: list) -> list:
     return text_blocks
 
 
-def extract_pdf(file_bytes: bytes, filename: str) -> dict:
-    """Main extraction function - returns structured data with images."""
-    try:
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-    except Exception as e:
-        return {"error": f"Failed to open PDF: {str(e)}"}
+def open_pdf(pdf_source: Union[str, bytes, bytearray]):
+    """Open a PDF with PyMuPDF from a file path (read on demand) or from memory."""
+    import fitz  # imported on first use, keeps PyMuPDF out of the app's import time
+
+    if isinstance(pdf_source, str):
+        return fitz.open(pdf_source, filetype="pdf")
+    return fitz.open(stream=pdf_source, filetype="pdf")
+
+
+def _extract_page_items(page, kinds: set, tables_on_page: list, images_on_page: list) -> list:
+    """Build the ordered content items of one page (without table/image numbering)."""
+    table_bboxes = [t['bbox'] for t in tables_on_page]
+    image_bboxes = [img['bbox'] for img in images_on_page]
+
+    text_blocks = get_text_blocks(page, table_bboxes, image_bboxes) if "text" in kinds else []
+
+    # Merge content by position (text, tables, images)
+    content = [{'type': 'text', 'y_pos': tb['y_pos'], 'content': tb['text']} for tb in text_blocks]
+    content += [{'type': 'table', 'y_pos': t['y_pos'], 'data': t['data']} for t in tables_on_page]
+    content += [{'type': 'image', 'y_pos': img['y_pos'], 'data': img} for img in images_on_page]
+    content.sort(key=lambda x: x['y_pos'])
+
+    # Clean every text block of the page in a single pass
+    cleaned_blocks = iter(normalize_page([item['content'] for item in content if item['type'] == 'text']))
+
+    items = []
+    for item in content:
+        if item['type'] == 'text':
+            cleaned = next(cleaned_blocks)
+            if cleaned:
+                items.append({"type": "text", "value": cleaned})
+
+        elif item['type'] == 'table':
+            items.append({
+                "type": "table",
+                "headers": item['data'][0] if item['data'] else [],
+                "rows": item['data'][1:] if len(item['data']) > 1 else []
+            })
+
+        elif item['type'] == 'image':
+            items.append({
+                "type": "image",
+                "format": item['data']['format'],
+                "base64": item['data']['base64']
+            })
+
+    return items
+
+
+@timed("extract_pdf")
+def extract_pdf(pdf_source: Union[str, bytes, bytearray], filename: str, pages=None,
+                content: Optional[Iterable[str]] = None, doc=None, cache=None) -> dict:
+    """
+    Main extraction function - returns structured data with images.
+
+    Args:
+        pdf_source: Path to the PDF file or its raw bytes
+        filename: Original file name
+        pages: Page ranges from parse_page_range() (None = all pages)
+        content: Content kinds to extract, subset of CONTENT_KINDS (None = all).
+                 Pages and kinds that are not requested are never loaded.
+        doc: Already open PyMuPDF document to reuse; it is left open for the caller.
+        cache: Optional PageCache; pages whose content hash was seen before are
+               served from it and only the other pages are extracted.
+    """
+    own_doc = doc is None
+    if own_doc:
+        try:
+            doc = open_pdf(pdf_source)
+        except Exception as e:
+            return {"error": f"Failed to open PDF: {str(e)}"}
+
+    kinds = set(content) if content else set(CONTENT_KINDS)
+    page_indices = resolve_pages(pages, len(doc))
 
     result = {
         "filename": filename,
         "total_pages": len(doc),
+        "extracted_pages": [i + 1 for i in page_indices],
+        "content": [k for k in CONTENT_KINDS if k in kinds],
         "pages": [],
         "tables_count": 0,
         "images_count": 0,
-        "full_text": ""
+        "full_text": "",
+        "page_cache": {"hits": 0, "misses": len(page_indices)}
     }
 
     try:
-        # Extract all tables and images
         print(f"\n{'=' * 50}")
         print(f"Processing PDF: {filename}")
-        print(f"Total pages: {len(doc)}")
+        print(f"Total pages: {len(doc)} (extracting {len(page_indices)}: {', '.join(sorted(kinds))})")
         print(f"{'=' * 50}\n")
 
-        all_tables = extract_tables(doc)
+        # Look up unchanged pages in the cache
+        cached_items = {}
+        page_keys = {}
+        font_digests = {}
+        if cache is not None:
+            for page_num in page_indices:
+                try:
+                    page_keys[page_num] = cache_key(page_fingerprint(doc, doc[page_num], font_digests), kinds)
+                except Exception as e:
+                    print(f"Warning: Could not fingerprint page {page_num + 1}: {str(e)}")
+                    continue
+                items = cache.get(page_keys[page_num])
+                if items is not None:
+                    cached_items[page_num] = items
+            result["page_cache"] = {"hits": len(cached_items), "misses": len(page_indices) - len(cached_items)}
+            print(f"Page cache: {len(cached_items)} hits, {len(page_indices) - len(cached_items)} misses")
+
+        missed_pages = [i for i in page_indices if i not in cached_items]
+
+        # Extract tables and images of the pages that are not cached
+        all_tables = extract_tables(doc, missed_pages) if "tables" in kinds and missed_pages else []
         print(f"Tables found: {len(all_tables)}")
 
-        all_images = extract_images(doc)
+        all_images = extract_images(doc, missed_pages) if "images" in kinds and missed_pages else []
         print(f"Images found: {len(all_images)}")
 
         # Organize by page
@@ -211,38 +337,35 @@ def extract_pdf(file_bytes: bytes, filename: str) -> dict:
         table_counter = 0
         image_counter = 0
 
-        for page_num, page in enumerate(doc):
+        for page_num in page_indices:
             current_page = page_num + 1
-            tables_on_page = page_tables.get(current_page, [])
-            images_on_page = page_images.get(current_page, [])
-
-            table_bboxes = [t['bbox'] for t in tables_on_page]
-            image_bboxes = [img['bbox'] for img in images_on_page]
-
-            text_blocks = get_text_blocks(page, table_bboxes, image_bboxes)
 
-            # Merge content by position (text, tables, images)
-            content = [{'type': 'text', 'y_pos': tb['y_pos'], 'content': tb['text']} for tb in text_blocks]
-            content += [{'type': 'table', 'y_pos': t['y_pos'], 'data': t['data']} for t in tables_on_page]
-            content += [{'type': 'image', 'y_pos': img['y_pos'], 'data': img} for img in images_on_page]
-            content.sort(key=lambda x: x['y_pos'])
+            items = cached_items.get(page_num)
+            if items is None:
+                items = _extract_page_items(
+                    doc[page_num],
+                    kinds,
+                    page_tables.get(current_page, []),
+                    page_images.get(current_page, [])
+                )
+                if page_num in page_keys:
+                    cache.put(page_keys[page_num], items)
 
             page_data = {"page_number": current_page, "content": []}
 
-            for item in content:
+            for item in items:
                 if item['type'] == 'text':
-                    cleaned = clean_text(item['content'])
-                    if cleaned:
-                        page_data["content"].append({"type": "text", "value": cleaned})
-                        full_text_parts.append(cleaned)
+                    page_data["content"].append(dict(item))
+                    full_text_parts.append(item['value'])
 
                 elif item['type'] == 'table':
                     table_counter += 1
                     page_data["content"].append({
                         "type": "table",
                         "table_number": table_counter,
-                        "headers": item['data'][0] if item['data'] else [],
-                        "rows": item['data'][1:] if len(item['data']) > 1 else []
+                        "page": current_page,
+                        "headers": item['headers'],
+                        "rows": item['rows']
                     })
 
                 elif item['type'] == 'image':
@@ -250,13 +373,13 @@ def extract_pdf(file_bytes: bytes, filename: str) -> dict:
                     page_data["content"].append({
                         "type": "image",
                         "image_number": image_counter,
-                        "format": item['data']['format'],
-                        "base64": item['data']['base64']
+                        "page": current_page,
+                        "format": item['format'],
+                        "base64": item['base64']
                     })
 
             result["pages"].append(page_data)
-            print(
-                f"Page {current_page}: {len(text_blocks)} text blocks, {len(tables_on_page)} tables, {len(images_on_page)} images")
+            print(f"Page {current_page}: {len(items)} items{' (cached)' if page_num in cached_items else ''}")
 
         result["tables_count"] = table_counter
         result["images_count"] = image_counter
@@ -274,6 +397,7 @@ def extract_pdf(file_bytes: bytes, filename: str) -> dict:
         traceback.print_exc()
         result["error"] = str(e)
     finally:
-        doc.close()
+        if own_doc:
+            doc.close()
 
-    return result
\ No newline at end of file
+    return result
@@ -0,0 +1,200 @@
+"""
+PDF Forensics Module
+Structural tamper scan of raw PDF bytes: revisions, xref sections, signatures,
+embedded JavaScript and producer/font changes between revisions.
+
+Files are memory-mapped and only scanned with C-level searches, the object
+tree is never loaded. Objects compressed into object streams (/ObjStm) are not
+readable that way: scan_object_tree() covers them from an open PyMuPDF document,
+for the latest revision only.
+"""
+import mmap
+import re
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Union
+
+# Bytes read around markers when parsing the tail of each revision
+TAIL_WINDOW = 1024
+HEAD_WINDOW = 1024
+
+_EOF = b"%%EOF"
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s*$")
+_XREF_STREAM_OBJ = re.compile(rb"^\s*\d+\s+\d+\s+obj")
+_BYTE_RANGE = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+_JAVASCRIPT = re.compile(rb"/(?:JavaScript|JS)(?=[\s/<(\[])")
+_AUTO_ACTION = re.compile(rb"/(?:OpenAction|AA)(?=[\s/<\[])")
+_PRODUCER = re.compile(rb"/(Producer|Creator)\s*\(((?:[^()\\]|\\.){0,256})\)")
+_BASE_FONT = re.compile(rb"/BaseFont\s*/([^\s/\[\]<>(){}%]+)")
+_OBJECT_STREAM = re.compile(rb"/Type\s*/ObjStm(?=[\s/>])")
+
+
+@contextmanager
+def _open_buffer(pdf_source: Union[str, bytes, bytearray, memoryview]):
+    """Yield a read-only buffer over the PDF: the bytes themselves or an mmap of the file."""
+    if isinstance(pdf_source, memoryview):
+        # The scan needs find(): use the mmap (or bytes) behind a view over all of it,
+        # copy other views (in-memory upload buffers, below the spool threshold)
+        backing = pdf_source.obj
+        if isinstance(backing, (bytes, mmap.mmap)) and len(pdf_source) == len(backing):
+            yield backing
+        else:
+            yield pdf_source.tobytes()
+        return
+    if isinstance(pdf_source, (bytes, bytearray)):
+        yield pdf_source
+        return
+
+    with open(pdf_source, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b""  # empty file cannot be mapped
+            return
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+
+def _find_all(buf, needle: bytes) -> List[int]:
+    offsets = []
+    pos = buf.find(needle)
+    while pos != -1:
+        offsets.append(pos)
+        pos = buf.find(needle, pos + len(needle))
+    return offsets
+
+
+def _revision_of(offset: int, eof_offsets: List[int]) -> int:
+    """Index of the revision an object at this offset belongs to (0 = original file)."""
+    return min(bisect_left(eof_offsets, offset), max(len(eof_offsets) - 1, 0))
+
+
+def _strip_subset_tag(font: str) -> str:
+    """'ABCDEF+Arial-Bold' -> 'Arial-Bold'"""
+    return font.split("+", 1)[1] if len(font) > 7 and font[6] == "+" else font
+
+
+def scan_pdf_structure(pdf_source: Union[str, bytes, bytearray, memoryview]) -> Dict[str, Any]:
+    """
+    Scan the raw structure of a PDF for signs of tampering
+
+    Args:
+        pdf_source: Path to the PDF file (memory-mapped) or its raw bytes
+
+    Returns:
+        Dictionary with revision, xref, signature, JavaScript and consistency findings
+    """
+    with _open_buffer(pdf_source) as buf:
+        size = len(buf)
+        head = bytes(buf[:HEAD_WINDOW])
+        linearized = b"/Linearized" in head
+
+        # ----- Revisions: one %%EOF (and startxref) per incremental update -----
+        eof_offsets = _find_all(buf, _EOF)
+        xref_tables = 0
+        xref_streams = 0
+        for eof in eof_offsets:
+            tail = bytes(buf[max(0, eof - TAIL_WINDOW):eof])
+            m = _STARTXREF.search(tail)
+            if not m:
+                continue
+            xref_offset = int(m.group(1))
+            section = bytes(buf[xref_offset:xref_offset + 32]) if xref_offset < size else b""
+            if section.lstrip().startswith(b"xref"):
+                xref_tables += 1
+            elif _XREF_STREAM_OBJ.match(section):
+                xref_streams += 1
+
+        # A linearized file carries an extra first-page xref section and %%EOF
+        revisions = max(len(eof_offsets) - (1 if linearized and len(eof_offsets) > 1 else 0), 1)
+
+        # ----- Signatures: bytes written after the signed range are later edits -----
+        signatures = []
+        for m in _BYTE_RANGE.finditer(buf):
+            a, b, c, d = (int(g) for g in m.groups())
+            signed_end = c + d
+            later_revisions = sum(1 for eof in eof_offsets if eof > signed_end)
+            signatures.append({
+                "signed_bytes": b + d,
+                "signed_end": signed_end,
+                "covers_whole_file": signed_end >= size - 2,
+                "revisions_after_signature": later_revisions,
+            })
+
+        # ----- Object streams: their objects are compressed, invisible to the scans below -----
+        object_stream_offsets = [m.start() for m in _OBJECT_STREAM.finditer(buf)]
+
+        # ----- Active content -----
+        javascript = len(_JAVASCRIPT.findall(buf))
+        auto_actions = len(_AUTO_ACTION.findall(buf))
+
+        # ----- Producer / font consistency across revisions -----
+        revision_ends = eof_offsets[1:] if linearized and len(eof_offsets) > 1 else eof_offsets
+        producers = {}
+        for m in _PRODUCER.finditer(buf):
+            rev = _revision_of(m.start(), revision_ends)
+            value = m.group(2).decode("latin-1", "replace").strip()
+            if value:
+                producers.setdefault(m.group(1).decode(), {}).setdefault(rev, set()).add(value)
+
+        fonts_by_revision = {}
+        for m in _BASE_FONT.finditer(buf):
+            rev = _revision_of(m.start(), revision_ends)
+            font = _strip_subset_tag(m.group(1).decode("latin-1", "replace"))
+            fonts_by_revision.setdefault(rev, set()).add(font)
+
+    original_fonts = fonts_by_revision.get(0, set())
+    added_fonts = sorted({
+        font
+        for rev, fonts in fonts_by_revision.items() if rev > 0
+        for font in fonts - original_fonts
+    })
+    # Producer/Creator values written by later revisions that differ from the original
+    producer_changes = {}
+    for key, by_rev in producers.items():
+        later = set().union(*(values for rev, values in by_rev.items() if rev > 0))
+        if by_rev.get(0) and later - by_rev[0]:
+            producer_changes[key] = sorted(by_rev[0] | later)
+
+    return {
+        "file_size": size,
+        "linearized": linearized,
+        "eof_markers": len(eof_offsets),
+        "revisions": revisions,
+        "incremental_updates": revisions - 1,
+        "xref_tables": xref_tables,
+        "xref_streams": xref_streams,
+        "signatures": signatures,
+        "post_signature_edits": any(s["revisions_after_signature"] for s in signatures),
+        "javascript": javascript,
+        "auto_actions": auto_actions,
+        "producer_changes": producer_changes,
+        "fonts_added_in_updates": added_fonts,
+        "object_streams": len(object_stream_offsets),
+        "object_streams_in_updates": sum(1 for offset in object_stream_offsets
+                                         if _revision_of(offset, revision_ends) > 0),
+    }
+
+
+def scan_object_tree(doc) -> Dict[str, int]:
+    """
+    Count JavaScript and automatic actions in the objects as PyMuPDF resolves them,
+    including those compressed in object streams. Only the latest revision is visible.
+
+    Args:
+        doc: Open PyMuPDF document
+
+    Returns:
+        Dictionary with javascript and auto_actions counts
+    """
+    javascript = auto_actions = 0
+    for xref in range(1, doc.xref_length()):
+        try:
+            source = doc.xref_object(xref).encode("latin-1", "replace")
+        except Exception:  # free or broken entry
+            continue
+        javascript += len(_JAVASCRIPT.findall(source))
+        auto_actions += len(_AUTO_ACTION.findall(source))
+    return {"javascript": javascript, "auto_actions": auto_actions}
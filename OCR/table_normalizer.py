@@ -0,0 +1,248 @@
+"""
+Table Normalization Module
+Turns extracted tables (header row + string rows) into typed columns:
+header detection, Arabic/French digit and number formats, and date coercion.
+"""
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+# Arabic-Indic and Extended Arabic-Indic digits, Arabic decimal/thousands separators
+# (mapped to the French marks, so "٢٠٠٫٥٠٠" reads as 200,500 = 200.5 like DEFAULT_DECIMAL)
+_DIGIT_MAP = str.maketrans(
+    '٠١٢٣٤٥٦٧٨٩'
+    '۰۱۲۳۴۵۶۷۸۹'
+    '٫٬',
+    '0123456789' '0123456789' ',.'
+)
+
+# ----- PRECOMPILED PATTERNS -----
+# Currency and unit markers around amounts ("1 200,500 DT", "€ 45", "12 %", "د.ت")
+_AFFIXES = re.compile(r'^(?:€|\$|TND|DT|د\.ت)\s*|\s*(?:€|\$|TND|DT|د\.ت|%)$', re.IGNORECASE)
+# Thousands separators inside numbers: spaces, no-break and narrow no-break spaces, apostrophes
+_GROUP_SPACE = re.compile("(?<=\\d)[ \u00a0\u202f'](?=\\d{3}\\b)")
+_NUMBER = re.compile(r'^[+-]?\d+(?:[.,]\d+)*$')
+_SEPARATOR = re.compile(r'[.,]')
+_DIGITS = re.compile(r'^\d+$')
+_DATE_DMY = re.compile(r'^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$')
+_DATE_YMD = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+STRING, INTEGER, FLOAT, DATE = "string", "int", "float", "date"
+
+# Decimal mark of "200,500"-like amounts when nothing else decides: TND amounts
+# are written with three decimals (millimes) and a comma, "200,500 DT" is 200.5
+DEFAULT_DECIMAL = ","
+# A single separator followed by exactly three digits: "200,500" or "1.200"
+_AMBIGUOUS = "?"
+# Longer digit runs are identifiers (RIB, card numbers), not amounts: a float64 cannot
+# hold them exactly and beyond 18 digits an int64 cannot hold them at all
+MAX_NUMBER_DIGITS = 15
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def normalize_digits(value: str) -> str:
+    """Map Arabic-Indic digits and separators to ASCII."""
+    return value.translate(_DIGIT_MAP).strip()
+
+
+def _clean_number(value: str) -> str:
+    text = _AFFIXES.sub('', normalize_digits(value))
+    return _GROUP_SPACE.sub('', text)
+
+
+def _is_grouped(parts: List[str]) -> bool:
+    """Digit runs read as thousands groups: 1-3 leading digits (not a lone 0), then groups of three."""
+    head = parts[0].lstrip('+-')
+    return 1 <= len(head) <= 3 and head != "0" and all(len(p) == 3 for p in parts[1:])
+
+
+def _decimal_mark(text: str) -> Optional[str]:
+    """
+    Decimal mark of a cleaned-up number
+
+    Returns:
+        ',' or '.', '' for an integer, _AMBIGUOUS when a single separator is followed
+        by exactly three digits, None when the text is not a number
+    """
+    if not _NUMBER.match(text):
+        return None
+    seps = _SEPARATOR.findall(text)
+    if not seps:
+        return ''
+    parts = _SEPARATOR.split(text)
+    last, grouping = seps[-1], seps[:-1]
+
+    if len(set(seps)) == 2:
+        # "1.234,56" or "1,234.56": the last separator is the decimal mark and is used once
+        return last if last not in grouping and _is_grouped(parts[:-1]) else None
+    if grouping:
+        # Repeated separator: "1.234.567" groups thousands, "1.234.5" is not a number
+        return '' if _is_grouped(parts) else None
+    if len(parts[1]) == 3 and _is_grouped(parts):
+        return _AMBIGUOUS
+    # "12,5", "0,500" or "1200,500" (spaces already removed from "1 200,500")
+    return last
+
+
+def parse_number(value: str, decimal: str = DEFAULT_DECIMAL) -> Optional[float]:
+    """
+    Parse amounts in French ("1 234,56"), continental ("1.234,56") and English ("1,234.56") notation
+
+    Args:
+        value: Cell text
+        decimal: Decimal mark for a single separator followed by three digits ("200,500")
+
+    Returns:
+        int or float, None when the cell is not a number
+    """
+    text = _clean_number(value)
+    mark = _decimal_mark(text)
+    if mark is None:
+        return None
+    if mark == _AMBIGUOUS:
+        mark = decimal if decimal in text else ''
+    if not mark:
+        return int(_SEPARATOR.sub('', text))
+    whole, _, fraction = text.rpartition(mark)
+    return float(_SEPARATOR.sub('', whole) + '.' + fraction)
+
+
+def is_identifier(value: str) -> bool:
+    """
+    Digit strings that are codes rather than quantities: a leading zero ("01234567", a CIN)
+    or more than MAX_NUMBER_DIGITS digits ("10006000123456789013", a RIB). Amounts such as
+    "0,500" keep their separator and are not affected.
+    """
+    text = _clean_number(value)
+    if _DIGITS.match(text) and len(text) > 1 and text[0] == '0':
+        return True
+    return _NUMBER.match(text) is not None and sum(ch.isdigit() for ch in text) > MAX_NUMBER_DIGITS
+
+
+def column_decimal_mark(cells: List[str]) -> str:
+    """Decimal mark the unambiguous cells of a column agree on, DEFAULT_DECIMAL otherwise."""
+    marks = {_decimal_mark(_clean_number(c)) for c in cells if c} & {',', '.'}
+    return marks.pop() if len(marks) == 1 else DEFAULT_DECIMAL
+
+
+def parse_date(value: str) -> Optional[date]:
+    """Parse dd/mm/yyyy (also with '.' or '-') and ISO yyyy-mm-dd dates."""
+    text = normalize_digits(value)
+    m = _DATE_DMY.match(text)
+    if m:
+        day, month, year = (int(g) for g in m.groups())
+    else:
+        m = _DATE_YMD.match(text)
+        if not m:
+            return None
+        year, month, day = (int(g) for g in m.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _cell_kind(value: str) -> Optional[str]:
+    if not value:
+        return None
+    if parse_date(value) is not None:
+        return DATE
+    if is_identifier(value):
+        return STRING
+    number = parse_number(value)
+    if number is not None:
+        return INTEGER if isinstance(number, int) else FLOAT
+    return STRING
+
+
+def _looks_like_header(first_row: List[str], body: List[List[str]]) -> bool:
+    """
+    A header row is all text, and at least one column below it is typed
+    or the row has no empty cells and no repeated labels.
+    """
+    kinds = [_cell_kind(c) for c in first_row]
+    if any(k not in (STRING, None) for k in kinds):
+        return False
+    labels = [c for c in first_row if c]
+    if not labels:
+        return False
+    if not body:
+        return True
+
+    for col, kind in enumerate(kinds):
+        body_kinds = {_cell_kind(row[col]) for row in body if col < len(row)} - {None}
+        if kind == STRING and body_kinds and STRING not in body_kinds:
+            return True
+    return len(labels) == len(first_row) and len(set(labels)) == len(labels)
+
+
+def _column_names(header: List[str], width: int) -> List[str]:
+    """Fill blank labels and de-duplicate repeated ones."""
+    names, seen = [], {}
+    for i in range(width):
+        name = (header[i].strip() if i < len(header) else "") or f"column_{i + 1}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 1
+        names.append(name)
+    return names
+
+
+def _coerce_column(cells: List[str]) -> Tuple[str, List[Any]]:
+    """
+    Pick the narrowest type every non-empty cell parses as; empty cells become None.
+    A column with any identifier-like cell (see is_identifier) stays STRING, so codes keep
+    their leading zeros and never overflow the int64 export columns.
+    """
+    if any(cells):
+        dates = [parse_date(c) if c else None for c in cells]
+        if all(d is not None for d, c in zip(dates, cells) if c):
+            return DATE, dates
+
+        decimal = column_decimal_mark(cells)
+        numbers = [parse_number(c, decimal) if c else None for c in cells]
+        if (all(n is not None for n, c in zip(numbers, cells) if c)
+                and not any(is_identifier(c) for c in cells if c)
+                and all(INT64_MIN <= n <= INT64_MAX for n in numbers if isinstance(n, int))):
+            if all(isinstance(n, int) for n in numbers if n is not None):
+                return INTEGER, numbers
+            return FLOAT, [float(n) if n is not None else None for n in numbers]
+
+    return STRING, [normalize_digits(c) if c else None for c in cells]
+
+
+def normalize_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a stored table into typed columns
+
+    Args:
+        table: Table item with 'headers' and 'rows' (as stored by extract_pdf)
+
+    Returns:
+        Dictionary with table_number, page, column names, column types,
+        column-oriented data and row count
+    """
+    rows = [list(map(str, r)) for r in ([table.get("headers") or []] + (table.get("rows") or [])) if r]
+    header: List[str] = []
+    if rows and _looks_like_header(rows[0], rows[1:]):
+        header, rows = rows[0], rows[1:]
+
+    width = max([len(header)] + [len(r) for r in rows]) if (header or rows) else 0
+    names = _column_names(header, width)
+
+    types, data = [], {}
+    for col, name in enumerate(names):
+        dtype, values = _coerce_column([r[col].strip() if col < len(r) else "" for r in rows])
+        types.append(dtype)
+        data[name] = values
+
+    return {
+        "table_number": table.get("table_number"),
+        "page": table.get("page"),
+        "columns": names,
+        "types": types,
+        "data": data,
+        "row_count": len(rows),
+    }
@@ -0,0 +1,126 @@
+"""
+Text Normalization Module
+Cleans text extracted from PDFs one page at a time in a single line-oriented pass
+"""
+import re
+from typing import Iterable, List
+
+# Separator placed between the text blocks of a page while it is processed as one string
+_BLOCK_SEP = "\x00"
+
+# ----- PRECOMPILED PATTERNS -----
+_DOT_LEADERS = re.compile(r'\s*\.{3,}\s*')
+_MULTI_SPACE = re.compile(r' {2,}')
+
+# Numbered French sections ("1.2 Objet") and Arabic article headings ("الفصل 3")
+_SECTION = re.compile(r'^(?:\d+(?:\.\d+)?\s+[A-ZÀ-Ý]|(?:الفصل|الباب|المادة|البند)\s)')
+_LIST_ITEM = re.compile(r'^(?:—|-|•|\d+[.)]|[أبتثجحخدذرزسشصضطظعغفقكلمنهوي][.)-])\s')
+
+# Bidi control marks left behind by RTL text extraction
+_BIDI_MARKS = re.compile('[\u200e\u200f\u202a-\u202e\u2066-\u2069]')
+
+DIGITS = '0123456789' \
+         '\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669' \
+         '\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9'
+SENTENCE_END = '.!?:؟۔'
+HYPHENS = '-\u00ad'
+MIN_PARAGRAPH_LENGTH = 60
+
+
+def _is_arabic(char: str) -> bool:
+    return '\u0600' <= char <= '\u06FF'
+
+
+def _clean_line(line: str) -> str:
+    """Strip dot leaders, page numbers and trailing numbers from one line."""
+    stripped = line.strip()
+    if not stripped:
+        return stripped
+
+    if '...' in stripped:
+        stripped = _DOT_LEADERS.sub(' ', stripped).strip()
+
+    if stripped and stripped[-1] in DIGITS:
+        head = stripped.rstrip(DIGITS)
+        if not head:
+            return ''  # page number line
+        if head[-1].isspace():
+            stripped = head.rstrip()
+
+    if '  ' in stripped:
+        stripped = _MULTI_SPACE.sub(' ', stripped)
+    return stripped
+
+
+def _merge_paragraphs(lines: Iterable[str]) -> List[str]:
+    """Join stripped lines into paragraphs; an empty line always ends a paragraph."""
+    merged = []
+    buffer = []  # pieces of the current paragraph
+    length = 0
+
+    for stripped in lines:
+        if not stripped:
+            if buffer:
+                merged.append(''.join(buffer))
+                buffer, length = [], 0
+            continue
+
+        if not buffer:
+            buffer.append(stripped)
+            length = len(stripped)
+            continue
+
+        last = buffer[-1]
+        first = stripped[0]
+        if _SECTION.match(stripped) or _LIST_ITEM.match(stripped):
+            merged.append(''.join(buffer))
+            buffer, length = [stripped], len(stripped)
+        elif (last[-1] in SENTENCE_END and length >= MIN_PARAGRAPH_LENGTH
+              and (first.isupper() or _is_arabic(first))):
+            # Arabic has no case, so any Arabic letter may open a new sentence
+            merged.append(''.join(buffer))
+            buffer, length = [stripped], len(stripped)
+        elif last[-1] in HYPHENS and not (len(last) > 1 and _is_arabic(last[-2])):
+            # Latin hyphenation: drop the hyphen and glue the word back together.
+            # Arabic is never hyphenated, a trailing dash there is punctuation.
+            buffer[-1] = last[:-1]
+            buffer.append(stripped)
+            length += len(stripped) - 1
+        else:
+            buffer.append(' ')
+            buffer.append(stripped)
+            length += len(stripped) + 1
+
+    if buffer:
+        merged.append(''.join(buffer))
+    return merged
+
+
+def merge_lines(text: str) -> str:
+    """Merge hyphenated lines and join paragraphs intelligently."""
+    return '\n\n'.join(_merge_paragraphs(line.strip() for line in text.split('\n')))
+
+
+def normalize_page(blocks: List[str]) -> List[str]:
+    """
+    Clean all text blocks of a page in one pass
+
+    Args:
+        blocks: Raw text blocks in reading order
+
+    Returns:
+        Cleaned blocks, same length and order as the input (may contain empty strings)
+    """
+    if not blocks:
+        return []
+
+    text = _BIDI_MARKS.sub('', _BLOCK_SEP.join(b.replace(_BLOCK_SEP, '') for b in blocks))
+    return [
+        '\n\n'.join(_merge_paragraphs(map(_clean_line, block.split('\n'))))
+        for block in text.split(_BLOCK_SEP)
+    ]
+
+
+def clean_text(text: str) -> str:
+    """Clean a single block of extracted text."""
+    return normalize_page([text])[0]
@@ -1,17 +1,24 @@
+import re
+from typing import Optional
+
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi import Form
-from database import get_collection
-from auth_utils import hash_password, verify_password, create_access_token, get_current_user
+from database import get_async_collection, run_db
+from auth_utils import (hash_password_async, verify_and_update_password_async, password_slot,
+                        create_access_token, get_current_user, require_admin)
+from pagination import keyset_page, page_limit
+from stats_store import dashboard_stats
 from schemas import LoginSchema, RegisterSchema
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-users_col = get_collection("users")
-uploads_col = get_collection("uploads")
+# Awaitable collections; the sync paging helpers below use their .sync collection on the db pool
+users_col = get_async_collection("users")
+uploads_col = get_async_collection("uploads")
 
 
 # ----------------
@@ -38,22 +45,23 @@ async def register_page_post(
         )
 
     # Email uniqueness
-    if users_col.find_one({"email": email}):
+    if await users_col.find_one({"email": email}):
         return templates.TemplateResponse(
             "register.html",
             {"request": request, "error": "User already exists"}
         )
 
     # Username uniqueness
-    if users_col.find_one({"username": username}):
+    if await users_col.find_one({"username": username}):
         return templates.TemplateResponse(
             "register.html",
             {"request": request, "error": "Username already taken"}
         )
 
     # Hash password and save user
-    hashed_pw = hash_password(password)
-    users_col.insert_one({
+    async with password_slot():
+        hashed_pw = await hash_password_async(password)
+    await users_col.insert_one({
         "username": username,
         "email": email,
         "password": hashed_pw,
@@ -81,15 +89,24 @@ async def login_page_post(
     email: str = Form(...),
     password: str = Form(...)
 ):
-    user = users_col.find_one({"email": email})
+    user = await users_col.find_one({"email": email})
+
+    valid, new_hash = False, None
+    if user:
+        async with password_slot():
+            valid, new_hash = await verify_and_update_password_async(password, user["password"])
 
-    if not user or not verify_password(password, user["password"]):
+    if not valid:
         # Instead of raising HTTPException, return the template with an error
         return templates.TemplateResponse("login.html", {
             "request": request,
             "error": "Invalid email or password"
         })
 
+    # Hash made with an older bcrypt cost: store the upgraded one
+    if new_hash:
+        await users_col.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+
     # Create token
     token = create_access_token({
         "user_id": str(user["_id"]),
@@ -116,71 +133,184 @@ async def login_page_post(
 # ----------------
 
 from datetime import datetime, timedelta
-from collections import Counter
 
 @router.get("/admin", response_class=HTMLResponse)
 async def admin_home(request: Request, current_user: dict = Depends(get_current_user)):
     if current_user.get("role") != "admin":
         return RedirectResponse(url=f"/{current_user['username']}/dashboard")
 
-    # ------------------- USERS -------------------
-    users = list(users_col.find())
-    for u in users:
-        u["_id"] = str(u["_id"])
-
-    # ------------------- UPLOADS -------------------
-    uploads = list(uploads_col.find().sort("timestamp", -1))
-    for u in uploads:
-        u["_id"] = str(u["_id"])
-        u["username"] = u.get("username") or "Unknown"
-        u["filename"] = u.get("filename") or u.get("front_filename") or "N/A"
-        u["timestamp"] = u.get("timestamp").strftime("%Y-%m-%d %H:%M") if u.get("timestamp") else "N/A"
-
     # ------------------- STATS -------------------
-    total_users = len(users)
-    total_docs = len(uploads)
-
-    # ---------------- UPLOADS PER DAY ----------------
-    today = datetime.utcnow()
-    last_7_days = [(today - timedelta(days=i)).date() for i in range(6, -1, -1)]
-    uploads_per_day_counts = [
-        uploads_col.count_documents({
-            "timestamp": {"$gte": datetime.combine(day, datetime.min.time()),
-                          "$lt": datetime.combine(day, datetime.max.time())}
-        }) for day in last_7_days
-    ]
-    uploads_per_day_data = {
-        "labels": [day.strftime("%Y-%m-%d") for day in last_7_days],
-        "values": uploads_per_day_counts
-    }
-
-    # ---------------- UPLOADS BY DOCUMENT TYPE ----------------
-    doc_type_counter = Counter(d.get("doc_type", "Unknown") for d in uploads)
-    uploads_by_type_data = {
-        "labels": list(doc_type_counter.keys()),
-        "values": list(doc_type_counter.values())
-    }
-
-    # ---------------- TOP USERS ----------------
-    user_counter = Counter(d.get("username", "Unknown") for d in uploads)
-    top_users_list = user_counter.most_common(5)
-    top_users_data = {
-        "labels": [u[0] for u in top_users_list],
-        "values": [u[1] for u in top_users_list]
-    }
+    # Tables are filled page by page from /admin/api/users and /admin/api/uploads,
+    # charts come from the materialized stats buckets
+    total_users = await users_col.estimated_document_count()
+    stats = await run_db(dashboard_stats)
 
     return templates.TemplateResponse("admin_dashboard.html", {
         "request": request,
         "username": current_user["username"],
-        "users": users,
-        "uploads": uploads,
         "total_users": total_users,
-        "total_docs": total_docs,
-        "uploads_per_day": uploads_per_day_data,
-        "uploads_by_type": uploads_by_type_data,
-        "top_users": top_users_data
+        "total_docs": stats["total_docs"],
+        "uploads_per_day": stats["uploads_per_day"],
+        "uploads_by_type": stats["uploads_by_type"],
+        "top_users": stats["top_users"]
     })
 
+# ----------------
+# Admin JSON API
+# ----------------
+
+ADMIN_UPLOAD_PROJECTION = {
+    "username": 1, "doc_type": 1, "filename": 1, "front_filename": 1, "timestamp": 1,
+    "verification.overall_score": 1, "verification.confidence_level": 1
+}
+ADMIN_USER_PROJECTION = {"username": 1, "email": 1, "role": 1}  # never the password hash
+DASHBOARD_UPLOAD_PROJECTION = {
+    "doc_type": 1, "filename": 1, "front_filename": 1, "timestamp": 1, "verification.overall_score": 1
+}
+
+# Sort keys present on every document, so (key, _id) cursors stay valid
+ADMIN_UPLOAD_SORTS = ("timestamp", "username", "doc_type")
+ADMIN_USER_SORTS = ("username", "email", "role")
+
+
+def _contains(text: str) -> dict:
+    return {"$regex": re.escape(text), "$options": "i"}
+
+
+def _check_sort(sort: str, allowed: tuple, order: str) -> bool:
+    if sort not in allowed:
+        raise HTTPException(status_code=400, detail=f"Sort must be one of: {', '.join(allowed)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Order must be asc or desc")
+    return order == "desc"
+
+
+def admin_uploads_page(q: Optional[str] = None, doc_type: Optional[str] = None,
+                       username: Optional[str] = None, date_from: Optional[datetime] = None,
+                       date_to: Optional[datetime] = None, sort: str = "timestamp",
+                       order: str = "desc", cursor: Optional[str] = None,
+                       limit: Optional[int] = None) -> dict:
+    """One page of uploads for the admin views, summary fields only"""
+    descending = _check_sort(sort, ADMIN_UPLOAD_SORTS, order)
+    query = {}
+    if q:
+        query["$or"] = [{"filename": _contains(q)}, {"front_filename": _contains(q)},
+                        {"username": _contains(q)}]
+    if doc_type:
+        query["doc_type"] = doc_type
+    if username:
+        query["username"] = username
+    if date_from or date_to:
+        query["timestamp"] = {}
+        if date_from:
+            query["timestamp"]["$gte"] = date_from
+        if date_to:
+            query["timestamp"]["$lte"] = date_to
+
+    page = keyset_page(uploads_col.sync, query, ADMIN_UPLOAD_PROJECTION, sort, cursor,
+                       page_limit(limit), descending)
+    page["items"] = [{
+        "_id": str(u["_id"]),
+        "username": u.get("username") or "Unknown",
+        "doc_type": u.get("doc_type"),
+        "filename": u.get("filename") or u.get("front_filename") or "N/A",
+        "timestamp": u["timestamp"].strftime("%Y-%m-%d %H:%M") if u.get("timestamp") else "N/A",
+        "score": (u.get("verification") or {}).get("overall_score"),
+        "confidence": (u.get("verification") or {}).get("confidence_level"),
+    } for u in page["items"]]
+    return page
+
+
+def admin_users_page(q: Optional[str] = None, role: Optional[str] = None,
+                     sort: str = "username", order: str = "asc",
+                     cursor: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """One page of users for the admin views, without password hashes"""
+    descending = _check_sort(sort, ADMIN_USER_SORTS, order)
+    query = {}
+    if q:
+        query["$or"] = [{"username": _contains(q)}, {"email": _contains(q)}]
+    if role:
+        query["role"] = role
+
+    page = keyset_page(users_col.sync, query, ADMIN_USER_PROJECTION, sort, cursor,
+                       page_limit(limit), descending)
+    page["items"] = [{
+        "_id": str(u["_id"]),
+        "username": u.get("username"),
+        "email": u.get("email"),
+        "role": u.get("role", "user"),
+    } for u in page["items"]]
+    return page
+
+
+@router.get("/admin/api/uploads")
+async def admin_api_uploads(
+        q: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        username: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        sort: str = "timestamp",
+        order: str = "desc",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        current_user: dict = Depends(require_admin)
+):
+    return await run_db(admin_uploads_page, q, doc_type, username, date_from, date_to, sort, order, cursor, limit)
+
+
+ADMIN_TRACE_PROJECTION = {
+    "username": 1, "doc_type": 1, "filename": 1, "front_filename": 1, "timestamp": 1, "trace": 1
+}
+
+
+def _slowest_stage(trace: dict) -> Optional[str]:
+    stages = trace.get("stages") or {}
+    return max(stages, key=stages.get) if stages else None
+
+
+@router.get("/admin/api/slow-uploads")
+async def admin_api_slow_uploads(
+        hours: int = 24,
+        doc_type: Optional[str] = None,
+        limit: Optional[int] = None,
+        current_user: dict = Depends(require_admin)
+):
+    """The slowest uploads of the last `hours` hours, with their processing traces"""
+    query = {
+        "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=hours)},
+        "trace.total_ms": {"$exists": True}
+    }
+    if doc_type:
+        query["doc_type"] = doc_type
+
+    uploads = await uploads_col.find(query, ADMIN_TRACE_PROJECTION,
+                                     sort=[("trace.total_ms", -1)], limit=page_limit(limit))
+    return {"items": [{
+        "_id": str(u["_id"]),
+        "username": u.get("username") or "Unknown",
+        "doc_type": u.get("doc_type"),
+        "filename": u.get("filename") or u.get("front_filename") or "N/A",
+        "timestamp": u["timestamp"].strftime("%Y-%m-%d %H:%M") if u.get("timestamp") else "N/A",
+        "total_ms": u["trace"].get("total_ms"),
+        "slowest_stage": _slowest_stage(u["trace"]),
+        "trace": u["trace"],
+    } for u in uploads]}
+
+
+@router.get("/admin/api/users")
+async def admin_api_users(
+        q: Optional[str] = None,
+        role: Optional[str] = None,
+        sort: str = "username",
+        order: str = "asc",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        current_user: dict = Depends(require_admin)
+):
+    return await run_db(admin_users_page, q, role, sort, order, cursor, limit)
+
+
 # ----------------
 # User Dashboard
 # ----------------
@@ -195,13 +325,15 @@ async def user_dashboard(
     if current_user["username"] != username:
         raise HTTPException(status_code=403, detail="Access forbidden")
 
-    # Get user's upload history
-    user_uploads = list(uploads_col.find({"user_id": current_user["_id"]}))
+    # First page of the user's upload history, further pages come from /ocr/history
+    page = await run_db(keyset_page, uploads_col.sync, {"user_id": current_user["_id"]},
+                        DASHBOARD_UPLOAD_PROJECTION, "timestamp", None, page_limit(None))
 
     return templates.TemplateResponse("user_dashboard.html", {
         "request": request,
         "username": current_user["username"],
-        "uploads": user_uploads
+        "uploads": page["items"],
+        "next_cursor": page["next_cursor"]
     })
 
 
@@ -2,29 +2,81 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from fastapi import HTTPException, status, Request
+from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
 import hashlib
+import time
 
 from database import get_collection
 from bson import ObjectId
 from config import Config
+from cache_utils import LRUCache
+from metrics import busy, register_pool, register_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with a different cost than BCRYPT_ROUNDS are flagged for upgrade on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS
+)
 security = HTTPBearer(auto_error=False)
 
+# bcrypt is CPU-bound: run it off the event loop, on a bounded pool
+_hash_pool = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+register_pool("password_hash", Config.PASSWORD_HASH_WORKERS)
+_password_slots = asyncio.Semaphore(Config.LOGIN_CONCURRENCY)
+
 # ------------------------
 # Password hashing (SHA256 + bcrypt)
 # ------------------------
-def hash_password(password: str) -> str:
+def _prehash(password: str) -> str:
     # Pre-hash with SHA256 to avoid bcrypt 72-byte limit
-    sha = hashlib.sha256(password.encode()).hexdigest()
-    return pwd_context.hash(sha)
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def hash_password(password: str) -> str:
+    with busy("password_hash"):
+        return pwd_context.hash(_prehash(password))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    sha = hashlib.sha256(plain_password.encode()).hexdigest()
-    return pwd_context.verify(sha, hashed_password)
+    return pwd_context.verify(_prehash(plain_password), hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new hash or None when the stored hash is up to date)."""
+    with busy("password_hash"):
+        return pwd_context.verify_and_update(_prehash(plain_password), hashed_password)
+
+@asynccontextmanager
+async def password_slot():
+    """
+    Limit concurrent login/registration hashing to LOGIN_CONCURRENCY; callers waiting
+    longer than LOGIN_QUEUE_TIMEOUT get a 503 instead of piling up.
+    """
+    try:
+        await asyncio.wait_for(_password_slots.acquire(), timeout=Config.LOGIN_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts, please retry",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        yield
+    finally:
+        _password_slots.release()
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_pool, verify_and_update_password, plain_password, hashed_password
+    )
 
 # ------------------------
 # JWT token creation
@@ -36,13 +88,53 @@ def create_access_token(data: dict, expires_minutes: int = Config.ACCESS_TOKEN_E
     token = jwt.encode(to_encode, Config.SECRET_KEY, algorithm=Config.ALGORITHM)
     return token
 
+# ------------------------
+# Caches: decoded tokens and resolved users
+# ------------------------
+# Tokens are cached until they expire; users for USER_CACHE_TTL seconds, or until
+# invalidate_user is called after a change
+_token_cache = LRUCache(max_entries=Config.TOKEN_CACHE_SIZE)
+_user_cache = LRUCache(max_entries=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+register_cache("auth_tokens", _token_cache)
+register_cache("auth_users", _user_cache)
+
+# Never loaded into request handlers
+USER_PROJECTION = {"password": 0}
+
+
+def invalidate_user(user_id):
+    """Drop a cached user after it was modified or deleted."""
+    _user_cache.pop(str(user_id))
+
+
+def decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    try:
+        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    if not payload.get("user_id"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+
+    expires_in = payload["exp"] - time.time() if payload.get("exp") else None
+    if expires_in is None or expires_in > 0:
+        _token_cache.set(token, payload, ttl=expires_in)
+    return payload
+
+
 # ------------------------
 # JWT verification from cookie or header
 # ------------------------
-def get_current_user(
-        request: Request,
-        credentials: Optional[HTTPAuthorizationCredentials] = None
-):
+def _request_token(request: Request, credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     token = None
 
     # Try to get token from cookie first
@@ -59,29 +151,61 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated"
         )
+    return token
 
-    try:
-        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM])
-        user_id = payload.get("user_id")
-        if not user_id:
+
+def get_current_user(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = None
+):
+    payload = decode_token(_request_token(request, credentials))
+    user_id = payload["user_id"]
+
+    user = _user_cache.get(user_id)
+    if user is None:
+        users_col = get_collection("users")
+        user = users_col.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+        if not user:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
             )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
 
-    users_col = get_collection("users")
-    user = users_col.find_one({"_id": ObjectId(user_id)})
-    if not user:
+        # Convert ObjectId to string for easier handling
+        user["_id"] = str(user["_id"])
+        _user_cache.set(user_id, user)
+
+    # Handlers get their own copy, the cached entry stays untouched
+    return dict(user)
+
+
+def get_token_user(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = None
+):
+    """
+    For read-only routes: with TRUST_TOKEN_CLAIMS the user is built from the signed
+    token claims without a database lookup, so role changes and deletions only take
+    effect when the token expires. Otherwise same as get_current_user.
+    """
+    if not Config.TRUST_TOKEN_CLAIMS:
+        return get_current_user(request, credentials)
+
+    payload = decode_token(_request_token(request, credentials))
+    if not payload.get("username"):
+        return get_current_user(request, credentials)
+    return {
+        "_id": payload["user_id"],
+        "username": payload["username"],
+        "role": payload.get("role", "user")
+    }
+
+
+def require_admin(current_user: dict = Depends(get_current_user)):
+    """Dependency for admin-only routes and APIs."""
+    if current_user.get("role") != "admin":
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
         )
-
-    # Convert ObjectId to string for easier handling
-    user["_id"] = str(user["_id"])
-    return user
+    return current_user
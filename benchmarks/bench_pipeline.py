@@ -0,0 +1,214 @@
+"""
+Benchmark of the document pipelines on synthetic Tunisian documents (CPU only)
+Measures latency percentiles and throughput of pipeline() for CIN and passport images,
+extract_pdf(), verify_document(), verify_pdf_document() and render_pdf_inline().
+
+run with:   python -m benchmarks.bench_pipeline [--iterations 20] [--skip-ocr] [--output results.json]
+compare:    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json [--tolerance 0.15]
+
+A run compared against a baseline exits with status 1 when a case's p50 or p95 latency
+grew by more than the tolerance. Save a run with --output to make it the new baseline.
+"""
+import os
+
+# CPU only: set before torch is imported
+os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from benchmarks import synthetic
+
+PERCENTILES = (50, 90, 95, 99)
+COMPARED = ("p50_ms", "p95_ms")
+
+
+# ----- MEASUREMENT -----
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def summarize(timings: List[float], wall: float) -> Dict[str, float]:
+    ordered = sorted(timings)
+    summary = {
+        "iterations": len(timings),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = round(percentile(ordered, q) * 1000, 3)
+    summary["throughput_per_s"] = round(len(timings) / wall, 3) if wall else 0.0
+    return summary
+
+
+def measure(fn: Callable[[Any], Any], inputs: list, iterations: int, warmup: int) -> Dict[str, float]:
+    """Call fn on the inputs round-robin; warm-up calls are not counted"""
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, time.perf_counter() - started)
+
+
+# ----- CASES -----
+def build_cases(rng: random.Random, args) -> Dict[str, tuple]:
+    """name -> (function, inputs); documents are generated up front, outside the timings"""
+    from OCR.EasyOCR import pipeline
+    from OCR.Verify_document import verify_document, verify_pdf_document
+    from OCR.pdf_extractor import extract_pdf
+    from pdf_utils import render_pdf_inline
+
+    cins = [synthetic.make_cin(rng) for _ in range(args.documents)]
+    passports = [synthetic.make_passport(rng) for _ in range(args.documents)]
+    pdfs = [synthetic.make_pdf(rng, pages=args.pdf_pages) for _ in range(args.documents)]
+    contents = [synthetic.render_content(rng) for _ in range(args.documents)]
+
+    cases = {}
+    if not args.skip_ocr:
+        cases["pipeline_cin"] = (
+            lambda doc: pipeline(front_img=doc[0], back_img=doc[1], doc_type="cin"), cins)
+        cases["pipeline_passport"] = (
+            lambda doc: pipeline(front_img=doc[0], doc_type="passport"), passports)
+    cases["extract_pdf"] = (lambda pdf: extract_pdf(pdf, "synthetic.pdf"), pdfs)
+    cases["verify_pdf_document"] = (verify_pdf_document, pdfs)
+    cases["verify_document_cin"] = (
+        lambda data: verify_document(data, "cin"), [synthetic.cin_extracted_data(c[2]) for c in cins])
+    cases["verify_document_passport"] = (
+        lambda data: verify_document(data, "passport"), [synthetic.passport_extracted_data(p[1]) for p in passports])
+    cases["render_pdf_inline"] = (lambda content: render_pdf_inline(content).getvalue(), contents)
+    return cases
+
+
+def environment(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    versions = {}
+    for module in ("numpy", "cv2", "fitz", "reportlab", "PIL", "torch", "easyocr"):
+        if module in sys.modules:
+            versions[module] = getattr(sys.modules[module], "__version__", None)
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "threads": args.threads,
+        "seed": args.seed,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "documents": args.documents,
+        "pdf_pages": args.pdf_pages,
+        "arabic_font": synthetic.font_path() or None,
+        "versions": versions,
+    }
+
+
+# ----- BASELINE COMPARISON -----
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Cases whose compared latencies grew by more than tolerance (0.15 = +15%)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in COMPARED:
+            if not previous.get(metric):
+                continue
+            ratio = current[metric] / previous[metric]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} {metric}: {previous[metric]:.1f} -> {current[metric]:.1f} ms "
+                                   f"(+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run(args) -> int:
+    if args.threads:
+        os.environ.setdefault("OMP_NUM_THREADS", str(args.threads))
+        import cv2
+        cv2.setNumThreads(args.threads)
+
+    rng = random.Random(args.seed)
+    cases = build_cases(rng, args)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if name in args.only}
+
+    meta = environment(args)
+    if not args.skip_ocr and any(name.startswith("pipeline") for name in cases):
+        # Model loading is a one-off per worker, kept out of the per-document latencies
+        from OCR.EasyOCR import get_reader
+        start = time.perf_counter()
+        get_reader()
+        meta["easyocr_load_s"] = round(time.perf_counter() - start, 2)
+        if args.threads:
+            import torch
+            torch.set_num_threads(args.threads)
+        meta["versions"] = environment(args)["versions"]
+
+    results = {}
+    for name, (fn, inputs) in cases.items():
+        results[name] = measure(fn, inputs, args.iterations, args.warmup)
+        r = results[name]
+        print(f"  {name:<26} p50 {r['p50_ms']:>9.1f} ms  p95 {r['p95_ms']:>9.1f} ms  "
+              f"p99 {r['p99_ms']:>9.1f} ms  {r['throughput_per_s']:>8.2f}/s")
+
+    report = {"meta": meta, "results": results}
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("processor") != meta["processor"] or \
+                baseline.get("meta", {}).get("cpu_count") != meta["cpu_count"]:
+            print("Warning: baseline was recorded on different hardware")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--documents", type=int, default=5, help="distinct synthetic documents per case")
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threads", type=int, default=1, help="CPU threads for torch/OpenCV (0 = library default)")
+    parser.add_argument("--skip-ocr", action="store_true", help="skip the EasyOCR pipelines (no model download)")
+    parser.add_argument("--only", nargs="+", help="run only these cases")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""
+Microbenchmark: legacy per-block clean_text vs page-level normalize_page
+
+run with: python -m benchmarks.bench_text_normalizer [--pages 80] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from OCR.text_normalizer import normalize_page
+
+
+# ----- LEGACY IMPLEMENTATION (reference copy) -----
+def legacy_merge_lines(text: str) -> str:
+    lines = text.split('\n')
+    merged, buffer = [], ""
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if buffer:
+                merged.append(buffer)
+                buffer = ""
+            continue
+
+        is_section = re.match(r'^\d+(\.\d+)?\s+[A-ZÀ-Ý]', stripped)
+        is_list = re.match(r'^(—|\-|•|\d+\.)\s', stripped)
+        ends_sentence = buffer and buffer[-1] in '.!?:'
+
+        if not buffer:
+            buffer = stripped
+        elif is_section or is_list:
+            merged.append(buffer)
+            buffer = stripped
+        elif ends_sentence and stripped[0].isupper() and len(buffer) >= 60:
+            merged.append(buffer)
+            buffer = stripped
+        else:
+            buffer = buffer[:-1] + stripped if buffer.endswith('-') else buffer + " " + stripped
+
+    if buffer:
+        merged.append(buffer)
+    return '\n\n'.join(merged)
+
+
+def legacy_clean_text(text: str) -> str:
+    text = re.sub(r'\s*\.{3,}\s*', ' ', text)
+    text = re.sub(r'^\s*\d+\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+\d+\s*$', '', text, flags=re.MULTILINE)
+    text = legacy_merge_lines(text)
+    text = re.sub(r' {2,}', ' ', text)
+    return text.strip()
+
+
+# ----- SYNTHETIC CONTRACT -----
+FRENCH_WORDS = ("contrat", "location", "partie", "bailleur", "preneur", "loyer", "mensuel",
+                "conformément", "dispositions", "article", "résiliation", "préavis", "signature")
+ARABIC_WORDS = ("العقد", "الطرف", "الأول", "الثاني", "الكراء", "الشهري", "طبقا", "لأحكام",
+                "الفسخ", "الإمضاء", "تونس", "المؤجر", "المتسوغ")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(words) for _ in range(rng.randint(8, 16)))
+
+
+def make_page_blocks(rng, blocks_per_page=30):
+    """Build the raw text blocks PyMuPDF would return for a contract page."""
+    blocks = []
+    for i in range(blocks_per_page):
+        words = ARABIC_WORDS if i % 3 == 0 else FRENCH_WORDS
+        lines = []
+        if i % 7 == 0:
+            lines.append(f"{i // 7 + 1}.1 Objet du contrat")
+        for _ in range(rng.randint(3, 8)):
+            line = _sentence(rng, words)
+            if rng.random() < 0.2:
+                line += "-"
+            elif rng.random() < 0.3:
+                line = line.capitalize() + "."
+            lines.append(line)
+        if i % 10 == 0:
+            lines.append("Sommaire ........................ 12")
+        blocks.append("\n".join(lines))
+    blocks.append(str(rng.randint(1, 80)))  # page number footer
+    return blocks
+
+
+def run(pages: int, repeat: int, seed: int = 42):
+    rng = random.Random(seed)
+    document = [make_page_blocks(rng) for _ in range(pages)]
+    total_chars = sum(len(b) for page in document for b in page)
+
+    def legacy():
+        for page in document:
+            for block in page:
+                legacy_clean_text(block)
+
+    def page_level():
+        for page in document:
+            normalize_page(page)
+
+    results = {}
+    for name, fn in (("legacy_per_block", legacy), ("normalize_page", page_level)):
+        fn()  # warm-up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results[name] = {"best_s": round(best, 4), "mb_per_s": round(total_chars / best / 1e6, 2)}
+
+    speedup = results["legacy_per_block"]["best_s"] / results["normalize_page"]["best_s"]
+    print(f"Document: {pages} pages, {total_chars / 1e6:.2f} M chars")
+    for name, r in results.items():
+        print(f"  {name:<18} best {r['best_s']:.4f}s  ({r['mb_per_s']} MB/s)")
+    print(f"  speedup: x{speedup:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.pages, args.repeat)
@@ -0,0 +1,398 @@
+"""
+End-to-end load test of the FastAPI app against an in-memory MongoDB stand-in (mongomock)
+Replays a weighted mix of CIN, passport and PDF uploads, history and export requests at a
+target concurrency, and reports p50/p95/p99 latency, throughput, error rate and peak RSS
+per endpoint.
+
+run with:   python -m benchmarks.load_test [--mode inprocess|uvicorn] [--concurrency 8]
+                                          [--requests 200 | --duration 60] [--mix pdf=2,history=4,export=2]
+                                          [--output load.json]
+
+inprocess drives main:app through httpx's ASGI transport in this process (client and app
+share one event loop, so OCR blocks both); uvicorn starts `uvicorn main:app` on localhost
+in a child process and measures it over real sockets. CIN and passport requests run
+EasyOCR: leave them out of --mix to test without the OCR models.
+"""
+import os
+
+# Mongo stand-in for this process and the uvicorn child: set before main/database are imported
+os.environ["MONGO_URI"] = "mongomock://"
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import synthetic
+from benchmarks.bench_pipeline import summarize
+
+DEFAULT_MIX = "cin=1,passport=1,pdf=2,history=4,export=2"
+EXPORT_FORMATS = ("json", "csv", "pdf")
+# Inserted straight into the mongomock users collection, signed in with a token from create_access_token
+USER = {"_id": "64b0000000000000000000aa", "username": "loadtest", "email": "loadtest@example.com", "role": "user"}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (use {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ----- PAYLOADS -----
+def _png(img) -> bytes:
+    out = BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+class Payloads:
+    """Synthetic documents generated once, reused round-robin by the requests"""
+
+    def __init__(self, rng: random.Random, mix: Dict[str, float], documents: int, pdf_pages: int):
+        self.rng = rng
+        self.cins = [tuple(_png(img) for img in synthetic.make_cin(rng)[:2]) for _ in range(documents)] \
+            if "cin" in mix else []
+        self.passports = [_png(synthetic.make_passport(rng)[0]) for _ in range(documents)] \
+            if "passport" in mix else []
+        self.pdfs = [synthetic.make_pdf(rng, pages=pdf_pages) for _ in range(documents)]
+        self.record_ids: List[str] = []
+
+    def pick(self, items):
+        return items[self.rng.randrange(len(items))]
+
+
+# ----- REQUESTS -----
+async def request_cin(client: httpx.AsyncClient, payloads: Payloads) -> httpx.Response:
+    front, back = payloads.pick(payloads.cins)
+    response = await client.post("/ocr/upload/cin", files={
+        "front": ("front.png", front, "image/png"), "back": ("back.png", back, "image/png")})
+    _remember(payloads, response)
+    return response
+
+
+async def request_passport(client: httpx.AsyncClient, payloads: Payloads) -> httpx.Response:
+    response = await client.post("/ocr/upload/passport", files={
+        "file": ("passport.png", payloads.pick(payloads.passports), "image/png")})
+    _remember(payloads, response)
+    return response
+
+
+async def request_pdf(client: httpx.AsyncClient, payloads: Payloads) -> httpx.Response:
+    response = await client.post("/ocr/upload/pdf", files={
+        "file": ("contract.pdf", payloads.pick(payloads.pdfs), "application/pdf")})
+    _remember(payloads, response)
+    return response
+
+
+async def request_history(client: httpx.AsyncClient, payloads: Payloads) -> httpx.Response:
+    return await client.get("/ocr/history", params={"limit": 20})
+
+
+async def request_export(client: httpx.AsyncClient, payloads: Payloads) -> httpx.Response:
+    fmt = payloads.rng.choice(EXPORT_FORMATS)
+    if not payloads.record_ids:
+        return await client.get("/ocr/export-bulk/csv")
+    return await client.get(f"/ocr/export/{payloads.pick(payloads.record_ids)}/{fmt}")
+
+
+def _remember(payloads: Payloads, response: httpx.Response):
+    if response.status_code == 200:
+        record_id = response.json().get("record_id")
+        if record_id:
+            payloads.record_ids.append(record_id)
+
+
+ENDPOINTS = {
+    "cin": request_cin,
+    "passport": request_passport,
+    "pdf": request_pdf,
+    "history": request_history,
+    "export": request_export,
+}
+
+
+# ----- MEMORY -----
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Current resident set size of a process (Linux /proc), None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler(threading.Thread):
+    """Samples the server's RSS; every endpoint with requests in flight is charged the sample"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.peak: Dict[str, float] = defaultdict(float)
+        self.overall = 0.0
+        # Not _stop: threading.Thread uses that name internally (is_alive, join)
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            rss = read_rss_mb(self.pid)
+            if rss is None:
+                continue
+            self.overall = max(self.overall, rss)
+            for name, count in list(self.in_flight.items()):
+                if count:
+                    self.peak[name] = max(self.peak[name], rss)
+
+    def stop(self):
+        self._halt.set()
+
+
+# ----- SERVER -----
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_uvicorn(args):
+    port = args.port or _free_port()
+    # The child seeds the load-test user into its own mongomock database, then serves main:app
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--serve", "--port", str(port)],
+        env=dict(os.environ)
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    async with httpx.AsyncClient(base_url=base_url) as probe:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with status {process.returncode}")
+            try:
+                await probe.get("/metrics")
+                return process, httpx.AsyncClient(base_url=base_url, timeout=args.timeout)
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    process.terminate()
+    raise SystemExit("uvicorn did not start in time")
+
+
+def serve(port: int):
+    """uvicorn mode child: uvicorn main:app on localhost with the load-test user in place"""
+    import uvicorn
+    seed_user()
+    uvicorn.run("main:app", host="127.0.0.1", port=port, workers=1, log_level="warning")
+
+
+async def start_inprocess(args):
+    import main
+    seed_user()
+    for handler in main.app.router.on_startup:
+        await handler()
+    transport = httpx.ASGITransport(app=main.app)
+    return main, httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+
+
+async def stop_inprocess(main_module):
+    for handler in main_module.app.router.on_shutdown:
+        await handler()
+
+
+def seed_user():
+    """Insert the load-test user into this process's mongomock database"""
+    from bson import ObjectId
+    from database import get_collection
+    user = {k: v for k, v in USER.items() if k != "_id"}
+    get_collection("users").update_one({"_id": ObjectId(USER["_id"])}, {"$set": user}, upsert=True)
+
+
+def login(client: httpx.AsyncClient):
+    """Sign the client in as the seeded user (the login and register pages are not involved)"""
+    from auth_utils import create_access_token
+    token = create_access_token({"user_id": USER["_id"], "username": USER["username"], "role": USER["role"]})
+    client.cookies.set("access_token", f"Bearer {token}")
+
+
+# ----- RUN -----
+async def run_load(client: httpx.AsyncClient, payloads: Payloads, mix: Dict[str, float], args,
+                   sampler: Optional[RssSampler]) -> Dict[str, Any]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    remaining = [args.requests]
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def next_request() -> Optional[str]:
+        if deadline is not None:
+            return payloads.rng.choices(names, weights)[0] if time.monotonic() < deadline else None
+        if remaining[0] <= 0:
+            return None
+        remaining[0] -= 1
+        return payloads.rng.choices(names, weights)[0]
+
+    async def worker():
+        while True:
+            name = next_request()
+            if name is None:
+                return
+            if sampler:
+                sampler.in_flight[name] += 1
+            start = time.perf_counter()
+            try:
+                response = await ENDPOINTS[name](client, payloads)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finally:
+                if sampler:
+                    sampler.in_flight[name] -= 1
+            timings[name].append(time.perf_counter() - start)
+            statuses[name][str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        if not timings[name]:
+            continue
+        summary = summarize(timings[name], wall)
+        summary["errors"] = errors[name]
+        summary["error_rate"] = round(errors[name] / len(timings[name]), 4)
+        summary["statuses"] = dict(statuses[name])
+        if sampler:
+            summary["peak_rss_mb"] = round(sampler.peak[name], 1) or None
+        endpoints[name] = summary
+
+    all_timings = [t for name in names for t in timings[name]]
+    overall = summarize(all_timings, wall) if all_timings else {}
+    overall["errors"] = sum(errors.values())
+    overall["error_rate"] = round(overall["errors"] / len(all_timings), 4) if all_timings else 0.0
+    overall["wall_s"] = round(wall, 2)
+    return {"endpoints": endpoints, "overall": overall}
+
+
+async def main_async(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    payloads = Payloads(rng, mix, args.documents, args.pdf_pages)
+
+    if args.mode == "uvicorn":
+        process, client = await start_uvicorn(args)
+        server_pid, app_module = process.pid, None
+    else:
+        process = None
+        app_module, client = await start_inprocess(args)
+        server_pid = os.getpid()
+
+    sampler = RssSampler(server_pid) if read_rss_mb(server_pid) is not None else None
+    try:
+        login(client)
+        # A few PDFs first, so history and export have records from the start
+        for _ in range(args.seed_records):
+            await request_pdf(client, payloads)
+
+        if sampler:
+            sampler.start()
+        result = await run_load(client, payloads, mix, args, sampler)
+    finally:
+        if sampler:
+            sampler.stop()
+            if sampler.is_alive():
+                sampler.join()
+        await client.aclose()
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        elif app_module is not None:
+            await stop_inprocess(app_module)
+
+    if sampler:
+        result["overall"]["peak_rss_mb"] = round(sampler.overall, 1)
+    else:
+        # No /proc: peak of this process (inprocess) or of the finished uvicorn child
+        who = resource.RUSAGE_CHILDREN if process is not None else resource.RUSAGE_SELF
+        maxrss = resource.getrusage(who).ru_maxrss
+        result["overall"]["peak_rss_mb"] = round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    result["meta"] = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "requests": None if args.duration else args.requests,
+        "duration_s": args.duration,
+        "mix": mix,
+        "seed": args.seed,
+        "seed_records": args.seed_records,
+        "cpu_count": os.cpu_count(),
+    }
+    return result
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"{'endpoint':<10} {'count':>6} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>7} {'peak MB':>8}")
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, r in rows:
+        if not r.get("iterations"):
+            continue
+        print(f"{name:<10} {r['iterations']:>6} {r['error_rate'] * 100:>6.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['throughput_per_s']:>7.2f} "
+              f"{(r.get('peak_rss_mb') or 0):>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights, default {DEFAULT_MIX}")
+    parser.add_argument("--documents", type=int, default=5, help="distinct synthetic documents per kind")
+    parser.add_argument("--pdf-pages", type=int, default=3)
+    parser.add_argument("--seed-records", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout in seconds")
+    parser.add_argument("--port", type=int, default=0, help="uvicorn port (default: a free one)")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)  # uvicorn mode child
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        sys.exit(0)
+
+    result = asyncio.run(main_async(args))
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,379 @@
+"""
+Synthetic Tunisian documents for benchmarks
+CIN front/back and passport images drawn with PIL (Arabic shaped with arabic_reshaper
+and python-bidi, passports with a valid TD3 MRZ), multi-page PDFs with text, ruled
+tables and images built with ReportLab, and extracted-data dicts for verify_document.
+
+Everything is derived from a random.Random, so a seed always gives the same documents.
+Arabic glyphs need a TTF font with Arabic coverage: BENCH_FONT_PATH, PDF_FONT_PATH or
+DejaVu Sans; without one the text is drawn with PIL's default font.
+"""
+import os
+import random
+from functools import lru_cache
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Image as PdfImage, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from config import Config
+
+try:
+    import arabic_reshaper
+except ImportError:  # optional, Arabic is drawn unshaped without it
+    arabic_reshaper = None
+
+try:
+    from bidi.algorithm import get_display
+except ImportError:  # optional, Arabic is drawn in logical order without it
+    get_display = None
+
+FONT_CANDIDATES = (
+    os.getenv("BENCH_FONT_PATH", ""),
+    Config.PDF_FONT_PATH,
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+FAMILY_NAMES = ("الطرابلسي", "بن علي", "الجلاصي", "المرزوقي", "الحمامي", "السويسي", "القروي", "الشابي")
+GIVEN_NAMES = ("محمد", "أحمد", "فاطمة", "مريم", "يوسف", "سارة", "خالد", "ليلى")
+FAMILY_LATIN = ("TRABELSI", "BENALI", "JELASSI", "MARZOUKI", "HAMMAMI", "SOUISSI", "KAROUI", "CHEBBI")
+GIVEN_LATIN = ("MOHAMED", "AHMED", "FATMA", "MERIEM", "YOUSSEF", "SARRA", "KHALED", "LEILA")
+PLACES = ("تونس", "صفاقس", "سوسة", "القيروان", "بنزرت", "قابس")
+PROFESSIONS = ("مهندس", "طبيب", "استاذ", "تاجر", "موظف")
+STREETS = ("نهج الحرية", "شارع الحبيب بورقيبة", "نهج ابن خلدون", "شارع فرحات حشاد")
+ARABIC_MONTHS = ("جانفي", "فيفري", "مارس", "أفريل", "ماي", "جوان",
+                 "جويلية", "أوت", "سبتمبر", "أكتوبر", "نوفمبر", "ديسمبر")
+FRENCH_WORDS = ("contrat", "location", "partie", "bailleur", "preneur", "loyer", "mensuel",
+                "conformément", "dispositions", "article", "résiliation", "préavis", "signature")
+ARABIC_WORDS = ("العقد", "الطرف", "الأول", "الثاني", "الكراء", "الشهري", "طبقا", "لأحكام",
+                "الفسخ", "الإمضاء", "تونس", "المؤجر", "المتسوغ")
+
+CIN_SIZE = (1012, 638)        # 85.6 x 54 mm at 300 dpi
+PASSPORT_SIZE = (1250, 880)   # data page of a TD3 passport at 300 dpi
+
+
+# ----- TEXT AND FONTS -----
+def shape(text: str) -> str:
+    """Arabic in visual order with joined letter forms, as printed on the card"""
+    if arabic_reshaper is not None:
+        text = arabic_reshaper.reshape(text)
+    if get_display is not None:
+        text = get_display(text)
+    return text
+
+
+@lru_cache(maxsize=None)
+def font_path() -> str:
+    for path in FONT_CANDIDATES:
+        if not path:
+            continue
+        try:
+            ImageFont.truetype(path, 12)
+            return path
+        except OSError:
+            continue
+    return ""
+
+
+@lru_cache(maxsize=None)
+def load_font(size: int):
+    path = font_path()
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+
+
+def random_date(rng: random.Random, start_year: int, end_year: int) -> date:
+    start = date(start_year, 1, 1)
+    return start + timedelta(days=rng.randrange((date(end_year, 12, 31) - start).days))
+
+
+def arabic_date(d: date) -> str:
+    return f"{d.day:02d} {ARABIC_MONTHS[d.month - 1]} {d.year}"
+
+
+# ----- CARD IMAGES -----
+def _card(rng: random.Random, size: Tuple[int, int], tint: Tuple[int, int, int]) -> Image.Image:
+    """Tinted background with print noise, so quality checks see a realistic scan"""
+    img = Image.new("RGB", size, tint)
+    noise = Image.effect_noise(size, rng.uniform(8, 16)).convert("RGB")
+    img = Image.blend(img, noise, 0.12)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):  # guilloche-like background strokes
+        y = rng.randrange(size[1])
+        draw.arc((-size[0] // 2, y - 300, size[0] * 3 // 2, y + 300), 0, 180,
+                 fill=tuple(max(0, c - 40) for c in tint), width=1)
+    return img
+
+
+def _draw_lines(img: Image.Image, lines: List[Tuple[str, int]], top: int, left: int = None):
+    """Draw (text, font size) lines top-down, right-aligned unless a left edge is given"""
+    draw = ImageDraw.Draw(img)
+    y = top
+    for text, size in lines:
+        font = load_font(size)
+        x = left if left is not None else img.width - 60 - draw.textlength(text, font=font)
+        draw.text((x, y), text, fill=(20, 20, 30), font=font)
+        y += int(size * 1.6)
+
+
+def _photo(img: Image.Image, rng: random.Random, box: Tuple[int, int, int, int]):
+    draw = ImageDraw.Draw(img)
+    shade = rng.randint(120, 190)
+    draw.rectangle(box, fill=(shade, shade - 10, shade - 20), outline=(60, 60, 60), width=2)
+    cx, cy = (box[0] + box[2]) // 2, (box[1] + box[3]) // 2
+    draw.ellipse((cx - 55, cy - 90, cx + 55, cy + 30), fill=(shade - 50,) * 3)
+    draw.rectangle((cx - 90, cy + 40, cx + 90, box[3]), fill=(shade - 60,) * 3)
+
+
+def make_cin(rng: random.Random) -> Tuple[Image.Image, Image.Image, Dict[str, Any]]:
+    """
+    Front and back of a national identity card
+
+    Returns:
+        (front image, back image, the fields printed on it)
+    """
+    fields = {
+        "national_id": f"{rng.randrange(10 ** 7, 10 ** 8):08d}",
+        "family_name": rng.choice(FAMILY_NAMES),
+        "given_name": rng.choice(GIVEN_NAMES),
+        "father_name": rng.choice(GIVEN_NAMES),
+        "date_of_birth": random_date(rng, 1950, 2004),
+        "place_of_birth": rng.choice(PLACES),
+        "address": f"{rng.randint(1, 120)} {rng.choice(STREETS)} {rng.choice(PLACES)}",
+        "profession": rng.choice(PROFESSIONS),
+        "date_of_issue": random_date(rng, 2012, 2024),
+    }
+
+    front = _card(rng, CIN_SIZE, (225, 232, 215))
+    _photo(front, rng, (60, 170, 330, 560))
+    _draw_lines(front, [
+        (shape("الجمهورية التونسية"), 34),
+        (shape("بطاقة التعريف الوطنية"), 34),
+        (fields["national_id"], 44),
+        (shape(f"اللقب {fields['family_name']}"), 34),
+        (shape(f"الاسم {fields['given_name']}"), 34),
+        (shape(f"بن {fields['father_name']}"), 34),
+        (shape(f"تاريخ الولادة {arabic_date(fields['date_of_birth'])}"), 30),
+        (shape(fields["place_of_birth"]), 30),
+    ], top=30)
+
+    back = _card(rng, CIN_SIZE, (220, 226, 232))
+    _draw_lines(back, [
+        (shape(f"العنوان {fields['address']}"), 32),
+        (shape(f"المهنة {fields['profession']}"), 32),
+        (shape(f"{fields['place_of_birth']} في {arabic_date(fields['date_of_issue'])}"), 32),
+    ], top=60)
+    draw = ImageDraw.Draw(back)
+    x = 60
+    while x < CIN_SIZE[0] - 60:  # barcode strip
+        width = rng.choice((2, 3, 5))
+        draw.rectangle((x, 470, x + width, 590), fill=(15, 15, 15))
+        x += width + rng.choice((2, 3, 4))
+
+    return front, back, fields
+
+
+# ----- PASSPORT -----
+def _mrz_value(char: str) -> int:
+    if char.isdigit():
+        return int(char)
+    if char == "<":
+        return 0
+    return ord(char) - ord("A") + 10
+
+
+def mrz_check_digit(data: str) -> str:
+    weights = (7, 3, 1)
+    return str(sum(_mrz_value(c) * weights[i % 3] for i, c in enumerate(data)) % 10)
+
+
+def make_mrz(fields: Dict[str, Any]) -> Tuple[str, str]:
+    """The two 44-character lines of a TD3 machine readable zone"""
+    names = f"{fields['surname']}<<{fields['given_names'].replace(' ', '<')}"
+    line1 = f"P<TUN{names}".ljust(44, "<")[:44]
+
+    number = fields["passport_number"].ljust(9, "<")
+    dob = fields["date_of_birth"].strftime("%y%m%d")
+    expiry = fields["date_of_expiry"].strftime("%y%m%d")
+    personal = fields["national_id"].ljust(14, "<")
+    parts = [number + mrz_check_digit(number), dob + mrz_check_digit(dob),
+             expiry + mrz_check_digit(expiry), personal + mrz_check_digit(personal)]
+    composite = mrz_check_digit(parts[0] + parts[1] + parts[2] + parts[3])
+    line2 = f"{parts[0]}TUN{parts[1]}{fields['sex']}{parts[2]}{parts[3]}{composite}"
+    return line1, line2
+
+
+def make_passport(rng: random.Random) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Data page of a passport, with MRZ
+
+    Returns:
+        (image, the fields printed on it)
+    """
+    index = rng.randrange(len(FAMILY_LATIN))
+    issue = random_date(rng, 2015, 2024)
+    fields = {
+        "passport_number": f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randrange(10 ** 6, 10 ** 7):07d}",
+        "national_id": f"{rng.randrange(10 ** 7, 10 ** 8):08d}",
+        "surname": FAMILY_LATIN[index],
+        "given_names": rng.choice(GIVEN_LATIN),
+        "arabic_name": f"{rng.choice(GIVEN_NAMES)} بن {rng.choice(GIVEN_NAMES)} {FAMILY_NAMES[index]}",
+        "date_of_birth": random_date(rng, 1950, 2004),
+        "date_of_issue": issue,
+        "date_of_expiry": issue + timedelta(days=5 * 365),
+        "sex": rng.choice("MF"),
+        "profession": rng.choice(PROFESSIONS),
+    }
+    fields["mrz"] = make_mrz(fields)
+
+    img = _card(rng, PASSPORT_SIZE, (232, 226, 236))
+    _photo(img, rng, (50, 170, 380, 600))
+    lines = [
+        ("REPUBLIC OF TUNISIA", 30),
+        ("PASSPORT", 30),
+        (f"P TUN {fields['passport_number']}", 34),
+        ("Surname", 22), (fields["surname"], 32),
+        ("Given names", 22), (fields["given_names"], 32),
+        ("Nationality TUNISIAN", 28),
+        (f"{fields['date_of_birth']:%d-%m-%Y}   Place of birth TUNIS   Sex {fields['sex']}", 28),
+        (f"{fields['date_of_issue']:%d-%m-%Y}   {fields['date_of_expiry']:%d-%m-%Y}", 28),
+        (fields["national_id"], 28),
+    ]
+    _draw_lines(img, lines, top=20, left=420)
+    _draw_lines(img, [
+        (shape("الجمهورية التونسية جواز سفر"), 30),
+        (shape(fields["arabic_name"]), 32),
+        (shape(f"تونسية {fields['profession']}"), 28),
+    ], top=620)
+
+    draw = ImageDraw.Draw(img)
+    mrz_font = load_font(30)
+    draw.rectangle((0, 770, PASSPORT_SIZE[0], PASSPORT_SIZE[1]), fill=(245, 245, 245))
+    for i, line in enumerate(fields["mrz"]):
+        draw.text((40, 780 + i * 44), line, fill=(10, 10, 10), font=mrz_font)
+
+    return img, fields
+
+
+# ----- EXTRACTED DATA (verify_document input) -----
+def cin_extracted_data(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """What parse_cin_front/parse_cin_back return for a perfectly read card"""
+    return {
+        "national_id": fields["national_id"],
+        "family_name": fields["family_name"],
+        "given_name": fields["given_name"],
+        "father_name": fields["father_name"],
+        "date_of_birth": fields["date_of_birth"].isoformat(),
+        "place_of_birth": fields["place_of_birth"],
+        "address": fields["address"],
+        "profession": fields["profession"],
+        "date_of_issue": fields["date_of_issue"].isoformat(),
+    }
+
+
+def passport_extracted_data(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """What structure_tunisian_passport_data returns for a perfectly read passport"""
+    return {
+        "Passport Number": fields["passport_number"],
+        "National ID": fields["national_id"],
+        "Date of Birth": fields["date_of_birth"].strftime("%d-%m-%Y"),
+        "Date of Issue": fields["date_of_issue"].strftime("%d-%m-%Y"),
+        "Date of Expiry": fields["date_of_expiry"].strftime("%d-%m-%Y"),
+        "Arabic Name": fields["arabic_name"],
+        "Family Name": fields["surname"],
+        "Given Names": fields["given_names"],
+        "Nationality": "Tunisian",
+        "Place of Birth": "Tunis",
+        "Gender": "Male" if fields["sex"] == "M" else "Female",
+        "Profession": fields["profession"],
+        "Issuing Authority": "Tunis",
+    }
+
+
+# ----- PDF DOCUMENTS -----
+def _chart_png(rng: random.Random, size=(480, 300)) -> bytes:
+    img = Image.new("RGB", size, (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    bars = rng.randint(4, 9)
+    width = size[0] // (bars + 1)
+    for i in range(bars):
+        height = rng.randint(20, size[1] - 30)
+        color = tuple(rng.randint(60, 200) for _ in range(3))
+        draw.rectangle((width // 2 + i * width, size[1] - 10 - height, width // 2 + i * width + width - 10,
+                        size[1] - 10), fill=color)
+    out = BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _pdf_font() -> str:
+    path = font_path()
+    if not path:
+        return "Helvetica"
+    if "BenchBody" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont("BenchBody", path))
+    return "BenchBody"
+
+
+def _sentence(rng: random.Random, words, n_min=10, n_max=25) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(n_min, n_max)))
+
+
+def make_pdf(rng: random.Random, pages: int = 5, tables_per_page: int = 1, images_per_page: int = 1) -> bytes:
+    """A contract-like PDF: French and Arabic paragraphs, ruled tables and bar chart images on each page"""
+    styles = getSampleStyleSheet()
+    body = styles["BodyText"].clone("BenchBody", fontName=_pdf_font(), fontSize=10, leading=14)
+    story = []
+
+    for page in range(pages):
+        story.append(Paragraph(f"Article {page + 1} - {rng.choice(FRENCH_WORDS).capitalize()}", styles["Heading2"]))
+        for _ in range(3):
+            story.append(Paragraph(_sentence(rng, FRENCH_WORDS).capitalize() + ".", body))
+        story.append(Paragraph(shape(_sentence(rng, ARABIC_WORDS, 6, 12)), body))
+        story.append(Spacer(1, 4 * mm))
+
+        for _ in range(tables_per_page):
+            rows = [["Désignation", "Quantité", "Prix unitaire", "Date"]]
+            for _ in range(rng.randint(4, 10)):
+                rows.append([
+                    rng.choice(FRENCH_WORDS).capitalize(),
+                    str(rng.randint(1, 500)),
+                    f"{rng.uniform(1, 9999):,.3f} DT".replace(",", " ").replace(".", ","),
+                    random_date(rng, 2020, 2024).strftime("%d/%m/%Y"),
+                ])
+            table = Table(rows, repeatRows=1)
+            table.setStyle(TableStyle([
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ]))
+            story += [table, Spacer(1, 4 * mm)]
+
+        for _ in range(images_per_page):
+            story += [PdfImage(BytesIO(_chart_png(rng)), width=80 * mm, height=50 * mm), Spacer(1, 4 * mm)]
+
+        if page < pages - 1:
+            story.append(PageBreak())
+
+    out = BytesIO()
+    SimpleDocTemplate(out, pagesize=A4, title="Synthetic contract", author="benchmarks").build(story)
+    return out.getvalue()
+
+
+def render_content(rng: random.Random, paragraphs: int = 40, images: int = 4) -> List[Dict[str, Any]]:
+    """render_pdf_inline input: mixed French/Arabic text items and PNG images"""
+    content = []
+    for i in range(paragraphs):
+        words = ARABIC_WORDS if i % 3 == 0 else FRENCH_WORDS
+        content.append({"type": "text", "value": _sentence(rng, words, 30, 80)})
+        if images and i % max(1, paragraphs // images) == 0:
+            content.append({"type": "image", "image_bytes": _chart_png(rng)})
+    return content
@@ -10,11 +10,90 @@ class Config:
     # Database name
     DATABASE_NAME: str = "OCR"
 
+    # Connection pool, and threads running blocking database calls for async handlers
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    DB_THREADS: int = int(os.getenv("DB_THREADS", 16))
+
     # JWT configuration
     SECRET_KEY: str = os.getenv("JWT_SECRET", "Ztya58**+T00")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
+    # Authentication caches: resolved users are reused for USER_CACHE_TTL seconds.
+    # TRUST_TOKEN_CLAIMS lets read-only routes use the token's username/role without a lookup.
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 60))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 1024))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+    TRUST_TOKEN_CLAIMS: bool = os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+    # Password hashing: bcrypt cost (existing hashes are upgraded on login), hashing threads,
+    # and how many logins/registrations may hash at once before others queue (then get a 503)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    LOGIN_CONCURRENCY: int = int(os.getenv("LOGIN_CONCURRENCY", 4))
+    LOGIN_QUEUE_TIMEOUT: float = float(os.getenv("LOGIN_QUEUE_TIMEOUT", 10))
+
     # Upload folder for OCR files
     UPLOAD_FOLDER: str = os.getenv("UPLOAD_FOLDER", "uploads")
-    TEMP_FOLDER: str = os.getenv("TEMP_FOLDER", "temp")
\ No newline at end of file
+    TEMP_FOLDER: str = os.getenv("TEMP_FOLDER", "temp")
+
+    # Upload limits: hard size cap per file and per request body (checked before the body is
+    # parsed; the default fits a CIN's two sides), and size above which uploads are spooled to disk
+    MAX_UPLOAD_SIZE_MB: float = float(os.getenv("MAX_UPLOAD_SIZE_MB", 50))
+    MAX_REQUEST_SIZE_MB: float = float(os.getenv("MAX_REQUEST_SIZE_MB", 2 * MAX_UPLOAD_SIZE_MB + 1))
+    UPLOAD_SPOOL_THRESHOLD_MB: float = float(os.getenv("UPLOAD_SPOOL_THRESHOLD_MB", 2))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+    # Per-page PDF extraction cache (in-process entries and their total size, as page
+    # images are kept base64-encoded; optionally shared through MongoDB)
+    PAGE_CACHE_SIZE: int = int(os.getenv("PAGE_CACHE_SIZE", 512))
+    PAGE_CACHE_MAX_MB: float = float(os.getenv("PAGE_CACHE_MAX_MB", 128))
+    PAGE_CACHE_PERSIST: bool = os.getenv("PAGE_CACHE_PERSIST", "true").lower() == "true"
+    PAGE_CACHE_TTL_DAYS: int = int(os.getenv("PAGE_CACHE_TTL_DAYS", 30))
+
+    # Size of the page chunks PDF records are split into (MongoDB documents are capped at 16 MB)
+    PAGE_CHUNK_BYTES: int = int(os.getenv("PAGE_CHUNK_BYTES", 4 * 1024 * 1024))
+
+    # Compression of stored text/table payloads: "zlib", "zstd" (needs zstandard) or "none".
+    # Values smaller than COMPRESSION_MIN_BYTES are stored uncompressed.
+    STORAGE_CODEC: str = os.getenv("STORAGE_CODEC", "zlib").lower()
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", 4096))
+    COMPRESSION_LEVEL: int = int(os.getenv("COMPRESSION_LEVEL", 6))
+
+    # Number of rendered PDFs kept in memory for /ocr/pdf/render
+    RENDER_CACHE_SIZE: int = int(os.getenv("RENDER_CACHE_SIZE", 32))
+
+    # TTF font used when rendering PDFs; needed for Arabic glyphs (Helvetica otherwise)
+    PDF_FONT_PATH: str = os.getenv("PDF_FONT_PATH", "")
+
+    # Records fetched per cursor batch (and rows per streamed chunk) in bulk exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+
+    # Table schemas whose export file is kept open at once; the least recently written
+    # is closed and reopened (CSV appended to, Parquet/Arrow continued in a new part)
+    EXPORT_MAX_OPEN_WRITERS: int = int(os.getenv("EXPORT_MAX_OPEN_WRITERS", 16))
+
+    # Page sizes of paginated listings (/ocr/history, admin APIs)
+    DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 20))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 100))
+
+    # Write-behind: acknowledge CIN/passport records once journaled to WRITE_BEHIND_DIR and
+    # insert them into MongoDB in batches from a background task
+    WRITE_BEHIND: bool = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+    WRITE_BEHIND_DIR: str = os.getenv("WRITE_BEHIND_DIR", "journal")
+    WRITE_BEHIND_BATCH: int = int(os.getenv("WRITE_BEHIND_BATCH", 100))
+    WRITE_BEHIND_INTERVAL: float = float(os.getenv("WRITE_BEHIND_INTERVAL", 0.5))
+    WRITE_BEHIND_MAX_BACKOFF: float = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", 30))
+
+    # Per-record traces: a stack snapshot of uploads still running after TRACE_SNAPSHOT_MS
+    # (0 disables), and cProfile on a TRACE_PROFILE_RATE sample of uploads, kept (top
+    # TRACE_PROFILE_TOP functions) when the upload took longer than TRACE_PROFILE_MS
+    TRACE_SNAPSHOT_MS: float = float(os.getenv("TRACE_SNAPSHOT_MS", 15000))
+    TRACE_PROFILE_RATE: float = float(os.getenv("TRACE_PROFILE_RATE", 0))
+    TRACE_PROFILE_MS: float = float(os.getenv("TRACE_PROFILE_MS", 5000))
+    TRACE_PROFILE_TOP: int = int(os.getenv("TRACE_PROFILE_TOP", 25))
+
+    # Heavy libraries (pandas, cv2, easyocr/torch, PyMuPDF, ReportLab) are imported at first
+    # use; WARM_UP_ON_STARTUP imports them and loads the OCR models before serving instead
+    WARM_UP_ON_STARTUP: bool = os.getenv("WARM_UP_ON_STARTUP", "false").lower() == "true"
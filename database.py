@@ -1,12 +1,32 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
 from pymongo import MongoClient
 from config import Config
+from metrics import busy, register_pool
 
-# Connect to MongoDB
-client = MongoClient(Config.MONGO_URI)
+# Connect to MongoDB; "mongomock://" runs against an in-memory stand-in (tests, benchmarks)
+if Config.MONGO_URI.startswith("mongomock://"):
+    import mongomock
+    client = mongomock.MongoClient()
+else:
+    client = MongoClient(
+        Config.MONGO_URI,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE
+    )
 
 # Explicitly use the "OCR" database
 db = client[Config.DATABASE_NAME]
 
+# pymongo is blocking: async handlers run it here instead of on the event loop.
+# Sized below the connection pool so a worker never waits for a connection.
+DB_WORKERS = min(Config.DB_THREADS, Config.MONGO_MAX_POOL_SIZE)
+_db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="mongo")
+register_pool("mongo", DB_WORKERS)
+
 
 def get_collection(name: str):
     """
@@ -15,10 +35,66 @@ def get_collection(name: str):
     return db[name]
 
 
+def _run_busy(func):
+    with busy("mongo"):
+        return func()
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function (or helper making several calls) on the database pool."""
+    return await asyncio.get_running_loop().run_in_executor(_db_pool, _run_busy, partial(func, *args, **kwargs))
+
+
+class AsyncCollection:
+    """
+    Awaitable wrapper around a pymongo collection for use in async handlers.
+    Cursors are consumed on the pool and returned as lists, so always bound them.
+    """
+
+    def __init__(self, collection):
+        self.sync = collection
+
+    async def find_one(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None):
+        return await run_db(self.sync.find_one, filter, projection)
+
+    async def find(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                   sort: Optional[list] = None, limit: int = 0) -> List[dict]:
+        def query():
+            cursor = self.sync.find(filter, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await run_db(query)
+
+    async def aggregate(self, pipeline: List[dict], **kwargs) -> List[dict]:
+        return await run_db(lambda: list(self.sync.aggregate(pipeline, **kwargs)))
+
+    async def insert_one(self, document: Dict[str, Any]):
+        return await run_db(self.sync.insert_one, document)
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], **kwargs):
+        return await run_db(self.sync.update_one, filter, update, **kwargs)
+
+    async def delete_one(self, filter: Dict[str, Any]):
+        return await run_db(self.sync.delete_one, filter)
+
+    async def count_documents(self, filter: Dict[str, Any], **kwargs) -> int:
+        return await run_db(self.sync.count_documents, filter, **kwargs)
+
+    async def estimated_document_count(self) -> int:
+        return await run_db(self.sync.estimated_document_count)
+
+
+def get_async_collection(name: str) -> AsyncCollection:
+    return AsyncCollection(get_collection(name))
+
+
 # Helper functions for specific collections
 def get_user_collection():
     return get_collection("users")
 
 
 def get_ocr_collection():
-    return get_collection("uploads")
\ No newline at end of file
+    return get_collection("uploads")
@@ -0,0 +1,413 @@
+"""
+Bulk export of OCR records
+Rows are streamed from a MongoDB cursor in batches, so memory use does not
+depend on how many records match the filters.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from config import Config
+from database import get_collection
+from record_store import load_pdf_tables
+from OCR.table_normalizer import normalize_table, STRING, INTEGER, FLOAT, DATE
+
+ocr_col = get_collection("uploads")
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Record metadata exported for every document type, in column order
+BASE_COLUMNS = [
+    "_id", "user_id", "username", "doc_type", "filename", "timestamp",
+    "verification.overall_score", "verification.is_authentic", "verification.confidence_level",
+]
+
+# Only what the rows need: page bodies, images and check details are never read
+EXPORT_PROJECTION = {
+    "user_id": 1, "username": 1, "doc_type": 1, "filename": 1, "front_filename": 1,
+    "timestamp": 1, "extracted_data": 1,
+    "verification.overall_score": 1, "verification.is_authentic": 1,
+    "verification.confidence_level": 1,
+}
+
+
+def build_export_query(
+        user_id: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        authentic: Optional[bool] = None,
+        confidence: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build the MongoDB filter for a bulk export
+
+    Args:
+        user_id: Owner of the records
+        doc_type: 'cin', 'passport' or 'pdf'
+        date_from / date_to: Inclusive upload time bounds
+        authentic: Verification outcome
+        confidence: Verification confidence level ('high', 'medium', 'low')
+
+    Returns:
+        MongoDB query dict
+    """
+    query: Dict[str, Any] = {}
+    if user_id:
+        # Records store the owner id as a string, as set by get_current_user
+        query["user_id"] = str(ObjectId(user_id))
+    if doc_type:
+        query["doc_type"] = doc_type.lower()
+    if date_from or date_to:
+        query["timestamp"] = {}
+        if date_from:
+            query["timestamp"]["$gte"] = date_from
+        if date_to:
+            query["timestamp"]["$lte"] = date_to
+    if authentic is not None:
+        query["verification.is_authentic"] = authentic
+    if confidence:
+        query["verification.confidence_level"] = confidence.lower()
+    return query
+
+
+def extracted_field_names(query: Dict[str, Any]) -> List[str]:
+    """Distinct extracted_data keys of the matching records, collected server-side."""
+    pipeline = [
+        {"$match": query},
+        {"$project": {"fields": {"$objectToArray": {"$ifNull": ["$extracted_data", {}]}}}},
+        {"$unwind": "$fields"},
+        {"$group": {"_id": "$fields.k"}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [doc["_id"] for doc in ocr_col.aggregate(pipeline, allowDiskUse=True)]
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def flatten_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """One export row: metadata columns plus 'extracted_data.<field>' columns."""
+    verification = record.get("verification") or {}
+    row = {
+        "_id": record.get("_id"),
+        "user_id": record.get("user_id"),
+        "username": record.get("username"),
+        "doc_type": record.get("doc_type"),
+        "filename": record.get("filename") or record.get("front_filename"),
+        "timestamp": record.get("timestamp"),
+        "verification.overall_score": verification.get("overall_score"),
+        "verification.is_authentic": verification.get("is_authentic"),
+        "verification.confidence_level": verification.get("confidence_level"),
+    }
+    for key, value in (record.get("extracted_data") or {}).items():
+        row[f"extracted_data.{key}"] = value
+    return {key: _cell(value) for key, value in row.items()}
+
+
+def iter_export_rows(query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    cursor = ocr_col.find(query, EXPORT_PROJECTION) \
+        .sort("timestamp", -1) \
+        .batch_size(Config.EXPORT_BATCH_SIZE)
+    try:
+        for record in cursor:
+            yield flatten_record(record)
+    finally:
+        cursor.close()
+
+
+def export_columns(query: Dict[str, Any]) -> List[str]:
+    return BASE_COLUMNS + [f"extracted_data.{name}" for name in extracted_field_names(query)]
+
+
+# ----- WRITERS -----
+def stream_csv(query: Dict[str, Any]) -> Iterator[bytes]:
+    """CSV with a header row; rows are flushed every EXPORT_BATCH_SIZE records."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=export_columns(query), extrasaction="ignore")
+    buffer.write("\ufeff")  # BOM so Excel opens Arabic text as UTF-8
+    writer.writeheader()
+
+    for count, row in enumerate(iter_export_rows(query), 1):
+        writer.writerow(row)
+        if count % Config.EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_jsonl(query: Dict[str, Any]) -> Iterator[bytes]:
+    """One JSON object per record."""
+    lines = []
+    for row in iter_export_rows(query):
+        lines.append(json.dumps(row, ensure_ascii=False, default=str))
+        if len(lines) >= Config.EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _stream_file(output) -> Iterator[bytes]:
+    output.seek(0)
+    while True:
+        chunk = output.read(Config.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def stream_xlsx(query: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    XLSX through openpyxl's write-only workbook, which keeps rows out of memory.
+    The archive can only be produced once complete; it is spooled to disk before streaming.
+    """
+    from openpyxl import Workbook
+
+    columns = export_columns(query)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("records")
+    sheet.append(columns)
+    for row in iter_export_rows(query):
+        sheet.append([row.get(column) for column in columns])
+
+    max_memory = int(Config.UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024)
+    with tempfile.SpooledTemporaryFile(max_size=max_memory, dir=Config.TEMP_FOLDER) as output:
+        workbook.save(output)
+        yield from _stream_file(output)
+
+
+EXPORT_WRITERS = {
+    "csv": stream_csv,
+    "jsonl": stream_jsonl,
+    "excel": stream_xlsx,
+    "xlsx": stream_xlsx,
+}
+
+
+# ----- TABLE EXPORTS -----
+TABLE_FORMATS = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+
+# Prepended to every exported table so concatenated rows keep their origin
+PROVENANCE_COLUMNS = ["_record_id", "_page", "_table_number"]
+
+
+_pyarrow = None
+
+
+def _load_pyarrow():
+    """pyarrow with its ipc and parquet modules, imported on the first table export; None when not installed"""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+            _pyarrow = pyarrow
+        except ImportError:  # optional, needed for parquet/arrow table exports only
+            _pyarrow = False
+    return _pyarrow or None
+
+
+def table_format_available(fmt: str) -> bool:
+    return fmt == "csv" or _load_pyarrow() is not None
+
+
+def _arrow_schema(columns: List[str], types: List[str]):
+    pyarrow = _load_pyarrow()
+    arrow_types = {STRING: pyarrow.string(), INTEGER: pyarrow.int64(),
+                   FLOAT: pyarrow.float64(), DATE: pyarrow.date32()}
+    fields = [pyarrow.field("_record_id", pyarrow.string()),
+              pyarrow.field("_page", pyarrow.int32()),
+              pyarrow.field("_table_number", pyarrow.int32())]
+    fields += [pyarrow.field(name, arrow_types[dtype]) for name, dtype in zip(columns, types)]
+    return pyarrow.schema(fields)
+
+
+class TableGroupWriter:
+    """
+    Appends normalized tables that share the same columns and types to one temp file,
+    so tables continued over several pages (or records) end up concatenated.
+
+    The file is only open between open() and suspend(). Parquet and Arrow files cannot be
+    appended to once closed, so each reopening starts a new part; finish() merges the parts.
+    """
+
+    def __init__(self, fmt: str, columns: List[str], types: List[str]):
+        self.fmt = fmt
+        self.columns = columns
+        self.types = types
+        self.tables = 0
+        self.rows = 0
+        self.parts: List[str] = []
+        self._file = None
+        self._writer = None
+        self._schema = _arrow_schema(columns, types) if fmt != "csv" else None
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None or self._writer is not None
+
+    @property
+    def path(self) -> str:
+        return self.parts[0]
+
+    def _new_part(self) -> str:
+        fd, path = tempfile.mkstemp(suffix=f".{self.fmt}", dir=Config.TEMP_FOLDER)
+        os.close(fd)
+        self.parts.append(path)
+        return path
+
+    def _arrow_writer(self, path: str):
+        pyarrow = _load_pyarrow()
+        if self.fmt == "parquet":
+            return pyarrow.parquet.ParquetWriter(path, self._schema)
+        return pyarrow.ipc.new_file(path, self._schema)
+
+    def open(self):
+        if self.is_open:
+            return
+        if self.fmt == "csv":
+            first = not self.parts
+            self._file = open(self._new_part() if first else self.path, "a", encoding="utf-8", newline="")
+            self._csv = csv.writer(self._file)
+            if first:
+                self._csv.writerow(PROVENANCE_COLUMNS + self.columns)
+        else:
+            self._writer = self._arrow_writer(self._new_part())
+
+    def write(self, record_id: str, table: Dict[str, Any]):
+        self.open()
+        n = table["row_count"]
+        provenance = [[record_id] * n, [table["page"]] * n, [table["table_number"]] * n]
+        if self.fmt == "csv":
+            columns = provenance + [table["data"][name] for name in self.columns]
+            self._csv.writerows(zip(*columns))
+        else:
+            pyarrow = _load_pyarrow()
+            arrays = provenance + [table["data"][name] for name in self.columns]
+            self._writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(a, type=f.type) for a, f in zip(arrays, self._schema)],
+                schema=self._schema
+            ))
+        self.tables += 1
+        self.rows += n
+
+    def suspend(self):
+        """Close the file handle; the next write reopens it."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def finish(self) -> str:
+        """Close the file and merge Parquet/Arrow parts; returns the path of the complete file."""
+        self.suspend()
+        if len(self.parts) > 1:
+            pyarrow = _load_pyarrow()
+            parts, self.parts = self.parts, []
+            self._writer = self._arrow_writer(self._new_part())
+            try:
+                for part in parts:
+                    # One record batch in memory at a time
+                    if self.fmt == "parquet":
+                        batches = pyarrow.parquet.ParquetFile(part).iter_batches()
+                    else:
+                        reader = pyarrow.ipc.open_file(part)
+                        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                    for batch in batches:
+                        self._writer.write_batch(batch)
+            finally:
+                self.suspend()
+                self.parts += parts  # removed by discard()
+        return self.path
+
+    def discard(self):
+        self.suspend()
+        for part in self.parts:
+            if os.path.exists(part):
+                os.remove(part)
+
+
+def stream_tables_zip(tables: Iterable[Tuple[str, Dict[str, Any]]], fmt: str) -> Iterator[bytes]:
+    """
+    Normalize (record id, table) pairs and stream them as a zip with one file per table schema
+    plus a manifest.json describing each file's columns and types.
+
+    At most Config.EXPORT_MAX_OPEN_WRITERS group files are open at once; all of them are
+    closed and removed when the export ends, completed or not.
+    """
+    groups: Dict[tuple, TableGroupWriter] = {}
+    open_groups: "OrderedDict[tuple, TableGroupWriter]" = OrderedDict()
+    try:
+        for record_id, table in tables:
+            normalized = normalize_table(table)
+            if not normalized["columns"]:
+                continue
+            key = tuple(zip(normalized["columns"], normalized["types"]))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = TableGroupWriter(fmt, normalized["columns"], normalized["types"])
+            open_groups[key] = group
+            open_groups.move_to_end(key)
+            while len(open_groups) > max(1, Config.EXPORT_MAX_OPEN_WRITERS):
+                open_groups.popitem(last=False)[1].suspend()
+            group.write(record_id, normalized)
+
+        manifest = []
+        max_memory = int(Config.UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024)
+        with tempfile.SpooledTemporaryFile(max_size=max_memory, dir=Config.TEMP_FOLDER) as output:
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+                for index, group in enumerate(groups.values(), 1):
+                    name = f"tables_{index}.{TABLE_FORMATS[fmt]}"
+                    archive.write(group.finish(), name)
+                    group.discard()
+                    manifest.append({
+                        "file": name,
+                        "columns": PROVENANCE_COLUMNS + group.columns,
+                        "types": [STRING, INTEGER, INTEGER] + group.types,
+                        "tables": group.tables,
+                        "rows": group.rows,
+                    })
+                archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+            yield from _stream_file(output)
+    finally:
+        for group in groups.values():
+            group.discard()
+
+
+def iter_query_tables(query: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(record id, table) pairs of every PDF record matching the query, one record at a time."""
+    cursor = ocr_col.find(dict(query, doc_type="pdf"), {"storage": 1, "tables": 1}) \
+        .sort("timestamp", -1) \
+        .batch_size(Config.EXPORT_BATCH_SIZE)
+    try:
+        for record in cursor:
+            record_id = str(record["_id"])
+            for table in load_pdf_tables(record):
+                yield record_id, table
+    finally:
+        cursor.close()
@@ -0,0 +1,133 @@
+"""
+Index management
+Declares the indexes every hot query relies on and creates them idempotently at startup.
+
+Check query plans with: python indexes.py --explain
+"""
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from config import Config
+from database import get_collection
+
+# collection -> list of (keys, options)
+INDEXES: Dict[str, List[tuple]] = {
+    "uploads": [
+        # /ocr/history and user dashboards: one user's records, newest first, keyset on _id
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+         {"name": "user_timestamp"}),
+        # Admin listings, dashboard date ranges, bulk exports
+        ([("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "timestamp"}),
+        ([("doc_type", ASCENDING), ("timestamp", DESCENDING)], {"name": "doc_type_timestamp"}),
+        ([("username", ASCENDING), ("_id", ASCENDING)], {"name": "username"}),
+        # Admin slow-uploads view: slowest first, recent ones picked by timestamp
+        ([("trace.total_ms", DESCENDING)], {"name": "trace_total_ms", "sparse": True}),
+    ],
+    "pages": [
+        ([("record_id", ASCENDING), ("page_number", ASCENDING), ("chunk", ASCENDING)],
+         {"name": "record_page_chunk", "unique": True}),
+    ],
+    "page_cache": [
+        ([("created_at", ASCENDING)],
+         {"name": "created_at_ttl", "expireAfterSeconds": Config.PAGE_CACHE_TTL_DAYS * 86400}),
+    ],
+    "users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+        ([("username", ASCENDING)], {"name": "username_unique", "unique": True}),
+    ],
+    "stats": [
+        ([("day", ASCENDING)], {"name": "day"}),
+    ],
+}
+
+
+def ensure_indexes():
+    """Create missing indexes; existing ones are left alone, conflicts are reported, not raised."""
+    for collection_name, indexes in INDEXES.items():
+        collection = get_collection(collection_name)
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. duplicate emails already stored, or an index with the same keys and other options
+                print(f"Warning: could not create index {collection_name}.{options['name']}: {e}")
+
+
+# ----- QUERY PLAN DIAGNOSTICS -----
+def _hot_queries() -> List[Dict[str, Any]]:
+    """The queries the API runs on every request path, with representative values."""
+    uploads = get_collection("uploads")
+    sample = uploads.find_one({}, {"user_id": 1, "username": 1}) or {}
+    user_id = sample.get("user_id", str(ObjectId()))
+    since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        {"name": "history", "collection": "uploads", "filter": {"user_id": user_id},
+         "sort": [("timestamp", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "admin uploads", "collection": "uploads", "filter": {},
+         "sort": [("timestamp", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "uploads by day", "collection": "uploads", "filter": {"timestamp": {"$gte": since}}},
+        {"name": "slow uploads", "collection": "uploads",
+         "filter": {"timestamp": {"$gte": since}, "trace.total_ms": {"$exists": True}},
+         "sort": [("trace.total_ms", DESCENDING)]},
+        {"name": "pdf export", "collection": "uploads", "filter": {"doc_type": "pdf"},
+         "sort": [("timestamp", DESCENDING)]},
+        {"name": "record pages", "collection": "pages", "filter": {"record_id": ObjectId()},
+         "sort": [("page_number", ASCENDING), ("chunk", ASCENDING)]},
+        {"name": "login by email", "collection": "users", "filter": {"email": "someone@example.com"}},
+        {"name": "register by username", "collection": "users", "filter": {"username": sample.get("username", "someone")}},
+        {"name": "stats per day", "collection": "stats", "filter": {"day": {"$in": [since.strftime("%Y-%m-%d")]}}},
+    ]
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages += _plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_hot_queries() -> List[Dict[str, Any]]:
+    """
+    Run explain() on each hot query
+
+    Returns:
+        One entry per query with its name, plan stages and whether it scans the whole collection
+    """
+    report = []
+    for query in _hot_queries():
+        cursor = get_collection(query["collection"]).find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        plan = cursor.limit(Config.DEFAULT_PAGE_SIZE).explain()["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan)
+        report.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    if "--explain" in sys.argv:
+        if "--no-ensure" not in sys.argv:
+            ensure_indexes()
+        collscans = 0
+        for entry in explain_hot_queries():
+            flag = "COLLSCAN" if entry["collscan"] else "ok"
+            collscans += entry["collscan"]
+            print(f"[{flag:8}] {entry['collection']:8} {entry['name']:22} {' <- '.join(entry['stages'])}")
+        sys.exit(1 if collscans else 0)
+    else:
+        ensure_indexes()
+        print("Indexes ensured.")
@@ -1,33 +1,50 @@
 import base64
+import hashlib
+import time
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
+from bson.errors import InvalidId
 
 from bson import ObjectId
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse , StreamingResponse, JSONResponse
+from fastapi.responses import HTMLResponse , StreamingResponse, JSONResponse, Response, PlainTextResponse
 import os
 from io import BytesIO
 
 from PIL import Image
 from datetime import datetime
 
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import RedirectResponse
-import uvicorn
-import tempfile
-from OCR.pdf_extractor import extract_pdf
-from auth_utils import get_current_user, hash_password
-from database import get_collection
-from pdf_utils import render_pdf_inline
+from OCR.pdf_extractor import extract_pdf, open_pdf, parse_page_range, parse_content_filter, resolve_pages
+from OCR.page_cache import PageCache
+from cache_utils import LRUCache
+from record_store import (STORAGE_PAGES, insert_pdf_record, append_pdf_pages, iter_record_pages,
+                          load_pdf_content, load_pdf_tables, is_paged, has_header_content, encode_value, decode_fields)
+from auth_utils import get_current_user, get_token_user, require_admin, hash_password_async, invalidate_user
+from database import get_collection, get_async_collection, run_db
+from pdf_utils import render_pdf_inline, stream_pdf_inline
 from schemas import OCRResponse
 from OCR.EasyOCR import pipeline
 from OCR.Verify_document import verify_document , verify_pdf_document
 from config import Config
+from upload_utils import RequestSizeLimit, spool_upload, check_upload_size
+from pagination import keyset_page, page_limit
+from stats_store import record_upload_stats, ensure_stats
+from indexes import ensure_indexes
+from write_behind import journal, save_upload, pending_upload
+import metrics
+from metrics import timed
+import tracing
+from tracing import record_trace
+from export_utils import (EXPORT_FORMATS, EXPORT_WRITERS, TABLE_FORMATS, build_export_query,
+                          table_format_available, stream_tables_zip, iter_query_tables)
 import auth_routes
-import pandas as pd
+from startup import warm_up
 
 templates = Jinja2Templates(directory="templates")
 app = FastAPI(title="OCR API")
@@ -41,94 +58,223 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Oversized bodies are refused before multipart parsing spools them
+app.add_middleware(RequestSizeLimit)
+
 # Include auth routes
 app.include_router(auth_routes.router)
 
-# Collections
-users_col = get_collection("users")
-ocr_col = get_collection("uploads")
+# Collections (awaitable; blocking helpers are run through run_db)
+users_col = get_async_collection("users")
+ocr_col = get_async_collection("uploads")
+
+# Per-page extraction cache shared by all PDF uploads
+page_cache = PageCache(
+    collection=get_collection("page_cache") if Config.PAGE_CACHE_PERSIST else None,
+    max_entries=Config.PAGE_CACHE_SIZE,
+    max_bytes=int(Config.PAGE_CACHE_MAX_MB * 1024 * 1024)
+)
+
+# Rendered PDFs keyed by ETag (record id + last update)
+render_cache = LRUCache(max_entries=Config.RENDER_CACHE_SIZE)
+
+# Gauges read when /metrics is scraped
+_in_flight = 0
+metrics.register_cache("page_cache", page_cache.memory)
+metrics.register_cache("render_cache", render_cache)
+metrics.register_callback("write_behind_queue_depth", "Upload records journaled but not yet in MongoDB",
+                          lambda: journal.depth if journal is not None else 0)
+metrics.register_callback("http_requests_in_flight", "Requests being handled",
+                          lambda: _in_flight)
 
 # Create necessary folders
 os.makedirs(Config.TEMP_FOLDER, exist_ok=True)
 os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
 
+
+@app.on_event("startup")
+async def prepare_database():
+    await run_db(ensure_indexes)
+    await run_db(ensure_stats)
+    if journal is not None:
+        journal.start()
+    if Config.WARM_UP_ON_STARTUP:
+        # Before the first request is accepted, so it does not pay the imports and model load
+        await run_in_threadpool(warm_up)
+
+
+@app.on_event("shutdown")
+async def flush_pending_writes():
+    if journal is not None:
+        await journal.stop()
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Per-route latency (until the response starts; streamed bodies are not included)"""
+    global _in_flight
+    _in_flight += 1
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        _in_flight -= 1
+        route = request.scope.get("route")
+        label = f"{request.method} {route.path if route else 'unmatched'}"
+        metrics.REQUEST_SECONDS.observe(label, time.perf_counter() - start)
+        if status >= 500:
+            metrics.REQUEST_ERRORS.inc(label)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Mount static files if you have any
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+def flatten_pdf_pages(pages: list):
+    """Flatten extracted page content into text, table and image arrays"""
+    all_text = []
+    all_tables = []
+    all_images = []
+
+    for page in pages:
+        for item in page.get("content", []):
+            if item["type"] == "text":
+                all_text.append(item["value"])
+            elif item["type"] == "table":
+                all_tables.append(item)
+            elif item["type"] == "image":
+                all_images.append(item)
+
+    return all_text, all_tables, all_images
+
+
+def open_image(upload: UploadFile) -> Image.Image:
+    """Decode an uploaded image up front, so decoding is timed apart from OCR"""
+    with timed("decode"):
+        img = Image.open(upload.file)
+        img.load()
+    return img
+
+
+def stored_pdf_path(record_id) -> str:
+    """Location of the original PDF kept for later page extraction"""
+    return os.path.join(Config.UPLOAD_FOLDER, f"{record_id}.pdf")
+
+
+def extract_and_verify_pdf(source, filename: str, pages, content):
+    """
+    Blocking part of a PDF upload, run in the thread pool
+
+    Returns:
+        (extracted, verification); extracted has an 'error' when the PDF could not be read
+    """
+    with tracing.worker_trace():
+        try:
+            doc = open_pdf(source)
+        except Exception as e:
+            return {"error": f"Failed to open PDF: {str(e)}"}, None
+
+        # Parse the PDF once, extraction and verification share the document.
+        # Spooled files are read through mmap and never copied into memory whole.
+        try:
+            extracted = extract_pdf(source, filename, pages=pages, content=content, doc=doc, cache=page_cache)
+            if extracted.get("error"):
+                return extracted, None
+            return extracted, verify_pdf_document(source, doc=doc)
+        finally:
+            doc.close()
+
+
 @app.post("/ocr/upload/pdf")
 async def upload_pdf(
         file: UploadFile = File(...),
+        pages: Optional[str] = Form(None),
+        content: Optional[str] = Form(None),
         current_user: dict = Depends(get_current_user)
 ):
-    """Upload PDF for text, table, and image extraction (stored as a single record)"""
+    """
+    Upload PDF for text, table, and image extraction (stored as a single record)
+
+    pages: optional page ranges, e.g. "1-2" or "1,5-" (default: all pages)
+    content: optional content filter, e.g. "text", "tables" or "text,tables" (default: all)
+    """
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    temp_pdf_path = None
-
     try:
-        # Read file bytes
-        file_bytes = await file.read()
-
-        # Save to temporary file for PDF verification
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_pdf_path = temp_file.name
-            temp_file.write(file_bytes)
-
-        # Extract text/data/images from PDF
-        extracted = extract_pdf(file_bytes, file.filename)
-
-        if extracted.get("error"):
-            return {
-                "text": "",
-                "tables": [],
-                "images": [],
-                "verification": {"error": extracted.get("error")},
-                "error": extracted.get("error")
-            }
-
-        # Flatten all page content into single arrays
-        all_text = []
-        all_tables = []
-        all_images = []
+        page_ranges = parse_page_range(pages)
+        content_kinds = parse_content_filter(content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        for page in extracted.get("pages", []):
-            for item in page.get("content", []):
-                if item["type"] == "text":
-                    all_text.append(item["value"])
-                elif item["type"] == "table":
-                    all_tables.append(item)
-                elif item["type"] == "image":
-                    all_images.append(item)
+    # Size-capped view of the body Starlette spooled, large files are read through mmap
+    upload = await spool_upload(file)
 
-        # Merge text into one string
-        merged_text = "\n\n".join(all_text)
+    source_path = None
 
-        # Verify PDF
-        verification_result = verify_pdf_document(temp_pdf_path)
-
-        # Save to database
+    try:
+        with record_trace("pdf", threaded=True) as trace:
+            # PyMuPDF parsing and page cache lookups block: off the event loop
+            extracted, verification_result = await run_in_threadpool(
+                extract_and_verify_pdf, upload.source, file.filename, page_ranges, content_kinds)
+
+            if extracted.get("error"):
+                return {
+                    "text": "",
+                    "tables": [],
+                    "images": [],
+                    "verification": {"error": extracted.get("error")},
+                    "error": extracted.get("error")
+                }
+
+            # Flatten all page content into single arrays
+            all_text, all_tables, all_images = flatten_pdf_pages(extracted.get("pages", []))
+
+            # Merge text into one string
+            merged_text = "\n\n".join(all_text)
+
+            trace.note("pages", len(extracted.get("extracted_pages", [])))
+            trace.note("page_cache", extracted.get("page_cache"))
+
+        # Save to database, keeping the original so more pages can be extracted later
         record_id = None
         try:
+            record_oid = ObjectId()
+            source_path = stored_pdf_path(record_oid)
+            upload.save_as(source_path)
+
+            # Small header in "uploads", page bodies in "pages"
             ocr_record = {
+                "_id": record_oid,
                 "user_id": current_user["_id"],
                 "username": current_user["username"],
                 "doc_type": "pdf",
                 "filename": file.filename,
-                "text": merged_text,
-                "tables": all_tables,
-                "images": all_images,
                 "verification": verification_result,
+                "total_pages": extracted.get("total_pages", 0),
+                "extracted_pages": extracted.get("extracted_pages", []),
+                "content": extracted.get("content", []),
+                "tables_count": len(all_tables),
+                "images_count": len(all_images),
+                "source_path": source_path,
+                "trace": trace.data,
                 "timestamp": datetime.utcnow()
             }
 
-            result = ocr_col.insert_one(ocr_record)
-            record_id = str(result.inserted_id)
+            record_id = await run_db(insert_pdf_record, ocr_record, extracted.get("pages", []))
+            await run_db(record_upload_stats, ocr_record)
+            source_path = None  # kept with the record
             print(f" Saved to database with ID: {record_id}")
         except Exception as db_error:
-            print(f" Warning: Could not save to database (likely too large): {db_error}")
+            print(f" Warning: Could not save to database: {db_error}")
             record_id = None
 
         # Return response
@@ -139,6 +285,10 @@ async def upload_pdf(
             "tables": all_tables,
             "images": all_images,
             "verification": verification_result,
+            "total_pages": extracted.get("total_pages", 0),
+            "extracted_pages": extracted.get("extracted_pages", []),
+            "page_cache": extracted.get("page_cache"),
+            "storage": ocr_record.get("storage_stats") if record_id else None,
             "record_id": record_id
         }
 
@@ -149,12 +299,118 @@ async def upload_pdf(
         raise HTTPException(status_code=500, detail=f"PDF processing failed: {str(e)}")
 
     finally:
-        # Clean up temporary file
-        if temp_pdf_path and os.path.exists(temp_pdf_path):
+        upload.close()
+
+        # Remove the stored original if the record was not saved
+        if source_path and os.path.exists(source_path):
             try:
-                os.unlink(temp_pdf_path)
+                os.unlink(source_path)
             except Exception as cleanup_error:
-                print(f"Warning: Could not delete temporary file: {cleanup_error}")
+                print(f"Warning: Could not delete stored PDF: {cleanup_error}")
+
+
+@app.post("/ocr/pdf/{record_id}/extract")
+async def extract_more_pdf_pages(
+        record_id: str,
+        pages: str = Form(...),
+        content: Optional[str] = Form(None),
+        current_user: dict = Depends(get_current_user)
+):
+    """
+    Extract additional pages of an uploaded PDF from the stored original, without re-uploading.
+    Pages that were already extracted are skipped.
+    """
+    try:
+        page_ranges = parse_page_range(pages)
+        content_kinds = parse_content_filter(content) if content else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        record_oid = ObjectId(record_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid record_id")
+
+    record = await ocr_col.find_one({"_id": record_oid})
+    if not record or record.get("doc_type") != "pdf":
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    if str(record.get("user_id")) != str(current_user["_id"]):
+        raise HTTPException(status_code=403, detail="Not authorized to update this record")
+
+    source_path = record.get("source_path")
+    if not source_path or not os.path.exists(source_path):
+        raise HTTPException(status_code=409, detail="Original PDF is not stored for this record")
+
+    already = set(record.get("extracted_pages", []))
+    requested = [i + 1 for i in resolve_pages(page_ranges, record.get("total_pages", 0))]
+    new_pages = [p for p in requested if p not in already]
+    if not new_pages:
+        return {
+            "success": True,
+            "message": "All requested pages were already extracted.",
+            "text": "",
+            "tables": [],
+            "images": [],
+            "extracted_pages": sorted(already),
+            "record_id": record_id
+        }
+
+    # Legacy single-document records keep all text in one string with no page boundaries:
+    # their pages are extracted again (mostly page cache hits) and stored per page
+    legacy = not is_paged(record)
+    extract_pages = sorted(already.union(new_pages)) if legacy else new_pages
+
+    extracted = await run_in_threadpool(
+        extract_pdf,
+        source_path,
+        record.get("filename", ""),
+        pages=[(p, p) for p in extract_pages],
+        content=content_kinds or record.get("content") or None,
+        cache=page_cache
+    )
+    if extracted.get("error"):
+        raise HTTPException(status_code=500, detail=f"PDF processing failed: {extracted['error']}")
+
+    pages = extracted.get("pages", [])
+    added = [page for page in pages if page.get("page_number") in new_pages]
+    all_text, all_tables, all_images = flatten_pdf_pages(added)
+    merged_text = "\n\n".join(all_text)
+    extracted_pages = sorted(already.union(extracted.get("extracted_pages", [])))
+
+    # New pages become page documents, reassembly orders them by page number
+    chunks, stats = await run_db(append_pdf_pages, record["_id"], pages)
+    update = {"$set": {"extracted_pages": extracted_pages, "last_updated": datetime.utcnow()}}
+    if legacy:
+        _, record_tables, record_images = flatten_pdf_pages(pages)
+        update["$set"].update({
+            "storage": STORAGE_PAGES,
+            "page_chunks": chunks,
+            "tables_count": len(record_tables),
+            "images_count": len(record_images),
+            "storage_stats": stats
+        })
+        update["$unset"] = {"text": "", "tables": "", "images": ""}
+    else:
+        update["$inc"] = {
+            "page_chunks": chunks,
+            "tables_count": len(all_tables),
+            "images_count": len(all_images),
+            "storage_stats.raw_bytes": stats["raw_bytes"],
+            "storage_stats.stored_bytes": stats["stored_bytes"]
+        }
+    await ocr_col.update_one({"_id": record["_id"]}, update)
+
+    return {
+        "success": True,
+        "message": f"Extracted {len(new_pages)} more pages. Found {len(all_tables)} tables and {len(all_images)} images.",
+        "text": merged_text,
+        "tables": all_tables,
+        "images": all_images,
+        "extracted_pages": extracted_pages,
+        "page_cache": extracted.get("page_cache"),
+        "record_id": record_id
+    }
 
 
 # -------------------- CIN UPLOAD ROUTE --------------------
@@ -165,36 +421,39 @@ async def upload_cin(
         current_user: dict = Depends(get_current_user)
 ):
     """Upload CIN front and optionally back image for OCR processing"""
+    check_upload_size(front)
+    check_upload_size(back)
     try:
-        # Process front image
-        front_img = Image.open(front.file)
-
-        # Process back image if provided
-        back_img = None
-        if back and back.filename:
-            back_img = Image.open(back.file)
-
-        # Run OCR pipeline
-        ocr_result = pipeline(
-            front_img=front_img,
-            back_img=back_img,
-            doc_type="cin"
-        )
-
-        # Check for OCR errors
-        if ocr_result.get("error"):
-            return {
-                "extracted_data": {},
-                "quality": ocr_result.get("quality", []),
-                "verification": [ocr_result.get("error")],
-                "error": ocr_result.get("error")
-            }
+        with record_trace("cin") as trace:
+            # Process front image
+            front_img = open_image(front)
+
+            # Process back image if provided
+            back_img = None
+            if back and back.filename:
+                back_img = open_image(back)
+
+            # Run OCR pipeline
+            ocr_result = pipeline(
+                front_img=front_img,
+                back_img=back_img,
+                doc_type="cin"
+            )
 
-        # Use YOUR existing verification function
-        verification_result = verify_document(
-            extracted_data=ocr_result.get("data", {}),
-            doc_type="cin"
-        )
+            # Check for OCR errors
+            if ocr_result.get("error"):
+                return {
+                    "extracted_data": {},
+                    "quality": ocr_result.get("quality", []),
+                    "verification": [ocr_result.get("error")],
+                    "error": ocr_result.get("error")
+                }
+
+            # Use YOUR existing verification function
+            verification_result = verify_document(
+                extracted_data=ocr_result.get("data", {}),
+                doc_type="cin"
+            )
 
         # Save to database
         ocr_record = {
@@ -206,10 +465,10 @@ async def upload_cin(
             "extracted_data": ocr_result.get("data", {}),
             "quality_check": ocr_result.get("quality", []),
             "verification": verification_result,
+            "trace": trace.data,
             "timestamp": datetime.utcnow()
         }
-        result = ocr_col.insert_one(ocr_record)
-        record_id = str(result.inserted_id)
+        record_id = await save_upload(ocr_record)
 
         return {
             "extracted_data": ocr_result.get("data", {}),
@@ -229,30 +488,32 @@ async def upload_passport(
         current_user: dict = Depends(get_current_user)
 ):
     """Upload passport image for OCR processing"""
+    check_upload_size(file)
     try:
-        # Process image
-        img = Image.open(file.file)
-
-        # Run OCR pipeline
-        ocr_result = pipeline(
-            front_img=img,
-            doc_type="passport"
-        )
-
-        # Check for OCR errors
-        if ocr_result.get("error"):
-            return {
-                "extracted_data": {},
-                "quality": ocr_result.get("quality", []),
-                "verification": [ocr_result.get("error")],
-                "error": ocr_result.get("error")
-            }
+        with record_trace("passport") as trace:
+            # Process image
+            img = open_image(file)
+
+            # Run OCR pipeline
+            ocr_result = pipeline(
+                front_img=img,
+                doc_type="passport"
+            )
 
-        # Use YOUR existing verification function
-        verification_result = verify_document(
-            extracted_data=ocr_result.get("data", {}),
-            doc_type="passport"
-        )
+            # Check for OCR errors
+            if ocr_result.get("error"):
+                return {
+                    "extracted_data": {},
+                    "quality": ocr_result.get("quality", []),
+                    "verification": [ocr_result.get("error")],
+                    "error": ocr_result.get("error")
+                }
+
+            # Use YOUR existing verification function
+            verification_result = verify_document(
+                extracted_data=ocr_result.get("data", {}),
+                doc_type="passport"
+            )
 
         # Save to database
         ocr_record = {
@@ -263,10 +524,10 @@ async def upload_passport(
             "extracted_data": ocr_result.get("data", {}),
             "quality_check": ocr_result.get("quality", []),
             "verification": verification_result,
+            "trace": trace.data,
             "timestamp": datetime.utcnow()
         }
-        result = ocr_col.insert_one(ocr_record)
-        record_id = str(result.inserted_id)
+        record_id = await save_upload(ocr_record)
 
         return {
             "extracted_data": ocr_result.get("data", {}),
@@ -279,17 +540,57 @@ async def upload_passport(
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
 
 
+# Always returned by /ocr/history
+HISTORY_PROJECTION = {
+    "filename": 1, "front_filename": 1, "doc_type": 1, "timestamp": 1,
+    "verification.overall_score": 1, "storage": 1
+}
+# Opt-in through ?fields=; text, tables and images of PDFs may live in the pages collection
+HISTORY_FIELDS = ("extracted_data", "verification", "quality_check", "total_pages",
+                  "extracted_pages", "text", "tables", "images")
+PDF_CONTENT_FIELDS = ("text", "tables", "images")
+
+
 @app.get("/ocr/history")
-async def get_ocr_history(current_user: dict = Depends(get_current_user)):
+async def get_ocr_history(
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[str] = None,
+        current_user: dict = Depends(get_token_user)
+):
     """
-    Get OCR processing history for current user
+    Get OCR processing history for current user, newest first, one page at a time.
+    Pass next_cursor back as ?cursor= for the following page; ?fields=text,tables,...
+    adds heavy fields to the default summary.
     """
-    history = list(ocr_col.find(
-        {"user_id": current_user["_id"]},
-        {"_id": 0}  # Exclude MongoDB _id from response
-    ).sort("timestamp", -1))
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    unknown = set(requested) - set(HISTORY_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    projection = dict(HISTORY_PROJECTION, **{f: 1 for f in requested})
+    if "verification" in requested:
+        projection.pop("verification.overall_score")  # path collision with the whole sub-document
+    page = await run_db(keyset_page, ocr_col.sync, {"user_id": current_user["_id"]}, projection,
+                        "timestamp", cursor, page_limit(limit))
+
+    history = []
+    for record in page["items"]:
+        item = {
+            "record_id": str(record["_id"]),
+            "filename": record.get("filename") or record.get("front_filename"),
+            "doc_type": record.get("doc_type"),
+            "timestamp": record.get("timestamp"),
+            "score": record.get("verification", {}).get("overall_score"),
+        }
+        if record.get("doc_type") == "pdf" and any(f in PDF_CONTENT_FIELDS for f in requested):
+            record.update(await run_db(load_pdf_content, record))
+        for f in requested:
+            if f in record:
+                item[f] = record[f]
+        history.append(item)
 
-    return {"history": history}
+    return {"history": history, "next_cursor": page["next_cursor"], "has_more": page["has_more"]}
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -297,77 +598,161 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.get("/admin/uploads", response_class=HTMLResponse)
-async def admin_uploads(request: Request, current_user=Depends(get_current_user)):
-    uploads = list(ocr_col.find().sort("timestamp", -1))
-    for u in uploads:
-        u["_id"] = str(u["_id"])
+async def admin_uploads(
+        request: Request,
+        q: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        sort: str = "timestamp",
+        order: str = "desc",
+        cursor: Optional[str] = None,
+        current_user=Depends(require_admin)
+):
+    # Only the visible page is rendered; following pages come from /admin/api/uploads
+    page = await run_db(auth_routes.admin_uploads_page, q=q, doc_type=doc_type, sort=sort, order=order,
+                        cursor=cursor)
 
     return templates.TemplateResponse("admin_uploads.html", {
         "request": request,
         "title": "All Uploads",
         "username": current_user["username"],
-        "uploads": uploads
+        "uploads": page["items"],
+        "next_cursor": page["next_cursor"]
     })
 
 @app.get("/admin/uploads/{doc_id}")
-async def admin_upload_details(doc_id: str):
-    doc = ocr_col.find_one({"_id": ObjectId(doc_id)})
+async def admin_upload_details(doc_id: str, current_user=Depends(require_admin)):
+    doc = await ocr_col.find_one({"_id": ObjectId(doc_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Record not found")
+    decode_fields(doc)
+    if is_paged(doc):
+        doc["extracted_text"] = {"pages": await run_db(lambda: list(iter_record_pages(doc["_id"])))}
     doc["_id"] = str(doc["_id"])
     return doc
 
 @app.get("/admin/users", response_class=HTMLResponse)
-async def admin_users(request: Request, current_user=Depends(get_current_user)):
-    users = list(users_col.find())
-
-    for u in users:
-        u["_id"] = str(u["_id"])
+async def admin_users(
+        request: Request,
+        q: Optional[str] = None,
+        sort: str = "username",
+        order: str = "asc",
+        cursor: Optional[str] = None,
+        current_user=Depends(require_admin)
+):
+    page = await run_db(auth_routes.admin_users_page, q=q, sort=sort, order=order, cursor=cursor)
 
     return templates.TemplateResponse("admin_users.html", {
         "request": request,
         "title": "Users",
         "username": current_user["username"],
-        "users": users
+        "users": page["items"],
+        "next_cursor": page["next_cursor"]
     })
 
 @app.delete("/admin/users/delete/{user_id}")
-async def delete_user(user_id: str):
-    users_col.delete_one({"_id": ObjectId(user_id)})
+async def delete_user(user_id: str, current_user=Depends(require_admin)):
+    await users_col.delete_one({"_id": ObjectId(user_id)})
+    invalidate_user(user_id)
     return {"success": True}
 @app.put("/admin/users/modify/{user_id}")
-async def modify_user(user_id: str, payload: dict):
+async def modify_user(user_id: str, payload: dict, current_user=Depends(require_admin)):
     new_pw = payload.get("password")
     if not new_pw:
         return {"error": "Password required"}
-    hashed_pw = hash_password(new_pw)
-    users_col.update_one({"_id": ObjectId(user_id)}, {"$set": {"password": hashed_pw}})
+    hashed_pw = await hash_password_async(new_pw)
+    await users_col.update_one({"_id": ObjectId(user_id)}, {"$set": {"password": hashed_pw}})
+    invalidate_user(user_id)
     return {"success": True}
 
 
-from fastapi.responses import StreamingResponse
+def table_to_text(table: dict) -> str:
+    """One ' | '-separated line per row, header first"""
+    rows = [table.get('headers', [])] + table.get('rows', [])
+    return "\n".join(" | ".join(map(str, r)) for r in rows if r)
 
 
-@app.get("/ocr/pdf/render/{record_id}")
-async def render_pdf(record_id: str):
-    record = ocr_col.find_one({"_id": ObjectId(record_id)})
-    if not record:
-        raise HTTPException(status_code=404, detail="Record not found")
+def record_render_content(record: dict) -> list:
+    """Flatten a stored PDF record into render_pdf_inline items, preserving page order"""
+    if is_paged(record) and not has_header_content(record):
+        pages = iter_record_pages(record["_id"])
+    elif record.get("pages"):
+        pages = record["pages"]
+    else:
+        # Legacy or edited record: text, then tables, then images
+        content = load_pdf_content(record)
+        items = [{"type": "text", "value": content["text"]}] if content["text"] else []
+        items += [dict(t, type="table") for t in content["tables"]]
+        items += [dict(img, type="image") for img in content["images"]]
+        pages = [{"content": items}]
 
-    # Flatten content preserving order
     all_content = []
-    for page in record.get("pages", []):
+    for page in pages:
         for item in page.get("content", []):
             if item['type'] == 'text':
                 all_content.append({'type': 'text', 'value': item['value']})
-            elif item['type'] == 'image':
+            elif item['type'] == 'table':
+                all_content.append({'type': 'text', 'value': table_to_text(item)})
+            elif item['type'] == 'image' and item.get('base64'):
                 img_bytes = base64.b64decode(item['base64'].split(",", 1)[-1])
                 all_content.append({'type': 'image', 'image_bytes': img_bytes})
+    return all_content
 
-    pdf_bytes = render_pdf_inline(all_content)
-    return StreamingResponse(
-        pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"inline; filename={record['filename']}"}
-    )
+
+def record_etag(record_id: str, record: dict) -> str:
+    """Strong validator for a record's rendered output, changes whenever the record is updated"""
+    version = record.get("last_updated") or record.get("timestamp")
+    stamp = version.isoformat() if isinstance(version, datetime) else str(version)
+    return '"' + hashlib.sha1(f"{record_id}:{stamp}".encode()).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for it): exact tags, W/ ignored, * matches any"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+@app.get("/ocr/pdf/render/{record_id}")
+async def render_pdf(record_id: str, request: Request, current_user: dict = Depends(get_token_user)):
+    try:
+        record_oid = ObjectId(record_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid record_id")
+
+    # Header fields only: enough to answer a revalidation without touching page bodies
+    record = await ocr_col.find_one(
+        {"_id": record_oid},
+        {"user_id": 1, "filename": 1, "timestamp": 1, "last_updated": 1, "storage": 1}
+    ) or pending_upload(record_oid)
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    # Owners and admins only; checked before the ETag so revalidations are authorized too
+    if current_user.get("role") != "admin" and str(record.get("user_id")) != str(current_user["_id"]):
+        raise HTTPException(status_code=403, detail="Not authorized to view this record")
+
+    etag = record_etag(record_id, record)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"inline; filename={record.get('filename', 'document.pdf')}"
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+
+    pdf_bytes = render_cache.get(etag)
+    if pdf_bytes is None:
+        record = await ocr_col.find_one({"_id": record_oid}) or pending_upload(record_oid)
+        if not record:
+            raise HTTPException(status_code=404, detail="Record not found")
+        content = await run_db(record_render_content, record)
+        # ReportLab is CPU-bound: keep it off the event loop
+        pdf_bytes = await run_in_threadpool(lambda: render_pdf_inline(content).getvalue())
+        render_cache.set(etag, pdf_bytes)
+
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
 class UpdateExtractedDataRequest(BaseModel):
@@ -386,9 +771,11 @@ async def update_extracted_data(
     """
     try:
         # Find the record
-        record = ocr_col.find_one({"_id": ObjectId(record_id)})
+        record = await ocr_col.find_one({"_id": ObjectId(record_id)})
 
         if not record:
+            if pending_upload(record_id):
+                raise HTTPException(status_code=409, detail="Record is still being saved, retry shortly")
             raise HTTPException(status_code=404, detail="Record not found")
 
         # Check if user owns this record (optional security check)
@@ -399,10 +786,10 @@ async def update_extracted_data(
         update_data = {}
 
         if request.doc_type == "contract":
-            # For PDF/Contract documents
-            update_data["text"] = request.extracted_data.get("text", "")
-            update_data["tables"] = request.extracted_data.get("tables", [])
-            update_data["images"] = request.extracted_data.get("images", [])
+            # For PDF/Contract documents (large payloads are stored compressed)
+            update_data["text"], _, _ = encode_value(request.extracted_data.get("text", ""))
+            update_data["tables"], _, _ = encode_value(request.extracted_data.get("tables", []))
+            update_data["images"], _, _ = encode_value(request.extracted_data.get("images", []))
         else:
             # For CIN/Passport documents
             update_data["extracted_data"] = request.extracted_data
@@ -411,7 +798,7 @@ async def update_extracted_data(
         update_data["last_updated"] = datetime.utcnow()
 
         # Update the record in database
-        result = ocr_col.update_one(
+        result = await ocr_col.update_one(
             {"_id": ObjectId(record_id)},
             {"$set": update_data}
         )
@@ -437,13 +824,13 @@ async def update_extracted_data(
 @app.get("/ocr/record/{record_id}")
 async def get_ocr_record(
         record_id: str,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_token_user)
 ):
     """
     Get a specific OCR record by ID
     """
     try:
-        record = ocr_col.find_one({"_id": ObjectId(record_id)})
+        record = await ocr_col.find_one({"_id": ObjectId(record_id)}) or pending_upload(record_id)
 
         if not record:
             raise HTTPException(status_code=404, detail="Record not found")
@@ -452,6 +839,13 @@ async def get_ocr_record(
         if str(record.get("user_id")) != str(current_user["_id"]):
             raise HTTPException(status_code=403, detail="Not authorized to view this record")
 
+        # Reassemble page bodies of PDF records
+        if record.get("doc_type") == "pdf":
+            record.update(await run_db(load_pdf_content, record))
+
+        # Processing traces are shown in the admin views only
+        record.pop("trace", None)
+
         # Convert ObjectId to string
         record["_id"] = str(record["_id"])
         record["user_id"] = str(record["user_id"])
@@ -466,18 +860,59 @@ async def get_ocr_record(
         raise HTTPException(status_code=500, detail=f"Failed to fetch record: {str(e)}")
 
 
+def tables_zip_response(tables, fmt: str, filename_base: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_tables_zip(tables, fmt),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename_base}_tables_{fmt}.zip"}
+    )
+
+
+def check_table_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt not in TABLE_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid table format. Use csv, parquet or arrow.")
+    if not table_format_available(fmt):
+        raise HTTPException(status_code=501, detail=f"{fmt} export requires pyarrow to be installed")
+    return fmt
+
+
+@app.get("/ocr/export/{record_id}/tables/{table_format}")
+async def export_record_tables(record_id: str, table_format: str, current_user: dict = Depends(get_token_user)):
+    """
+    Export the tables of a PDF record as typed columns (zip of CSV, Parquet or Arrow files)
+    """
+    table_format = check_table_format(table_format)
+    record = await ocr_col.find_one(
+        {"_id": ObjectId(record_id)},
+        {"user_id": 1, "doc_type": 1, "filename": 1, "storage": 1, "tables": 1}
+    )
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    if str(record.get("user_id")) != str(current_user["_id"]):
+        raise HTTPException(status_code=403, detail="Not authorized to access this record")
+    if record.get("doc_type") != "pdf":
+        raise HTTPException(status_code=400, detail="Only PDF records contain tables")
+
+    tables = [(record_id, table) for table in await run_db(load_pdf_tables, record)]
+    return tables_zip_response(tables, table_format, record.get("filename", "ocr_record"))
+
+
 @app.get("/ocr/export/{record_id}/{export_format}")
-async def export_ocr_record(record_id: str, export_format: str, current_user: dict = Depends(get_current_user)):
+async def export_ocr_record(record_id: str, export_format: str, current_user: dict = Depends(get_token_user)):
     """
     Export extracted data and verification as PDF, Excel, CSV, or JSON
     """
-    record = ocr_col.find_one({"_id": ObjectId(record_id)})
+    import pandas as pd  # only this route needs it, imported on first export
+
+    record = await ocr_col.find_one({"_id": ObjectId(record_id)}) or pending_upload(record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
 
     # Check if user owns the record
     if str(record.get("user_id")) != str(current_user["_id"]):
         raise HTTPException(status_code=403, detail="Not authorized to access this record")
+    record.pop("trace", None)
 
     export_format = export_format.lower()
     filename_base = f"{record.get('filename', 'ocr_record')}_export"
@@ -487,12 +922,12 @@ async def export_ocr_record(record_id: str, export_format: str, current_user: di
 
     # For PDFs (text + tables + images)
     if record.get("doc_type") == "pdf":
-        if "text" in record:
-            content_list.append({"type": "text", "value": record["text"]})
-        # Optionally, serialize tables
-        if "tables" in record:
-            for table in record["tables"]:
-                content_list.append({"type": "text", "value": str(table)})
+        pdf_content = await run_db(load_pdf_content, record)
+        record.update(pdf_content)
+        if pdf_content["text"]:
+            content_list.append({"type": "text", "value": pdf_content["text"]})
+        for table in pdf_content["tables"]:
+            content_list.append({"type": "text", "value": table_to_text(table)})
         # Include verification summary
         content_list.append({"type": "text", "value": "Verification Results:\n" + str(record.get("verification", {}))})
 
@@ -503,9 +938,8 @@ async def export_ocr_record(record_id: str, export_format: str, current_user: di
 
     # Export by format
     if export_format == "pdf":
-        pdf_bytes = render_pdf_inline(content_list)
         return StreamingResponse(
-            pdf_bytes,
+            stream_pdf_inline(content_list),
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename={filename_base}.pdf"}
         )
@@ -516,7 +950,8 @@ async def export_ocr_record(record_id: str, export_format: str, current_user: di
             df = pd.DataFrame([record.get("extracted_data", {})])
         output = BytesIO()
         if export_format == "excel":
-            df.to_excel(output, index=False)
+            with timed("export_excel"):
+                df.to_excel(output, index=False)
             output.seek(0)
             return StreamingResponse(
                 output,
@@ -524,7 +959,8 @@ async def export_ocr_record(record_id: str, export_format: str, current_user: di
                 headers={"Content-Disposition": f"attachment; filename={filename_base}.xlsx"}
             )
         else:
-            df.to_csv(output, index=False)
+            with timed("export_csv"):
+                df.to_csv(output, index=False)
             output.seek(0)
             return StreamingResponse(
                 output,
@@ -540,5 +976,70 @@ async def export_ocr_record(record_id: str, export_format: str, current_user: di
 
     else:
         raise HTTPException(status_code=400, detail="Invalid export format. Use pdf, excel, csv, or json.")
+
+
+@app.get("/ocr/export-bulk/tables/{table_format}")
+async def export_tables_bulk(
+        table_format: str,
+        user_id: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        authentic: Optional[bool] = None,
+        confidence: Optional[str] = None,
+        current_user: dict = Depends(get_token_user)
+):
+    """
+    Export the tables of all matching PDF records; tables with the same columns are concatenated
+    """
+    table_format = check_table_format(table_format)
+    if current_user.get("role") != "admin":
+        user_id = str(current_user["_id"])
+
+    try:
+        query = build_export_query(user_id, "pdf", date_from, date_to, authentic, confidence)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+
+    filename_base = f"ocr_records_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    return tables_zip_response(iter_query_tables(query), table_format, filename_base)
+
+
+@app.get("/ocr/export-bulk/{export_format}")
+async def export_ocr_records_bulk(
+        export_format: str,
+        user_id: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        authentic: Optional[bool] = None,
+        confidence: Optional[str] = None,
+        current_user: dict = Depends(get_token_user)
+):
+    """
+    Export all records matching the filters as CSV, JSONL or Excel, streamed from the database
+    """
+    export_format = export_format.lower()
+    if export_format not in EXPORT_WRITERS:
+        raise HTTPException(status_code=400, detail="Invalid export format. Use csv, jsonl or excel.")
+
+    # Regular users can only export their own records
+    if current_user.get("role") != "admin":
+        user_id = str(current_user["_id"])
+
+    try:
+        query = build_export_query(user_id, doc_type, date_from, date_to, authentic, confidence)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"ocr_records_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        EXPORT_WRITERS[export_format](query),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 if __name__ == "__main__":
+   import uvicorn
    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Lightweight in-process metrics
+Stage durations are collected into histograms through `timed`, which works both as a
+context manager and as a decorator; gauges are read from callbacks when /metrics is
+scraped. Everything is rendered in the Prometheus text format without a client library.
+
+Recording a sample is a bisect and a few additions under a lock, cheap enough to stay on.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Union
+
+from tracing import current_trace
+
+# Seconds: parsing takes milliseconds, CPU recognition of a large scan tens of seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Histogram with a single label (e.g. stage or route)."""
+
+    def __init__(self, name: str, help: str, label: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for label_value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Count and total seconds per label value."""
+        with self._lock:
+            return {k: {"count": sum(v[:-1]), "sum": v[-1]} for k, v in self._series.items()}
+
+
+class Counter:
+    """Monotonic counter with a single label."""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: float = 1):
+        with self._lock:
+            self._values[label_value] += amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return _render_values(self.name, self.help, "counter", self.label, values)
+
+
+class Callback:
+    """Value(s) computed at scrape time: a number, or {label value: number}."""
+
+    def __init__(self, name: str, help: str, func: Callable[[], Union[float, Dict[str, float]]],
+                 label: str = None, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.label = label
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            values = self.func()
+        except Exception as e:
+            print(f"Warning: metric {self.name} unavailable: {e}")
+            return []
+        return _render_values(self.name, self.help, self.kind, self.label, values)
+
+
+def _render_values(name, help, kind, label, values) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    if isinstance(values, dict):
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{name}{{{label}="{_escape(label_value)}"}} {_number(value)}')
+    else:
+        lines.append(f"{name} {_number(values)}")
+    return lines
+
+
+_registry: list = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def register_callback(name: str, help: str, func, label: str = None, kind: str = "gauge"):
+    return register(Callback(name, help, func, label=label, kind=kind))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ----- PROCESSING STAGES -----
+STAGE_SECONDS = register(Histogram("ocr_stage_seconds", "Time spent in each processing stage", "stage"))
+STAGE_ERRORS = register(Counter("ocr_stage_errors_total", "Processing stages that raised", "stage"))
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Record how long a block takes under `stage`; as a decorator, times every call:
+
+        with timed("decode"): ...
+
+        @timed("verify_document")
+        def verify_document(...): ...
+
+    Inside record_trace() the duration is also added to the record's trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(stage, elapsed)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_stage(stage, elapsed)
+
+
+# ----- HTTP REQUESTS -----
+REQUEST_SECONDS = register(Histogram(
+    "http_request_seconds", "Time until the response starts, per route", "route"))
+REQUEST_ERRORS = register(Counter("http_request_errors_total", "Responses with a 5xx status, per route", "route"))
+
+
+# ----- WORKER POOLS -----
+_pool_sizes: Dict[str, int] = {}
+_busy: Dict[str, int] = defaultdict(int)
+_busy_lock = threading.Lock()
+BUSY_SECONDS = register(Counter(
+    "worker_busy_seconds_total", "Time workers spent running tasks; rate / worker_threads = utilization", "pool"))
+register_callback("worker_threads", "Workers per pool", lambda: dict(_pool_sizes), label="pool")
+register_callback("workers_busy", "Workers currently running a task", lambda: dict(_busy), label="pool")
+
+
+def register_pool(pool: str, size: int):
+    _pool_sizes[pool] = size
+
+
+@contextmanager
+def busy(pool: str):
+    """Count a worker of `pool` as busy for the duration of the block."""
+    with _busy_lock:
+        _busy[pool] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        BUSY_SECONDS.inc(pool, time.perf_counter() - start)
+        with _busy_lock:
+            _busy[pool] -= 1
+
+
+# ----- CACHES -----
+_caches: Dict[str, object] = {}
+register_callback("cache_hits_total", "Cache lookups served from the cache",
+                  lambda: {name: c.hits for name, c in _caches.items()}, label="cache", kind="counter")
+register_callback("cache_misses_total", "Cache lookups that missed",
+                  lambda: {name: c.misses for name, c in _caches.items()}, label="cache", kind="counter")
+register_callback("cache_entries", "Entries currently held",
+                  lambda: {name: len(c) for name, c in _caches.items()}, label="cache")
+register_callback("cache_bytes", "Approximate size of the entries held, for caches bounded by size",
+                  lambda: {name: c.bytes for name, c in _caches.items() if c.max_bytes is not None}, label="cache")
+register_callback("cache_hit_ratio", "Hits over all lookups since start",
+                  lambda: {name: c.stats["hit_rate"] for name, c in _caches.items()}, label="cache")
+
+
+def register_cache(name: str, cache):
+    """Expose an LRUCache's hits, misses, size and hit ratio."""
+    _caches[name] = cache
@@ -0,0 +1,79 @@
+"""
+Keyset pagination helpers
+Pages are addressed by an opaque cursor holding the sort key and _id of the last
+row served, so each page is an indexed range query instead of a growing skip.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+from config import Config
+
+
+def page_limit(limit: Optional[int], default: int = None) -> int:
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE."""
+    if not limit:
+        return default or Config.DEFAULT_PAGE_SIZE
+    return max(1, min(limit, Config.MAX_PAGE_SIZE))
+
+
+def encode_cursor(value: Any, doc_id: ObjectId) -> str:
+    if isinstance(value, datetime):
+        payload = {"d": value.isoformat(), "id": str(doc_id)}
+    else:
+        payload = {"v": value, "id": str(doc_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    """Inverse of encode_cursor, raises 400 on anything that was not produced by it."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = datetime.fromisoformat(payload["d"]) if "d" in payload else payload["v"]
+        return value, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, cursor: Optional[str], descending: bool = True) -> Dict[str, Any]:
+    """Condition selecting the rows after the cursor in (field, _id) order."""
+    if not cursor:
+        return {}
+    value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: doc_id}},
+    ]}
+
+
+def keyset_page(collection, query: Dict[str, Any], projection: Dict[str, Any], field: str,
+                cursor: Optional[str], limit: int, descending: bool = True) -> Dict[str, Any]:
+    """
+    Fetch one page sorted by (field, _id)
+
+    Returns:
+        Dictionary with the page 'items', 'next_cursor' (None on the last page) and 'has_more'
+    """
+    after = keyset_filter(field, cursor, descending)
+    if after:
+        query = {"$and": [query, after]} if query else after
+    direction = -1 if descending else 1
+
+    # One extra row tells whether another page exists without a count
+    items: List[dict] = list(
+        collection.find(query, dict(projection, **{field: 1}))
+        .sort([(field, direction), ("_id", direction)])
+        .limit(limit + 1)
+    )
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1].get(field), items[-1]["_id"]) if has_more else None
+    return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
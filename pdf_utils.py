@@ -1,49 +1,125 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
 from io import BytesIO
-from PIL import Image
-import tempfile
 
+from config import Config
+from metrics import timed
 
-def render_pdf_inline(content_list):
+try:
+    import arabic_reshaper
+except ImportError:  # optional, Arabic is drawn unshaped without it
+    arabic_reshaper = None
+
+try:
+    from bidi.algorithm import get_display
+except ImportError:  # optional, Arabic is drawn in logical order without it
+    get_display = None
+
+FONT_SIZE = 10
+LINE_HEIGHT = 12
+IMAGE_SPACING = 10
+
+_font_name = None
+
+
+def _body_font() -> str:
+    """Register Config.PDF_FONT_PATH once; Helvetica has no Arabic glyphs."""
+    global _font_name
+    if _font_name is None:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        _font_name = "Helvetica"
+        if Config.PDF_FONT_PATH:
+            try:
+                pdfmetrics.registerFont(TTFont("DocumentFont", Config.PDF_FONT_PATH))
+                _font_name = "DocumentFont"
+            except Exception as e:
+                print(f"⚠ Could not load PDF font {Config.PDF_FONT_PATH}: {e}")
+    return _font_name
+
+
+def _is_rtl(text: str) -> bool:
+    """Hebrew/Arabic letters, including the presentation forms produced by reshaping."""
+    return any('\u0590' <= ch <= '\u08ff' or '\ufb1d' <= ch <= '\ufefc' for ch in text)
+
+
+def _wrap_line(line: str, font: str, max_width: float):
+    """
+    Wrap one logical line to the page width
+
+    Returns:
+        List of (visual text, right-aligned) pairs
+    """
+    from reportlab.lib.utils import simpleSplit
+
+    if not line.strip():
+        return [("", False)]
+
+    rtl = _is_rtl(line)
+    if rtl and arabic_reshaper is not None:
+        line = arabic_reshaper.reshape(line)
+
+    # Wrap in logical order (glyph widths are the same), then reorder each visual line
+    wrapped = simpleSplit(line, font, FONT_SIZE, max_width) or [line]
+    if rtl and get_display is not None:
+        wrapped = [get_display(part) for part in wrapped]
+    return [(part, rtl) for part in wrapped]
+
+
+@timed("render_pdf")
+def render_pdf_inline(content_list, output=None):
     """
     Render text and images inline in a PDF preserving order.
 
     content_list: [{'type': 'text', 'value': ...}, {'type': 'image', 'image_bytes': ...}]
-    Returns: BytesIO with PDF data
+    output: optional binary file-like object to write to
+    Returns: the output (a BytesIO by default), rewound to the start
     """
-    buffer = BytesIO()
+    # ReportLab is imported on first render, not when the app starts
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    buffer = output if output is not None else BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
     margin = 20 * mm
+    max_width = width - 2 * margin
+    font = _body_font()
+    c.setFont(font, FONT_SIZE)
     y_cursor = height - margin
 
+    def new_page():
+        nonlocal y_cursor
+        c.showPage()
+        c.setFont(font, FONT_SIZE)
+        y_cursor = height - margin
+
     for item in content_list:
         if item['type'] == 'text':
-            lines = item['value'].split("\n")
-            c.setFont("Helvetica", 10)
-            for line in lines:
-                if y_cursor < margin:
-                    c.showPage()
-                    y_cursor = height - margin
-                    c.setFont("Helvetica", 10)
-                c.drawString(margin, y_cursor, line)
-                y_cursor -= 12
+            for line in str(item['value']).split("\n"):
+                for text, right_aligned in _wrap_line(line, font, max_width):
+                    if y_cursor - LINE_HEIGHT < margin:
+                        new_page()
+                    y_cursor -= LINE_HEIGHT
+                    if right_aligned:
+                        c.drawRightString(width - margin, y_cursor, text)
+                    else:
+                        c.drawString(margin, y_cursor, text)
 
         elif item['type'] == 'image':
             try:
-                pil_img = Image.open(BytesIO(item['image_bytes']))
-                max_width = width - 2 * margin
-                max_height = y_cursor - margin
-                pil_img.thumbnail((max_width, max_height))
-
-                temp_img_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-                pil_img.save(temp_img_file.name)
-                c.drawImage(temp_img_file.name, margin, y_cursor - pil_img.height,
-                            width=pil_img.width, height=pil_img.height)
-                y_cursor -= pil_img.height + 10
-                temp_img_file.close()
+                # ImageReader passes JPEG data through unchanged, no temp file or re-encode
+                image = ImageReader(BytesIO(item['image_bytes']))
+                img_width, img_height = image.getSize()
+                scale = min(1.0, max_width / img_width, (height - 2 * margin) / img_height)
+                draw_width, draw_height = img_width * scale, img_height * scale
+
+                if y_cursor - draw_height < margin:
+                    new_page()
+                c.drawImage(image, margin, y_cursor - draw_height,
+                            width=draw_width, height=draw_height, mask='auto')
+                y_cursor -= draw_height + IMAGE_SPACING
             except Exception as e:
                 print(f"⚠ Could not render image: {e}")
                 continue
@@ -51,3 +127,21 @@ def render_pdf_inline(content_list):
     c.save()
     buffer.seek(0)
     return buffer
+
+
+def stream_pdf_inline(content_list, chunk_size: int = None):
+    """
+    Render a PDF and yield it in chunks for a StreamingResponse.
+
+    The canvas only serializes on save, so the document is built in memory once
+    and then sent in fixed-size slices instead of one large body.
+    """
+    chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+    buffer = render_pdf_inline(content_list)
+    view = buffer.getbuffer()
+    try:
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    finally:
+        view.release()
+        buffer.close()
@@ -0,0 +1,230 @@
+"""
+PDF record storage
+A small header document lives in 'uploads'; page bodies live in 'pages', one document
+per page (or per chunk of a page), so large PDFs stay under the 16 MB document limit
+and metadata queries never load page content.
+
+Large text/table payloads are compressed on write (STORAGE_CODEC) and decompressed
+only when read; small values are stored as-is so they remain queryable.
+"""
+import json
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bson import Binary, ObjectId
+
+from config import Config
+from database import get_collection
+from metrics import timed
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is always available
+    zstandard = None
+
+ocr_col = get_collection("uploads")
+pages_col = get_collection("pages")
+
+STORAGE_PAGES = "pages"
+CODEC_KEY = "__codec__"
+
+
+# ----- STORAGE CODEC -----
+def _active_codec() -> str:
+    codec = Config.STORAGE_CODEC
+    if codec == "zstd" and zstandard is None:
+        return "zlib"
+    return codec if codec in ("zlib", "zstd") else "none"
+
+
+def encode_value(value: Any) -> Tuple[Any, int, int]:
+    """
+    Compress a JSON-serializable value if it is large enough
+
+    Returns:
+        (stored value, raw size in bytes, stored size in bytes)
+    """
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    codec = _active_codec()
+    if codec == "none" or len(raw) < Config.COMPRESSION_MIN_BYTES:
+        return value, len(raw), len(raw)
+
+    if codec == "zstd":
+        data = zstandard.ZstdCompressor(level=Config.COMPRESSION_LEVEL).compress(raw)
+    else:
+        data = zlib.compress(raw, Config.COMPRESSION_LEVEL)
+    if len(data) >= len(raw):
+        return value, len(raw), len(raw)
+    return {CODEC_KEY: codec, "data": Binary(data), "size": len(raw)}, len(raw), len(data)
+
+
+def decode_value(value: Any) -> Any:
+    """Inverse of encode_value; plain values are returned unchanged."""
+    if not isinstance(value, dict) or CODEC_KEY not in value:
+        return value
+    data = bytes(value["data"])
+    if value[CODEC_KEY] == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this record")
+        raw = zstandard.ZstdDecompressor().decompress(data, max_output_size=value.get("size", 0))
+    else:
+        raw = zlib.decompress(data)
+    return json.loads(raw)
+
+
+def decode_fields(record: dict, fields=("text", "tables", "images")) -> dict:
+    """Decode compressed header fields in place."""
+    for field in fields:
+        if field in record:
+            record[field] = decode_value(record[field])
+    return record
+
+
+def storage_stats(raw_bytes: int, stored_bytes: int) -> Dict[str, Any]:
+    return {
+        "codec": _active_codec(),
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else 1.0
+    }
+
+
+def _item_size(item: dict) -> int:
+    """Rough BSON size of a content item, good enough for chunking."""
+    if item.get("type") == "text":
+        return len(item.get("value", "")) * 2
+    if item.get("type") == "image":
+        return len(item.get("base64", ""))
+    if item.get("type") == "table":
+        cells = [item.get("headers", [])] + item.get("rows", [])
+        return sum(len(str(c)) * 2 + 16 for row in cells for c in row)
+    return 256
+
+
+def split_page_chunks(record_id: ObjectId, pages: List[dict]) -> Tuple[List[dict], Dict[str, Any]]:
+    """
+    Turn extracted pages into compressed 'pages' documents, splitting pages above PAGE_CHUNK_BYTES
+
+    Returns:
+        (documents, storage stats)
+    """
+    docs = []
+    raw_total = stored_total = 0
+
+    def add_chunk(page_number, index, content):
+        nonlocal raw_total, stored_total
+        stored, raw_size, stored_size = encode_value(content)
+        raw_total += raw_size
+        stored_total += stored_size
+        docs.append({"record_id": record_id, "page_number": page_number,
+                     "chunk": index, "content": stored})
+
+    for page in pages:
+        chunk, chunk_size, chunk_index = [], 0, 0
+        for item in page.get("content", []):
+            size = _item_size(item)
+            if chunk and chunk_size + size > Config.PAGE_CHUNK_BYTES:
+                add_chunk(page["page_number"], chunk_index, chunk)
+                chunk, chunk_size, chunk_index = [], 0, chunk_index + 1
+            chunk.append(item)
+            chunk_size += size
+        add_chunk(page["page_number"], chunk_index, chunk)
+
+    return docs, storage_stats(raw_total, stored_total)
+
+
+@timed("db_insert_pdf")
+def insert_pdf_record(header: Dict[str, Any], pages: List[dict]) -> str:
+    """
+    Store a PDF record: page chunks first (bulk insert), then the header,
+    so a header never points at missing pages.
+    """
+    record_id = header.setdefault("_id", ObjectId())
+    chunks, stats = split_page_chunks(record_id, pages)
+    header["storage"] = STORAGE_PAGES
+    header["page_chunks"] = len(chunks)
+    header["storage_stats"] = stats
+
+    if chunks:
+        pages_col.insert_many(chunks, ordered=False)
+    try:
+        ocr_col.insert_one(header)
+    except Exception:
+        pages_col.delete_many({"record_id": record_id})
+        raise
+    return str(record_id)
+
+
+@timed("db_append_pages")
+def append_pdf_pages(record_id: ObjectId, pages: List[dict]) -> Tuple[int, Dict[str, Any]]:
+    """Add newly extracted pages to an existing record, returns (chunks written, storage stats)."""
+    chunks, stats = split_page_chunks(record_id, pages)
+    if chunks:
+        pages_col.insert_many(chunks, ordered=False)
+    return len(chunks), stats
+
+
+def iter_record_pages(record_id: ObjectId) -> Iterator[dict]:
+    """Yield the stored pages of a record in order, merging chunks; bodies are fetched lazily."""
+    cursor = pages_col.find(
+        {"record_id": record_id},
+        {"_id": 0, "page_number": 1, "content": 1}
+    ).sort([("page_number", 1), ("chunk", 1)])
+
+    current = None
+    for chunk in cursor:
+        if current is not None and chunk["page_number"] != current["page_number"]:
+            yield current
+            current = None
+        if current is None:
+            current = {"page_number": chunk["page_number"], "content": []}
+        current["content"].extend(decode_value(chunk.get("content", [])))
+    if current is not None:
+        yield current
+
+
+def is_paged(record: dict) -> bool:
+    return record.get("storage") == STORAGE_PAGES
+
+
+def has_header_content(record: dict) -> bool:
+    """Edited records carry text/tables/images on the header, overriding the stored pages."""
+    return any(field in record for field in ("text", "tables", "images"))
+
+
+def load_pdf_content(record: dict) -> Dict[str, Any]:
+    """
+    Reassemble text, tables and images of a PDF record.
+    Fields set on the header (legacy records, or edited through /ocr/update) take precedence.
+    """
+    if not is_paged(record) or has_header_content(record):
+        return {
+            "text": decode_value(record.get("text", "")),
+            "tables": decode_value(record.get("tables", [])),
+            "images": decode_value(record.get("images", []))
+        }
+
+    texts, tables, images = [], [], []
+    for page in iter_record_pages(record["_id"]):
+        for item in page["content"]:
+            if item["type"] == "text":
+                texts.append(item["value"])
+            elif item["type"] == "table":
+                tables.append(dict(item, table_number=len(tables) + 1))
+            elif item["type"] == "image":
+                images.append(dict(item, image_number=len(images) + 1))
+
+    return {"text": "\n\n".join(texts), "tables": tables, "images": images}
+
+
+def load_pdf_tables(record: dict) -> List[dict]:
+    """Tables of a PDF record, numbered in document order; only needs 'storage' and 'tables' on the header."""
+    if not is_paged(record) or has_header_content(record):
+        return decode_value(record.get("tables", []))
+
+    tables = []
+    for page in iter_record_pages(record["_id"]):
+        for item in page["content"]:
+            if item["type"] == "table":
+                tables.append(dict(item, table_number=len(tables) + 1))
+    return tables
@@ -0,0 +1,130 @@
+"""
+Startup cost of the app
+Heavy libraries are imported where they are first used, so importing main stays
+cheap for worker restarts and CLIs. warm_up() pays those imports (and the EasyOCR
+model load) up front instead; main runs it at startup when WARM_UP_ON_STARTUP is set.
+
+profile imports with:   python startup.py --profile [--module main] [--top 25]
+time the warm-up with:  python startup.py --warm-up
+"""
+import argparse
+import importlib
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# Imported lazily by the routes that need them, in rough order of cost
+HEAVY_MODULES = (
+    "easyocr",                # torch, torchvision, scikit-image
+    "cv2",
+    "pandas",
+    "fitz",                   # PyMuPDF
+    "reportlab.pdfgen.canvas",
+    "openpyxl",
+)
+
+_MARKER = "-- profiled import --"
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+# ----- WARM-UP -----
+def warm_up(load_models: bool = True) -> Dict[str, float]:
+    """
+    Import the heavy modules and load the EasyOCR reader now rather than on the first request
+
+    Returns:
+        Seconds spent per module (and "easyocr_reader" for the model load)
+    """
+    timings = {}
+    for module in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"⚠ Warm-up skipped {module}: {e}")
+            continue
+        timings[module] = round(time.perf_counter() - start, 3)
+
+    if load_models:
+        from OCR.EasyOCR import get_reader
+        start = time.perf_counter()
+        get_reader()
+        timings["easyocr_reader"] = round(time.perf_counter() - start, 3)
+
+    print(f"✅ Warm-up done in {sum(timings.values()):.2f}s")
+    return timings
+
+
+# ----- IMPORT-TIME PROFILE -----
+def profile_imports(module: str = "main") -> Dict[str, Any]:
+    """
+    Import `module` in a fresh interpreter under -X importtime
+
+    Returns:
+        {"wall_s", "packages": {top-level package: self seconds}, "modules": [per module rows]}
+    """
+    # The marker separates the interpreter's own startup imports from those of `module`
+    code = (f"import sys, time; print({_MARKER!r}, file=sys.stderr, flush=True); "
+            f"t = time.perf_counter(); import {module}; print(time.perf_counter() - t)")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed:\n" + "\n".join(lines[-20:]))
+
+    modules: List[Dict[str, Any]] = []
+    packages: Dict[str, float] = defaultdict(float)
+    output = result.stderr.split(_MARKER, 1)[-1]
+    for line in output.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            "module": name,
+            "self_s": int(self_us) / 1e6,
+            "cumulative_s": int(cumulative_us) / 1e6,
+            "depth": len(indent) // 2,
+        })
+        # Self times add up without double counting nested imports
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+
+    return {
+        "wall_s": float(result.stdout.strip().splitlines()[-1]),
+        "packages": dict(packages),
+        "modules": modules,
+    }
+
+
+def print_profile(profile: Dict[str, Any], top: int = 25):
+    total = sum(profile["packages"].values())
+    print(f"Import wall time: {profile['wall_s']:.3f}s ({len(profile['modules'])} modules)")
+
+    print(f"\nTop {top} packages by import time (self time of all their modules):")
+    for name, seconds in sorted(profile["packages"].items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {seconds * 1000:>9.1f} ms  {seconds / total:>6.1%}  {name}")
+
+    print(f"\nTop {top} modules by cumulative import time:")
+    for row in sorted(profile["modules"], key=lambda r: -r["cumulative_s"])[:top]:
+        print(f"  {row['cumulative_s'] * 1000:>9.1f} ms  (self {row['self_s'] * 1000:>7.1f} ms)  {row['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", action="store_true", help="report import time per module")
+    parser.add_argument("--module", default="main", help="module to profile the import of")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--warm-up", action="store_true", help="time the warm-up run at startup")
+    parser.add_argument("--skip-models", action="store_true", help="warm-up without loading the EasyOCR models")
+    args = parser.parse_args()
+
+    if not (args.profile or args.warm_up):
+        parser.error("nothing to do: pass --profile and/or --warm-up")
+    if args.profile:
+        print_profile(profile_imports(args.module), args.top)
+    if args.warm_up:
+        for name, seconds in warm_up(load_models=not args.skip_models).items():
+            print(f"  {seconds * 1000:>9.1f} ms  {name}")
@@ -0,0 +1,120 @@
+"""
+Materialized upload statistics for the admin dashboard
+One 'stats' document per (day, doc_type, username, confidence) bucket, incremented
+on every upload, so dashboard queries scale with the number of buckets, not uploads.
+
+Rebuild from the uploads collection with: python stats_store.py --rebuild
+"""
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from pymongo.errors import DuplicateKeyError
+
+from database import get_collection
+
+uploads_col = get_collection("uploads")
+stats_col = get_collection("stats")
+
+UNKNOWN = "Unknown"
+TOP_USERS = 5
+
+
+def _bucket(record: Dict[str, Any]) -> Dict[str, Any]:
+    timestamp = record.get("timestamp") or datetime.utcnow()
+    return {
+        "day": timestamp.strftime("%Y-%m-%d"),
+        "doc_type": record.get("doc_type") or UNKNOWN,
+        "username": record.get("username") or UNKNOWN,
+        "confidence": (record.get("verification") or {}).get("confidence_level") or "none",
+    }
+
+
+def _bucket_id(bucket: Dict[str, Any]) -> str:
+    return "|".join(str(bucket[k]) for k in ("day", "doc_type", "username", "confidence"))
+
+
+def record_upload_stats(record: Dict[str, Any]):
+    """Count a newly inserted upload; never fails the upload itself."""
+    bucket = _bucket(record)
+    update = {"$inc": {"count": 1}, "$setOnInsert": bucket}
+    try:
+        try:
+            stats_col.update_one({"_id": _bucket_id(bucket)}, update, upsert=True)
+        except DuplicateKeyError:
+            # Two first uploads of the same bucket raced on the upsert; the bucket exists now
+            stats_col.update_one({"_id": _bucket_id(bucket)}, update)
+    except Exception as e:
+        print(f"Warning: could not update upload stats: {e}")
+
+
+def rebuild_stats():
+    """Recompute every bucket from the uploads collection and replace 'stats' atomically."""
+    uploads_col.aggregate([
+        {"$project": {
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+            "doc_type": {"$ifNull": ["$doc_type", UNKNOWN]},
+            "username": {"$ifNull": ["$username", UNKNOWN]},
+            "confidence": {"$ifNull": ["$verification.confidence_level", "none"]},
+        }},
+        {"$match": {"day": {"$ne": None}}},
+        {"$group": {
+            "_id": {"$concat": ["$day", "|", "$doc_type", "|", "$username", "|", "$confidence"]},
+            "day": {"$first": "$day"},
+            "doc_type": {"$first": "$doc_type"},
+            "username": {"$first": "$username"},
+            "confidence": {"$first": "$confidence"},
+            "count": {"$sum": 1},
+        }},
+        {"$out": "stats"},
+    ], allowDiskUse=True)
+
+
+def dashboard_stats(days: int = 7) -> Dict[str, Any]:
+    """
+    Everything the admin dashboard charts need, from one $facet over the stats buckets
+
+    Returns:
+        Dictionary with total_docs, uploads_per_day, uploads_by_type and top_users,
+        each chart as {"labels": [...], "values": [...]}
+    """
+    today = datetime.utcnow().date()
+    last_days = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days - 1, -1, -1)]
+
+    def grouped(field, *stages):
+        return [{"$group": {"_id": f"${field}", "count": {"$sum": "$count"}}},
+                {"$sort": {"count": -1}}, *stages]
+
+    result = next(stats_col.aggregate([{"$facet": {
+        "total": [{"$group": {"_id": None, "count": {"$sum": "$count"}}}],
+        "per_day": [{"$match": {"day": {"$in": last_days}}}] + grouped("day"),
+        "by_type": grouped("doc_type"),
+        "top_users": grouped("username", {"$limit": TOP_USERS}),
+    }}]), {})
+
+    def chart(rows):
+        return {"labels": [r["_id"] for r in rows], "values": [r["count"] for r in rows]}
+
+    per_day = {r["_id"]: r["count"] for r in result.get("per_day", [])}
+    total = result.get("total") or [{"count": 0}]
+    return {
+        "total_docs": total[0]["count"],
+        "uploads_per_day": {"labels": last_days, "values": [per_day.get(d, 0) for d in last_days]},
+        "uploads_by_type": chart(result.get("by_type", [])),
+        "top_users": chart(result.get("top_users", [])),
+    }
+
+
+def ensure_stats():
+    """Build the stats collection once for databases that predate it."""
+    if stats_col.estimated_document_count() == 0 and uploads_col.estimated_document_count() > 0:
+        print("Building upload stats from existing uploads...")
+        rebuild_stats()
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        rebuild_stats()
+        print(f"Rebuilt {stats_col.estimated_document_count()} stats buckets.")
+    else:
+        print("usage: python stats_store.py --rebuild")
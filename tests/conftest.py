@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Before config is imported: in-memory MongoDB and a scratch temp folder
+os.environ.setdefault("MONGO_URI", "mongomock://")
+os.environ.setdefault("TEMP_FOLDER", tempfile.mkdtemp(prefix="ocr-tests-"))
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from config import Config
+from export_utils import stream_tables_zip, table_format_available
+
+
+def _table(schema: int, page: int, rows: int = 2):
+    return {
+        "table_number": 1,
+        "page": page,
+        "headers": [f"Libellé {schema}", "Montant"],
+        "rows": [[f"ligne {i}", f"{i},500"] for i in range(rows)],
+    }
+
+
+def _tables(schemas: int, passes: int):
+    """Tables of `schemas` distinct schemas, interleaved so every group is reopened."""
+    for page in range(passes):
+        for schema in range(schemas):
+            yield "record", _table(schema, page)
+
+
+def _temp_files():
+    return set(os.listdir(Config.TEMP_FOLDER))
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.fixture
+def max_open_writers(monkeypatch):
+    monkeypatch.setattr(Config, "EXPORT_MAX_OPEN_WRITERS", 2)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_groups_are_concatenated_with_few_open_writers(fmt, max_open_writers):
+    if not table_format_available(fmt):
+        pytest.skip("pyarrow is not installed")
+    before = _temp_files()
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_tables_zip(_tables(5, 3), fmt))))
+    manifest = json.loads(archive.read("manifest.json"))
+
+    assert len(manifest) == 5
+    assert all(entry["tables"] == 3 and entry["rows"] == 6 for entry in manifest)
+    if fmt == "csv":
+        lines = archive.read(manifest[0]["file"]).decode("utf-8").splitlines()
+        assert len(lines) == 7  # one header row
+    else:
+        import pyarrow.ipc
+        import pyarrow.parquet
+        data = io.BytesIO(archive.read(manifest[0]["file"]))
+        table = pyarrow.parquet.read_table(data) if fmt == "parquet" else pyarrow.ipc.open_file(data).read_all()
+        assert table.num_rows == 6
+        assert table.column("Montant").to_pylist() == [0.5, 1.5] * 3
+    assert _temp_files() == before
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_identifiers_are_exported_as_strings(fmt):
+    if not table_format_available(fmt):
+        pytest.skip("pyarrow is not installed")
+    table = {"table_number": 1, "page": 1, "headers": ["CIN", "RIB"],
+             "rows": [["01234567", "10006000123456789013"]]}
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_tables_zip([("record", table)], fmt))))
+    manifest = json.loads(archive.read("manifest.json"))
+
+    import pyarrow.ipc
+    import pyarrow.parquet
+    data = io.BytesIO(archive.read(manifest[0]["file"]))
+    exported = pyarrow.parquet.read_table(data) if fmt == "parquet" else pyarrow.ipc.open_file(data).read_all()
+    assert exported.column("CIN").to_pylist() == ["01234567"]
+    assert exported.column("RIB").to_pylist() == ["10006000123456789013"]
+
+
+def test_failed_export_closes_and_removes_group_files(max_open_writers):
+    def failing():
+        yield from _tables(6, 2)
+        raise RuntimeError("cursor lost")
+
+    before_files, before_fds = _temp_files(), _open_fds()
+    with pytest.raises(RuntimeError, match="cursor lost"):
+        b"".join(stream_tables_zip(failing(), "csv"))
+
+    assert _temp_files() == before_files
+    assert _open_fds() == before_fds
@@ -0,0 +1,50 @@
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+
+from OCR.page_cache import PageCache, page_fingerprint
+
+
+def _pdf(text: str = "Montant 200,500 DT") -> bytes:
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_font(fontname="F1", fontbuffer=pymupdf.Font("tiro").buffer)
+    page.insert_text((72, 72), text, fontname="F1")
+    return doc.tobytes()
+
+
+def _fingerprint(data: bytes, edit=None) -> str:
+    doc = pymupdf.open(stream=data, filetype="pdf")
+    if edit:
+        edit(doc)
+    return page_fingerprint(doc, doc[0])
+
+
+def _replace_to_unicode(doc):
+    """Same content streams and font names, different text mapping"""
+    font_xref = doc[0].get_fonts(full=True)[0][0]
+    cmap_xref = int(doc.xref_get_key(font_xref, "ToUnicode")[1].split()[0])
+    cmap = doc.xref_stream(cmap_xref)
+    doc.update_stream(cmap_xref, cmap.replace(b"<0020>", b"<0021>") if b"<0020>" in cmap else cmap + b"\n%")
+
+
+def test_same_page_same_fingerprint():
+    assert _fingerprint(_pdf()) == _fingerprint(_pdf())
+
+
+def test_to_unicode_map_changes_fingerprint():
+    data = _pdf()
+    assert _fingerprint(data) != _fingerprint(data, _replace_to_unicode)
+
+
+def test_memory_is_bounded_by_bytes():
+    cache = PageCache(max_entries=100, max_bytes=1000)
+    for i in range(5):
+        cache.put(f"page{i}", [{"type": "image", "base64": "x" * 400}])
+
+    assert cache.memory.bytes <= 1000
+    assert len(cache.memory) == 2
+    assert cache.get("page4") is not None and cache.get("page0") is None
+
+    cache.put("huge", [{"type": "image", "base64": "x" * 2000}])
+    assert cache.get("huge") is None
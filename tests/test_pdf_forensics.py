@@ -0,0 +1,26 @@
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+
+from OCR.Verify_document import verify_pdf_document
+from OCR.pdf_forensics import scan_object_tree, scan_pdf_structure
+
+
+def _pdf_with_javascript(doc) -> bytes:
+    doc.new_page().insert_text((72, 72), "Relevé")
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<</S/JavaScript/JS(app.alert\\(1\\))>>")
+    doc.xref_set_key(doc.pdf_catalog(), "OpenAction", f"{xref} 0 R")
+    # Compressed into an object stream: "/JS" never appears in the raw bytes
+    return doc.tobytes(use_objstms=True, deflate=True)
+
+
+def test_javascript_in_object_stream_is_found():
+    data = _pdf_with_javascript(pymupdf.open())
+    structure = scan_pdf_structure(data)
+    assert structure["object_streams"] == 1
+    assert structure["javascript"] == 0
+
+    assert scan_object_tree(pymupdf.open(stream=data))["javascript"] == 2  # /S /JavaScript and /JS
+    result = verify_pdf_document(data)
+    assert result["checks"]["javascript"]["passed"] is False
@@ -0,0 +1,47 @@
+import pytest
+
+from OCR.table_normalizer import FLOAT, INTEGER, STRING, normalize_table, parse_number
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("200,500 DT", 200.5),
+    ("1 200,500", 1200.5),
+    ("1.200,500", 1200.5),
+    ("12,5", 12.5),
+    ("1,234.56", 1234.56),
+    ("1.234.567", 1234567),
+    ("٢٠٠٫٥٠٠ د.ت", 200.5),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value", ["1.234.5", "1,2.5", "12 abc", ""])
+def test_parse_number_rejects(value):
+    assert parse_number(value) is None
+
+
+def test_ambiguous_amount_follows_explicit_decimal_mark():
+    assert parse_number("200,500", decimal=".") == 200500
+
+
+def test_tnd_amounts_share_one_scale():
+    table = normalize_table({"headers": ["Libellé", "Montant"],
+                             "rows": [["Loyer", "1 200,500 DT"], ["Frais", "200,500 DT"]]})
+    assert table["types"] == ["string", FLOAT]
+    assert table["data"]["Montant"] == [1200.5, 200.5]
+
+
+def test_column_decimal_mark_from_unambiguous_cells():
+    table = normalize_table({"headers": ["Item", "Amount"],
+                             "rows": [["Rent", "1,234.56"], ["Fees", "200,500"]]})
+    assert table["data"]["Amount"] == [1234.56, 200500.0]
+
+
+def test_identifier_columns_stay_strings():
+    table = normalize_table({"headers": ["CIN", "RIB", "Age"],
+                             "rows": [["01234567", "10006000123456789013", "42"],
+                                      ["12345678", "08006000123456789045", "7"]]})
+    assert table["types"] == [STRING, STRING, INTEGER]
+    assert table["data"]["CIN"] == ["01234567", "12345678"]
+    assert table["data"]["RIB"] == ["10006000123456789013", "08006000123456789045"]
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+import tracing
+from config import Config
+
+
+def _busy_work(seconds: float = 0.05):
+    with tracing.worker_trace():
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            sum(range(1000))
+
+
+def test_threaded_trace_profiles_and_snapshots_the_worker(monkeypatch):
+    monkeypatch.setattr(Config, "TRACE_PROFILE_RATE", 1)
+    monkeypatch.setattr(Config, "TRACE_PROFILE_MS", 0)
+    monkeypatch.setattr(Config, "TRACE_SNAPSHOT_MS", 10)
+
+    async def upload():
+        with tracing.record_trace("pdf", threaded=True) as trace:
+            await run_in_threadpool(_busy_work)
+        return trace
+
+    trace = asyncio.run(upload())
+    assert "builtins.sum" in trace.data["profile"]  # profiled from inside worker_trace()
+    assert any("_busy_work" in line for line in trace.data["stack_snapshot"]["stack"])
+
+
+def test_snapshots_share_one_watcher_thread(monkeypatch):
+    monkeypatch.setattr(Config, "TRACE_PROFILE_RATE", 0)
+    monkeypatch.setattr(Config, "TRACE_SNAPSHOT_MS", 1000)
+    with tracing.record_trace("cin"):
+        pass
+    threads = threading.active_count()
+    for _ in range(5):
+        with tracing.record_trace("cin"):
+            pass
+    assert threading.active_count() == threads
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+
+from OCR.Verify_document import verify_pdf_document
+from config import Config
+from upload_utils import RequestSizeLimit, spool_upload
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, "MAX_UPLOAD_SIZE_MB", 1)
+    monkeypatch.setattr(Config, "MAX_REQUEST_SIZE_MB", 2)
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimit)
+    app.state.calls = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        with await spool_upload(file) as spooled:
+            return {"size": spooled.size, "head": bytes(spooled.source[:4]).decode()}
+
+    @app.post("/verify")
+    async def verify(file: UploadFile = File(...)):
+        with await spool_upload(file) as spooled:
+            return verify_pdf_document(spooled.source)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("spool_max_size", [MB, 1024], ids=["in_memory", "rolled_over"])
+def test_upload_is_read_in_place(client, monkeypatch, spool_max_size):
+    monkeypatch.setattr(MultiPartParser, "spool_max_size", spool_max_size)
+    body = b"%PDF" + b"x" * (MB // 2)
+    response = client.post("/upload", files={"file": ("a.pdf", body)})
+    assert response.json() == {"size": len(body), "head": "%PDF"}
+
+
+@pytest.mark.parametrize("spool_max_size", [MB, 512], ids=["in_memory", "rolled_over"])
+def test_spooled_pdf_is_verified(client, monkeypatch, spool_max_size):
+    pymupdf = pytest.importorskip("pymupdf")
+    monkeypatch.setattr(MultiPartParser, "spool_max_size", spool_max_size)
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Contrat de location " * 20)
+    body = doc.tobytes()
+    assert len(body) > 512
+
+    result = client.post("/verify", files={"file": ("a.pdf", body)}).json()
+    assert "error" not in result["checks"]
+    assert result["checks"]["pdf_header"]["passed"]
+    assert result["overall_score"] > 0
+
+
+def test_file_over_the_per_file_cap(client):
+    response = client.post("/upload", files={"file": ("a.pdf", b"x" * (MB + 1))})
+    assert response.status_code == 413
+
+
+def test_content_length_over_the_cap_is_refused_before_parsing(client):
+    response = client.post("/upload", files={"file": ("a.pdf", b"x" * (3 * MB))})
+    assert response.status_code == 413
+    assert client.app.state.calls == 0
+
+
+def test_chunked_body_over_the_cap_is_cut_off(client):
+    def chunks():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.pdf\"\r\n\r\n"
+        for _ in range(3):
+            yield b"x" * MB
+        yield b"\r\n--b--\r\n"
+
+    response = client.post("/upload", content=chunks(),
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert client.app.state.calls == 0
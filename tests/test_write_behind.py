@@ -0,0 +1,43 @@
+import asyncio
+import os
+
+import write_behind
+from write_behind import UploadJournal, _read_journal
+
+
+def _journal(tmp_path, monkeypatch) -> UploadJournal:
+    monkeypatch.setattr(write_behind, "record_upload_stats", lambda record: None)
+    journal = UploadJournal(str(tmp_path))
+    journal.open()
+    return journal
+
+
+def test_flush_replaces_journal_with_pending_records(tmp_path, monkeypatch):
+    journal = _journal(tmp_path, monkeypatch)
+    monkeypatch.setattr(write_behind.Config, "WRITE_BEHIND_BATCH", 2)
+    ids = [journal.append({"filename": f"{i}.pdf"}) for i in range(3)]
+
+    assert journal.flush_batch() == 2
+    assert [str(r["_id"]) for r in _read_journal(journal.path)] == ids[2:]
+    assert os.listdir(tmp_path) == [os.path.basename(journal.path)]
+
+    # The handle now points at the renamed file: appends land in the journal
+    journal.append({"filename": "3.pdf"})
+    assert len(_read_journal(journal.path)) == 2
+
+
+def test_stop_waits_for_the_flush_task(tmp_path, monkeypatch):
+    journal = _journal(tmp_path, monkeypatch)
+    journal.append({"filename": "a.pdf"})
+
+    async def run():
+        journal._loop = asyncio.get_running_loop()
+        journal._wake = asyncio.Event()
+        journal._task = journal._loop.create_task(journal._run())
+        await asyncio.sleep(0)
+        await journal.stop()
+
+    asyncio.run(run())
+    assert journal.depth == 0
+    assert journal._task is None and journal._file.closed
+    assert _read_journal(journal.path) == []
@@ -0,0 +1,221 @@
+"""
+Per-record processing traces
+Each upload is processed inside record_trace(); stages timed with metrics.timed,
+image sizes, box counts and cache hits noted along the way end up in a compact
+'trace' sub-document stored with the record.
+
+Uploads still running after TRACE_SNAPSHOT_MS get a stack snapshot of the thread
+processing them (taken by one shared watcher thread), and a TRACE_PROFILE_RATE sample
+is run under cProfile, keeping the top functions when the upload took longer than
+TRACE_PROFILE_MS. Work moved to a thread pool runs inside worker_trace(), so both
+follow it to the thread that does it.
+"""
+import contextvars
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import random
+import socket
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import Config
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+# One cProfile at a time per process: a second enable would replace or reject the first
+_profiler_lock = threading.Lock()
+
+
+class Trace:
+    """Collects what happened while one record was processed."""
+
+    def __init__(self, doc_type: str):
+        self.started = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.data: Dict[str, Any] = {
+            "doc_type": doc_type,
+            "worker": WORKER_ID,
+            "started_at": datetime.utcnow(),
+            "stages": {},
+        }
+        self.finished = False
+        self.profile_sampled = False
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def add_stage(self, stage: str, seconds: float):
+        # Repeated stages (front and back side) add up
+        stages = self.data["stages"]
+        stages[stage] = round(stages.get(stage, 0) + seconds * 1000, 1)
+
+    def note(self, key: str, value: Any):
+        self.data[key] = value
+
+    def append(self, key: str, value: Any):
+        self.data.setdefault(key, []).append(value)
+
+    def _take_snapshot(self):
+        if self.finished:
+            return
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            self.data["stack_snapshot"] = {
+                "after_ms": Config.TRACE_SNAPSHOT_MS,
+                "stack": [line.strip() for line in traceback.format_stack(frame, limit=20)],
+            }
+
+    def finish(self) -> Dict[str, Any]:
+        self.finished = True
+        self.data["total_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.data
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def note(key: str, value: Any):
+    """Set a field of the current trace; a no-op outside record_trace()."""
+    trace = _current.get()
+    if trace is not None:
+        trace.note(key, value)
+
+
+def append(key: str, value: Any):
+    """Append to a list field of the current trace; a no-op outside record_trace()."""
+    trace = _current.get()
+    if trace is not None:
+        trace.append(key, value)
+
+
+# ----- STACK SNAPSHOTS -----
+class _SnapshotWatcher(threading.Thread):
+    """One daemon thread taking the due stack snapshots of all traces, rather than a timer thread per upload."""
+
+    def __init__(self):
+        super().__init__(name="trace-snapshots", daemon=True)
+        self._due = []  # heap of (deadline, seq, trace); finished traces are skipped when due
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def schedule(self, trace: Trace, delay: float):
+        with self._cond:
+            heapq.heappush(self._due, (time.monotonic() + delay, next(self._seq), trace))
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                wait = self._due[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                trace = heapq.heappop(self._due)[2]
+            trace._take_snapshot()
+
+
+_watcher: Optional[_SnapshotWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def _snapshot_watcher() -> _SnapshotWatcher:
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = _SnapshotWatcher()
+            _watcher.start()
+    return _watcher
+
+
+# ----- PROFILING -----
+def _start_profiler() -> Optional[cProfile.Profile]:
+    """cProfile the calling thread, unless another upload is being profiled"""
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiling tool is active
+        _profiler_lock.release()
+        return None
+    return profiler
+
+
+def _stop_profiler(profiler: cProfile.Profile):
+    profiler.disable()
+    _profiler_lock.release()
+
+
+def _profile_summary(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(Config.TRACE_PROFILE_TOP)
+    # Drop the preamble, keep the table
+    text = out.getvalue()
+    return text[text.find("ncalls"):] if "ncalls" in text else text
+
+
+@contextmanager
+def record_trace(doc_type: str, threaded: bool = False):
+    """
+    Trace the processing of one record:
+
+        with record_trace("cin") as trace:
+            ...
+        record["trace"] = trace.data
+
+    With threaded=True the work runs in a thread pool inside worker_trace(), which
+    profiles that thread; otherwise the calling thread is profiled.
+    """
+    trace = Trace(doc_type)
+    token = _current.set(trace)
+
+    if Config.TRACE_SNAPSHOT_MS > 0:
+        _snapshot_watcher().schedule(trace, Config.TRACE_SNAPSHOT_MS / 1000)
+
+    trace.profile_sampled = Config.TRACE_PROFILE_RATE > 0 and random.random() < Config.TRACE_PROFILE_RATE
+    profiler = _start_profiler() if trace.profile_sampled and not threaded else None
+    if profiler is not None:
+        trace.profiler = profiler
+
+    try:
+        yield trace
+    finally:
+        if profiler is not None:
+            _stop_profiler(profiler)
+        _current.reset(token)
+        trace.finish()
+        if trace.profiler is not None and trace.data["total_ms"] >= Config.TRACE_PROFILE_MS:
+            trace.data["profile"] = _profile_summary(trace.profiler)
+
+
+@contextmanager
+def worker_trace():
+    """
+    Run the blocking part of the current trace in this (thread pool) thread: its stack
+    snapshot is taken here, and a sampled trace is profiled here. A no-op outside record_trace().
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.thread_id = threading.get_ident()
+    profiler = _start_profiler() if trace.profile_sampled and trace.profiler is None else None
+    if profiler is not None:
+        trace.profiler = profiler
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            _stop_profiler(profiler)
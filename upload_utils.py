@@ -0,0 +1,153 @@
+import mmap
+import os
+from typing import Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from starlette.formparsers import MultiPartParser
+from starlette.responses import JSONResponse
+
+from config import Config
+
+# Starlette spools each uploaded file itself (in memory, then in a temp file); the
+# endpoints work on that copy, so its rollover threshold is the one that matters
+MultiPartParser.spool_max_size = int(Config.UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024)
+
+
+def max_upload_bytes() -> int:
+    return int(Config.MAX_UPLOAD_SIZE_MB * 1024 * 1024)
+
+
+def max_request_bytes() -> int:
+    return int(Config.MAX_REQUEST_SIZE_MB * 1024 * 1024)
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit_mb: float):
+        super().__init__(status_code=413, detail=f"File too large (limit {limit_mb} MB)")
+
+
+class RequestSizeLimit:
+    """
+    ASGI middleware capping request bodies at MAX_REQUEST_SIZE_MB before they are parsed:
+    a larger Content-Length is refused without reading the body, and bodies without one
+    (chunked) are counted as they are received and cut off past the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_request_bytes()
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._refuse(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing as they are
+                    raise UploadTooLarge(Config.MAX_REQUEST_SIZE_MB)
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except UploadTooLarge:
+            if started:
+                raise
+            await self._refuse(scope, receive, send)
+
+    @staticmethod
+    async def _refuse(scope, receive, send):
+        response = JSONResponse({"detail": f"File too large (limit {Config.MAX_REQUEST_SIZE_MB} MB)"},
+                                status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
+
+
+class SpooledUpload:
+    """
+    Read-only view of an upload's body as Starlette spooled it: the in-memory buffer below
+    UPLOAD_SPOOL_THRESHOLD_MB, an mmap of its temp file above it. Nothing is copied again.
+    """
+
+    def __init__(self, file: UploadFile):
+        self.filename = file.filename
+        self.path: Optional[str] = None
+        self._spool = file.file
+        self._spool.seek(0, os.SEEK_END)
+        self.size = self._spool.tell()
+        self._spool.seek(0)
+        self._mmap = None
+        self._view: Optional[memoryview] = None
+
+    @property
+    def source(self) -> Union[memoryview, bytes]:
+        """The upload's bytes as a memoryview (open_pdf, extract_pdf and verify_pdf_document accept it)"""
+        if self._view is None:
+            if self.size == 0:
+                return b""
+            if getattr(self._spool, "_rolled", True):
+                # Rolled over to a temp file (or a plain file object): map it, pages load on demand
+                self._mmap = mmap.mmap(self._spool.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+            else:
+                self._view = self._spool._file.getbuffer()
+        return self._view
+
+    def save_as(self, destination: str):
+        """Persist the upload to destination"""
+        with open(destination, "wb") as f:
+            f.write(self.source)
+        self.path = destination
+
+    def close(self):
+        """Release the view so the UploadFile can be closed; the spool itself belongs to Starlette"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def check_upload_size(file: UploadFile):
+    """Reject uploads whose size exceeds the per-file cap"""
+    if file is not None and file.size is not None and file.size > max_upload_bytes():
+        raise UploadTooLarge(Config.MAX_UPLOAD_SIZE_MB)
+
+
+async def spool_upload(file: UploadFile) -> SpooledUpload:
+    """
+    Check an upload against MAX_UPLOAD_SIZE_MB and wrap its spooled body without copying it.
+    Requests larger than MAX_REQUEST_SIZE_MB never get here, RequestSizeLimit refuses them.
+
+    Raises:
+        HTTPException 413: If the upload exceeds the size cap
+    """
+    check_upload_size(file)
+    upload = SpooledUpload(file)
+    if upload.size > max_upload_bytes():
+        upload.close()
+        raise UploadTooLarge(Config.MAX_UPLOAD_SIZE_MB)
+    return upload
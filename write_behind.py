@@ -0,0 +1,261 @@
+"""
+Write-behind persistence for upload records
+With WRITE_BEHIND enabled, a record is appended to a local fsync'd journal and
+acknowledged with its pre-generated ObjectId; a background task flushes journaled
+records to MongoDB in batches with insert_many, retrying until MongoDB accepts them.
+
+Each worker process owns one journal file in WRITE_BEHIND_DIR (held with an exclusive
+lock on POSIX). On startup a worker adopts the journals of workers that are gone and
+replays them; records that already reached MongoDB are skipped as duplicate keys.
+"""
+import asyncio
+import glob
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId, json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from database import get_collection, run_db
+from metrics import timed
+from stats_store import record_upload_stats
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single journal file, one worker process expected
+    fcntl = None
+
+ocr_col = get_collection("uploads")
+
+DUPLICATE_KEY = 11000
+
+
+def _lock(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _fsync_dir(directory: str):
+    """Make a rename in directory durable (not possible, nor needed, on Windows)."""
+    if fcntl is None:
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _read_journal(path: str) -> List[dict]:
+    """Records of a journal file; a torn last line (crash mid-write) is dropped."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json_util.loads(line))
+            except ValueError:
+                print(f"Warning: skipping unreadable journal line in {path}")
+    return records
+
+
+class UploadJournal:
+    """Durable queue of upload records waiting to be inserted into MongoDB."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "uploads.jsonl" if fcntl is None else f"uploads-{os.getpid()}.jsonl")
+        self.pending: "OrderedDict[ObjectId, dict]" = OrderedDict()
+        self.flushed = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    # ----- Journal file -----
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, "a+", encoding="utf-8")
+        _lock(self._file)
+
+        # Own leftovers (same file name) and journals of workers that are gone
+        replay = _read_journal(self.path)
+        adopted = []
+        for path in glob.glob(os.path.join(self.directory, "uploads*.jsonl")):
+            if path == self.path:
+                continue
+            with open(path, "r+", encoding="utf-8") as other:
+                if not _lock(other):
+                    continue  # owned by a running worker
+                replay += _read_journal(path)
+                adopted.append(path)
+
+        for record in replay:
+            self.pending[record["_id"]] = record
+        # Adopted records are on disk in our journal before their old files go away
+        self._rewrite()
+        for path in adopted:
+            os.remove(path)
+        if replay:
+            print(f"Write-behind: replaying {len(replay)} journaled records")
+
+    def _rewrite(self):
+        """
+        Replace the journal with the records still pending (called with the lock held or at startup).
+        They are written to a locked temp file that is renamed over the journal once it is on disk,
+        so a crash at any point leaves either the old journal or the new one, never a partial one.
+        """
+        tmp_path = self.path + ".tmp"
+        tmp = open(tmp_path, "w", encoding="utf-8")
+        try:
+            _lock(tmp)
+            for record in self.pending.values():
+                tmp.write(json_util.dumps(record, json_options=CANONICAL_JSON_OPTIONS) + "\n")
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            if fcntl is None:
+                self._file.close()  # Windows cannot replace a file that is open
+            # On POSIX the old journal stays locked until the new one has taken its name
+            os.replace(tmp_path, self.path)
+            _fsync_dir(self.directory)
+        except BaseException:
+            tmp.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if self._file.closed:
+                self._file = open(self.path, "a+", encoding="utf-8")
+            raise
+        self._file.close()
+        self._file = tmp
+
+    def append(self, record: Dict[str, Any]) -> str:
+        """Durably queue a record; returns its id once the journal write is on disk."""
+        record.setdefault("_id", ObjectId())
+        line = json_util.dumps(record, json_options=CANONICAL_JSON_OPTIONS) + "\n"
+        with self._lock, timed("journal_append"):
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending[record["_id"]] = record
+        if self._wake is not None and len(self.pending) >= Config.WRITE_BEHIND_BATCH:
+            # Appends run on the database pool, the event belongs to the loop
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return str(record["_id"])
+
+    def get(self, record_id) -> Optional[dict]:
+        """A record that is acknowledged but not yet in MongoDB."""
+        with self._lock:
+            record = self.pending.get(ObjectId(record_id) if isinstance(record_id, str) else record_id)
+            return dict(record) if record is not None else None
+
+    # ----- Flushing -----
+    def flush_batch(self) -> int:
+        """Insert up to WRITE_BEHIND_BATCH pending records; returns how many reached MongoDB."""
+        with self._lock:
+            batch = list(self.pending.values())[:Config.WRITE_BEHIND_BATCH]
+        if not batch:
+            return 0
+
+        inserted = {r["_id"] for r in batch}
+        try:
+            with timed("db_flush_batch"):
+                ocr_col.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            # Replayed records that were already inserted before a crash
+            inserted -= {batch[err["index"]]["_id"] for err in errors}
+
+        for record in batch:
+            if record["_id"] in inserted:
+                record_upload_stats(record)
+
+        with self._lock:
+            for record in batch:
+                self.pending.pop(record["_id"], None)
+            self._rewrite()
+        self.flushed += len(batch)
+        return len(batch)
+
+    async def _run(self):
+        delay = Config.WRITE_BEHIND_INTERVAL
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                while await run_db(self.flush_batch) >= Config.WRITE_BEHIND_BATCH:
+                    pass
+                delay = Config.WRITE_BEHIND_INTERVAL
+            except Exception as e:
+                # MongoDB unavailable: keep everything journaled and back off
+                self.failures += 1
+                delay = min(delay * 2, Config.WRITE_BEHIND_MAX_BACKOFF)
+                print(f"Warning: write-behind flush failed ({len(self.pending)} pending), retrying in {delay:.1f}s: {e}")
+
+    def start(self):
+        self.open()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Flush what MongoDB accepts; anything left stays journaled for the next start."""
+        if self._task is not None:
+            # Let a flush that is running on the database pool finish: cancelling the await
+            # would leave it writing the journal while the final flush below runs
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        try:
+            while await run_db(self.flush_batch):
+                pass
+        except Exception as e:
+            print(f"Warning: {len(self.pending)} records left in the write-behind journal: {e}")
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def depth(self) -> int:
+        return len(self.pending)
+
+
+journal = UploadJournal(Config.WRITE_BEHIND_DIR) if Config.WRITE_BEHIND else None
+
+
+async def save_upload(record: Dict[str, Any]) -> str:
+    """Persist an upload record: journaled write-behind when enabled, otherwise a direct insert."""
+    if journal is not None:
+        return await run_db(journal.append, record)
+
+    def insert():
+        with timed("db_insert_upload"):
+            result = ocr_col.insert_one(record)
+        record_upload_stats(record)
+        return str(result.inserted_id)
+    return await run_db(insert)
+
+
+def pending_upload(record_id: str) -> Optional[dict]:
+    """Read fallback for records acknowledged by the journal but not flushed yet."""
+    return journal.get(record_id) if journal is not None else None